@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "auth_service.settings")
 
 application = get_asgi_application()
+
+# liveness و readiness يُجاب عليهما قبل Django (انظر authentication.health)
+from authentication.health import AsyncHealthProbeMiddleware  # noqa: E402
+
+application = AsyncHealthProbeMiddleware(application)
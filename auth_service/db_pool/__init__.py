@@ -0,0 +1,3 @@
+"""
+محرك PostgreSQL باتصالات مجمّعة (ENGINE = "auth_service.db_pool")
+"""
@@ -0,0 +1,125 @@
+"""
+محرك PostgreSQL يستعير الاتصالات من مجمّع لكل عملية بدلاً من اتصال لكل خيط
+
+مع CONN_MAX_AGE = 0 يُعاد الاتصال إلى المجمّع في نهاية كل طلب، فلا يتجاوز
+عدد اتصالات العامل POOL["MAX_SIZE"] مهما كان عدد خيوطه، ويبقى إجمالي
+الاتصالات محدوداً بـ MAX_SIZE × عدد العمال. عند نفاد المجمّع ينتظر الطلب
+POOL["TIMEOUT"] ثانية ثم يفشل بـ OperationalError.
+"""
+
+import logging
+import os
+import threading
+
+from django.db import OperationalError
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+from psycopg2 import extensions
+
+logger = logging.getLogger(__name__)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    """
+    مجمّع اتصالات محدود الحجم وآمن للخيوط
+
+    يُنشأ الاتصال عند الحاجة فقط، وتُعاد الاتصالات الخاملة بترتيب LIFO
+    حتى تبقى الاتصالات الأقل استخداماً قابلة للإغلاق من جهة الخادم.
+    """
+
+    def __init__(self, connect, max_size, timeout):
+        self.connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    def acquire(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise OperationalError(
+                f"Connection pool exhausted ({self.max_size} connections busy "
+                f"for {self.timeout}s)"
+            )
+        try:
+            with self._lock:
+                connection = self._idle.pop() if self._idle else None
+            if connection is None or connection.closed:
+                connection = self.connect()
+            return connection
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, connection, discard=False):
+        try:
+            if discard or connection.closed:
+                connection.close()
+            else:
+                with self._lock:
+                    self._idle.append(connection)
+        finally:
+            self._slots.release()
+
+
+def get_pool(alias, settings_dict, connect):
+    """
+    مجمّع قاعدة البيانات alias للعملية الحالية (يُنشأ من جديد بعد fork)
+    """
+    key = (os.getpid(), alias)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                options = settings_dict.get("POOL", {})
+                pool = _pools[key] = ConnectionPool(
+                    connect,
+                    max_size=options.get("MAX_SIZE", 10),
+                    timeout=options.get("TIMEOUT", 5),
+                )
+                logger.info(f"Database pool {alias}: up to {pool.max_size} connections")
+    return pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    pooled = True
+
+    @property
+    def pool(self):
+        return get_pool(
+            self.alias,
+            self.settings_dict,
+            lambda: super(DatabaseWrapper, self).get_new_connection(
+                self.get_connection_params()
+            ),
+        )
+
+    def get_new_connection(self, conn_params):
+        connection = self.pool.acquire()
+        self.isolation_level = IsolationLevel(
+            self.settings_dict["OPTIONS"].get(
+                "isolation_level", IsolationLevel.READ_COMMITTED
+            )
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        with self.wrap_database_errors:
+            # معاملة مفتوحة أو فاشلة لا تنتقل إلى المستعير التالي
+            discard = False
+            if not self.connection.closed:
+                status = self.connection.info.transaction_status
+                if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                    discard = True
+                elif status != extensions.TRANSACTION_STATUS_IDLE:
+                    try:
+                        self.connection.rollback()
+                    except self.Database.Error:
+                        discard = True
+            self.pool.release(self.connection, discard=discard)
@@ -0,0 +1,264 @@
+"""
+معالجات سجلات غير حاجبة قائمة على طابور
+
+خيوط الطلبات تضيف السجلات إلى طابور محدود فقط، بينما يتولى خيط خلفي
+التنسيق (JSON عبر orjson) والكتابة إلى الملف و console.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+import zlib
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+import orjson
+from prometheus_client import Counter
+
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped_total",
+    "Log records dropped because the logging queue was full",
+    ["handler"],
+)
+
+# خصائص LogRecord القياسية، وما عداها يُعتبر من extra
+RESERVED_ATTRS = frozenset(
+    vars(logging.LogRecord("", 0, "", 0, "", None, None)).keys()
+) | {"message", "asctime"}
+
+VERBOSE_FORMAT = "{levelname} {asctime} {module} {process:d} {thread:d} {message}"
+
+# قرار أخذ العينات للطلب الحالي: [correlation_id, keep, held]
+_sampling = ContextVar("log_sampling", default=None)
+
+# أقصى عدد من سطور الطلب المُسقطة يُحتفظ به لحين معرفة نتيجته
+MAX_HELD_RECORDS = 20
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    منسق JSON سريع باستخدام orjson
+    """
+
+    def format(self, record):
+        payload = {
+            "timestamp": datetime.fromtimestamp(
+                record.created, tz=timezone.utc
+            ).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "module": record.module,
+            "lineno": record.lineno,
+            "process": record.process,
+            "thread": record.thread,
+        }
+        for key, value in record.__dict__.items():
+            if key not in RESERVED_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            payload["stack_info"] = self.formatStack(record.stack_info)
+
+        return orjson.dumps(payload, default=str).decode()
+
+
+class AdaptiveSamplingFilter(logging.Filter):
+    """
+    أخذ عينات من سجلات INFO الروتينية للطلبات حسب الضغط
+
+    يتم الاحتفاظ دائماً بسجلات WARNING وما فوق وبأي سجل لا يحمل correlation_id.
+    أما سجلات الطلبات فيُحتفظ بها بنسبة تنخفض كلما تجاوز المعدل الهدف في
+    الثانية. يُتخذ القرار مرة واحدة عند أول سطر من الطلب ويُحفظ في سياق
+    الطلب (ContextVar)، فتتبعه كل سطور الطلب حتى لو تغيرت النسبة بينها.
+
+    سطور الطلب المُسقطة تُحجز (حتى MAX_HELD_RECORDS)، فإذا تبين أن الطلب
+    بطيء أو فاشل يُقلب القرار إلى الاحتفاظ وتُرفق السطور المحجوزة بالسجل
+    ليكتبها QueueLogHandler قبله، فيبقى سطر "Request started" مع سطر
+    "Request completed" للطلب نفسه.
+    """
+
+    def __init__(
+        self, rate=1.0, target_per_second=50, min_rate=0.01, slow_threshold=1.0
+    ):
+        super().__init__()
+        self.max_rate = rate
+        self.target_per_second = target_per_second
+        self.min_rate = min_rate
+        self.slow_threshold = slow_threshold
+        self.rate = rate
+        self.sampled_out = 0
+        self._window = int(time.monotonic())
+        self._window_count = 0
+
+    def _current_rate(self):
+        """
+        تعديل النسبة مرة كل ثانية حسب عدد السجلات في الثانية السابقة
+        """
+        window = int(time.monotonic())
+        if window != self._window:
+            observed = self._window_count / (window - self._window)
+            if observed > self.target_per_second:
+                self.rate = max(self.min_rate, self.target_per_second / observed)
+            else:
+                self.rate = self.max_rate
+            self.rate = min(self.rate, self.max_rate)
+            self._window = window
+            self._window_count = 0
+        self._window_count += 1
+        return self.rate
+
+    def _is_important(self, record):
+        return (
+            getattr(record, "duration", 0) >= self.slow_threshold
+            or getattr(record, "status_code", 0) >= 400
+        )
+
+    def _decision(self, correlation_id):
+        """
+        قرار الطلب الحالي، ويُتخذ بالنسبة الحالية عند أول سطر منه
+        """
+        rate = self._current_rate()
+        state = _sampling.get()
+        if state is None or state[0] != correlation_id:
+            keep = (
+                rate >= 1.0
+                or zlib.crc32(str(correlation_id).encode()) / 0xFFFFFFFF < rate
+            )
+            state = [correlation_id, keep, []]
+            _sampling.set(state)
+        return state
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+
+        correlation_id = getattr(record, "correlation_id", None)
+        if not correlation_id:
+            return True
+
+        state = self._decision(correlation_id)
+        if state[1]:
+            return True
+
+        if self._is_important(record):
+            held, state[1], state[2] = state[2], True, []
+            record._sampled_backlog = held
+            self.sampled_out -= len(held)
+            return True
+
+        if len(state[2]) < MAX_HELD_RECORDS:
+            state[2].append(record)
+        self.sampled_out += 1
+        return False
+
+
+class _QueueListener(QueueListener):
+    """
+    مستمع لا يتعلق إيقافه إلى الأبد إذا كان الطابور ممتلئاً أو القرص متوقفاً
+    """
+
+    def stop(self, timeout=5):
+        if self._thread:
+            try:
+                self.queue.put(self._sentinel, timeout=timeout)
+                self._thread.join(timeout)
+            except queue.Full:
+                pass
+            self._thread = None
+
+
+class QueueLogHandler(QueueHandler):
+    """
+    معالج يضيف السجلات إلى طابور محدود ويكتبها خيط خلفي
+
+    عند امتلاء الطابور يتم إسقاط السجل وزيادة عداد الإسقاط بدلاً من حجز خيط
+    الطلب. يُعاد تشغيل المستمع تلقائياً بعد fork (مثل عمال gunicorn).
+    """
+
+    def __init__(
+        self,
+        filename=None,
+        max_bytes=1024 * 1024 * 15,
+        backup_count=10,
+        console=True,
+        console_format="json",
+        queue_size=10000,
+    ):
+        super().__init__(queue.Queue(queue_size))
+        self.queue_size = queue_size
+        self.dropped = 0
+        self.targets = []
+        self._listener = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+        json_formatter = JsonFormatter()
+        if filename:
+            file_handler = RotatingFileHandler(
+                filename, maxBytes=max_bytes, backupCount=backup_count, delay=True
+            )
+            file_handler.setFormatter(json_formatter)
+            self.targets.append(file_handler)
+        if console:
+            console_handler = logging.StreamHandler()
+            console_handler.setFormatter(
+                json_formatter
+                if console_format == "json"
+                else logging.Formatter(VERBOSE_FORMAT, style="{")
+            )
+            self.targets.append(console_handler)
+
+    def _ensure_listener(self):
+        """
+        تشغيل خيط المستمع مرة واحدة لكل عملية
+        """
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # الخيوط لا تنتقل عبر fork، لذا نبدأ بطابور ومستمع جديدين
+            self.queue = queue.Queue(self.queue_size)
+            self._listener = _QueueListener(self.queue, *self.targets)
+            self._listener.start()
+            self._pid = os.getpid()
+
+    def emit(self, record):
+        self._ensure_listener()
+        # سطور الطلب التي حجزها AdaptiveSamplingFilter تُكتب قبل السجل
+        for held in record.__dict__.pop("_sampled_backlog", ()):
+            super().emit(held)
+        super().emit(record)
+
+    def prepare(self, record):
+        """
+        دمج الرسالة فقط، ويتم التنسيق الكامل في خيط المستمع
+        """
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            LOG_RECORDS_DROPPED.labels(handler=self.get_name() or "queue").inc()
+
+    def close(self):
+        """
+        تفريغ الطابور وإيقاف المستمع عند إغلاق العملية
+        """
+        with self._lock:
+            if self._listener is not None and self._pid == os.getpid():
+                self._listener.stop()
+            self._listener = None
+            self._pid = None
+        for target in self.targets:
+            target.close()
+        super().close()
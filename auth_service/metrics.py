@@ -0,0 +1,48 @@
+"""
+دعم مقاييس Prometheus متعددة العمليات لعمال gunicorn
+
+عند ضبط PROMETHEUS_MULTIPROC_DIR قبل استيراد prometheus_client، تكتب كل
+عملية قيمها في ملفات mmap داخل هذا المجلد، ويجمعها endpoint المقاييس من
+جميع العمال بدلاً من عرض أرقام العامل الذي استقبل الطلب فقط.
+
+هذه الوحدة لا تستورد Django حتى يمكن استخدامها من gunicorn.conf.py.
+"""
+
+import os
+
+MULTIPROC_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+_registries = {}
+
+
+def get_multiprocess_dir():
+    return os.environ.get(MULTIPROC_ENV) or None
+
+
+def mark_worker_dead(pid):
+    """
+    إزالة ملفات gauge الحية لعامل منتهٍ (تُستدعى من child_exit)
+    """
+    if not get_multiprocess_dir():
+        return
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(pid)
+
+
+def get_registry():
+    """
+    السجل المستخدم لعرض المقاييس: تجميع جميع العمال أو السجل الافتراضي
+    """
+    from prometheus_client import REGISTRY, CollectorRegistry, multiprocess
+
+    path = get_multiprocess_dir()
+    if not path:
+        return REGISTRY
+
+    registry = _registries.get(path)
+    if registry is None:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, path=path)
+        _registries[path] = registry
+    return registry
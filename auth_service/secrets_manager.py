@@ -2,33 +2,136 @@
 خدمة إدارة الأسرار باستخدام Google Secret Manager
 """
 
+import json
 import logging
 import os
-from typing import Optional
-
-from google.api_core import exceptions
-from google.cloud import secretmanager
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, Iterable, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# مهلة كل طلب إلى Secret Manager عند الجلب المجمع (بالثواني)
+SECRETS_FETCH_TIMEOUT = float(os.getenv("SECRETS_FETCH_TIMEOUT", "3"))
+
+# cache محلي مشفر للأسرار؛ يتطلب مفتاح Fernet في SECRETS_CACHE_KEY
+SECRETS_CACHE_FILE = os.getenv(
+    "SECRETS_CACHE_FILE",
+    os.path.join(tempfile.gettempdir(), "naebak_auth_secrets.cache"),
+)
+SECRETS_CACHE_TTL = int(os.getenv("SECRETS_CACHE_TTL", "3600"))
+
+# فترة إعادة جلب الأسرار المتابعة (مثل JWT_SECRET_KEY) لاكتشاف التدوير
+SECRETS_REFRESH_INTERVAL = int(os.getenv("SECRETS_REFRESH_INTERVAL", "300"))
+
+# أقل فترة بين إعادتي جلب فوريتين للسر نفسه (عند ظهور إصدار غير معروف)
+SECRETS_ON_DEMAND_INTERVAL = int(os.getenv("SECRETS_ON_DEMAND_INTERVAL", "30"))
+
+
+class VersionedSecret:
+    """
+    الإصدار الحالي للسر والإصدار السابق له بعد التدوير
+
+    الكائن غير قابل للتعديل؛ التحديث يستبدله بكائن جديد.
+    """
+
+    __slots__ = (
+        "name",
+        "version",
+        "value",
+        "previous_version",
+        "previous_value",
+        "rotated_at",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        version: Optional[str],
+        value: Optional[str],
+        previous_version: Optional[str] = None,
+        previous_value: Optional[str] = None,
+        rotated_at: Optional[float] = None,
+    ):
+        self.name = name
+        self.version = version
+        self.value = value
+        self.previous_version = previous_version
+        self.previous_value = previous_value
+        self.rotated_at = rotated_at
+
+    def keys(self, grace_period: float) -> List[Tuple[Optional[str], str]]:
+        """
+        الإصدارات المقبولة (الحالي أولاً، ثم السابق خلال فترة السماح)
+
+        Args:
+            grace_period: مدة قبول الإصدار السابق بعد التدوير بالثواني
+
+        Returns:
+            قائمة (رقم الإصدار، القيمة)
+        """
+        keys = [(self.version, self.value)]
+        if (
+            self.previous_value
+            and self.rotated_at is not None
+            and time.time() - self.rotated_at < grace_period
+        ):
+            keys.append((self.previous_version, self.previous_value))
+        return keys
+
 
 class SecretsManager:
     """
     مدير الأسرار باستخدام Google Secret Manager
     """
 
-    def __init__(self, project_id: Optional[str] = None):
+    def __init__(
+        self,
+        project_id: Optional[str] = None,
+        cache_file: Optional[str] = SECRETS_CACHE_FILE,
+        cache_key: Optional[str] = None,
+        cache_ttl: int = SECRETS_CACHE_TTL,
+    ):
         """
         تهيئة مدير الأسرار
 
         Args:
             project_id: معرف مشروع Google Cloud
+            cache_file: مسار ملف cache الأسرار المشفر
+            cache_key: مفتاح Fernet لتشفير الملف (افتراضي: SECRETS_CACHE_KEY)
+            cache_ttl: مدة صلاحية الملف بالثواني
         """
         self.project_id = project_id or os.getenv("GOOGLE_CLOUD_PROJECT")
         self.client = None
+        self.cache_file = cache_file
+        self.cache_ttl = cache_ttl
+        # الأسرار المجلوبة مسبقاً؛ None تعني أن السر غير موجود في Secret Manager
+        self._values: Dict[str, Optional[str]] = {}
+        # الأسرار المتابعة بإصداراتها ويحدّثها خيط خلفي
+        self._versions: Dict[str, VersionedSecret] = {}
+        self.refresh_interval = SECRETS_REFRESH_INTERVAL
+        self.on_demand_interval = SECRETS_ON_DEMAND_INTERVAL
+        self._on_demand_at: Dict[str, float] = {}
+        self._refresher_pid = None
+        self._lock = threading.Lock()
+
+        cache_key = cache_key or os.getenv("SECRETS_CACHE_KEY")
+        self._fernet = None
+        if cache_key:
+            try:
+                from cryptography.fernet import Fernet
+
+                self._fernet = Fernet(cache_key)
+            except ValueError:
+                logger.warning("SECRETS_CACHE_KEY غير صالح، تم تعطيل cache الأسرار")
 
         if self.project_id:
             try:
+                # مكتبة Secret Manager ثقيلة، لذا تُحمّل فقط عند تحديد المشروع
+                from google.cloud import secretmanager
+
                 self.client = secretmanager.SecretManagerServiceClient()
                 logger.info(f"تم تهيئة Secret Manager للمشروع: {self.project_id}")
             except Exception as e:
@@ -54,12 +157,13 @@ class SecretsManager:
             # العودة إلى متغيرات البيئة المحلية
             return os.getenv(secret_name)
 
+        if version == "latest" and secret_name in self._values:
+            return self._values[secret_name] or os.getenv(secret_name)
+
+        from google.api_core import exceptions
+
         try:
-            name = (
-                f"projects/{self.project_id}/secrets/{secret_name}/versions/{version}"
-            )
-            response = self.client.access_secret_version(request={"name": name})
-            secret_value = response.payload.data.decode("UTF-8")
+            secret_value = self._access(secret_name, version)
             logger.info(f"تم جلب السر بنجاح: {secret_name}")
             return secret_value
 
@@ -73,6 +177,257 @@ class SecretsManager:
             # العودة إلى متغيرات البيئة المحلية
             return os.getenv(secret_name)
 
+    def _access(self, secret_name: str, version: str = "latest", timeout=None) -> str:
+        return self._access_version(secret_name, version, timeout)[1]
+
+    def _access_version(
+        self, secret_name: str, version: str = "latest", timeout=None
+    ) -> Tuple[str, str]:
+        """
+        جلب سر مع رقم الإصدار الفعلي (latest يُحل إلى رقم)
+        """
+        name = f"projects/{self.project_id}/secrets/{secret_name}/versions/{version}"
+        response = self.client.access_secret_version(
+            request={"name": name}, timeout=timeout
+        )
+        return response.name.rsplit("/", 1)[-1], response.payload.data.decode("UTF-8")
+
+    def get_versioned_secret(self, secret_name: str) -> Optional[VersionedSecret]:
+        """
+        الحصول على سر متابَع بإصداريه الحالي والسابق
+
+        أول استدعاء يسجل السر للتحديث الدوري ويشغل خيط التحديث، ويُعيد
+        القيمة المجلوبة مسبقاً إلى أن يحدد التحديث الأول رقم الإصدار.
+
+        Args:
+            secret_name: اسم السر
+
+        Returns:
+            VersionedSecret أو None إذا كان Secret Manager غير متاح
+        """
+        if not self.client or not self.project_id:
+            return None
+
+        secret = self._versions.get(secret_name)
+        if secret is None:
+            secret = self._versions.setdefault(
+                secret_name,
+                VersionedSecret(secret_name, None, self.get_secret(secret_name)),
+            )
+        self._start_refresher()
+        return secret
+
+    def _start_refresher(self) -> None:
+        """
+        تشغيل خيط التحديث مرة واحدة لكل عملية (يُعاد تشغيله بعد fork)
+        """
+        if self._refresher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._refresher_pid == os.getpid():
+                return
+            threading.Thread(
+                target=self._refresh_loop, name="secrets-refresher", daemon=True
+            ).start()
+            self._refresher_pid = os.getpid()
+
+    def _refresh_loop(self) -> None:
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                # خطأ غير متوقع لا يوقف خيط التحديث نهائياً
+                logger.error(f"خطأ في تحديث الأسرار: {e}")
+            time.sleep(self.refresh_interval)
+
+    def refresh_versioned_secret(self, secret_name: str) -> Optional[VersionedSecret]:
+        """
+        إعادة جلب سر متابَع فوراً، مرة واحدة على الأكثر كل on_demand_interval
+
+        تُستخدم عند ظهور إصدار لا يعرفه العامل بعد (مثل kid وقّع به عامل
+        آخر سبقه إلى اكتشاف التدوير) بدل انتظار التحديث الدوري.
+
+        Args:
+            secret_name: اسم السر
+
+        Returns:
+            VersionedSecret بعد التحديث أو None إذا كان Secret Manager غير متاح
+        """
+        secret = self.get_versioned_secret(secret_name)
+        if secret is None:
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            last = self._on_demand_at.get(secret_name)
+            if last is not None and now - last < self.on_demand_interval:
+                return secret
+            self._on_demand_at[secret_name] = now
+        self.refresh([secret_name])
+        return self._versions[secret_name]
+
+    def refresh(self, secret_names: Optional[Iterable[str]] = None) -> bool:
+        """
+        إعادة جلب الأسرار المتابعة واكتشاف التدوير
+
+        عند ظهور إصدار جديد يصبح الحالي سابقاً. في أول تحديث يُجلب الإصدار
+        السابق (N-1) إن كان مفعلاً، ويؤخذ وقت التدوير من تاريخ إنشاء الإصدار.
+        يُعاد كتابة cache المحلي فقط إذا تغيرت قيمة أحد الأسرار.
+
+        Args:
+            secret_names: الأسرار المطلوب تحديثها (افتراضي: كل الأسرار المتابعة)
+
+        Returns:
+            True إذا تغيرت قيمة أحد الأسرار
+        """
+        if secret_names is None:
+            secret_names = list(self._versions)
+        changed = False
+        for name in secret_names:
+            secret = self._versions[name]
+            try:
+                version, value = self._access_version(
+                    name, timeout=SECRETS_FETCH_TIMEOUT
+                )
+            except Exception as e:
+                logger.error(f"خطأ في تحديث السر {name}: {e}")
+                continue
+
+            if version == secret.version:
+                continue
+
+            if secret.version is None:
+                secret = self._load_previous(name, version, value)
+            else:
+                logger.info(
+                    f"تم اكتشاف تدوير السر {name}: {secret.version} -> {version}"
+                )
+                secret = VersionedSecret(
+                    name, version, value, secret.version, secret.value, time.time()
+                )
+            self._versions[name] = secret
+            changed = changed or self._values.get(name) != value
+            self._values[name] = value
+        if changed:
+            self._write_cache()
+        return changed
+
+    def _load_previous(self, name: str, version: str, value: str) -> VersionedSecret:
+        """
+        بناء السر بإصداره السابق عند أول تحديث في العملية
+        """
+        if not version.isdigit() or int(version) <= 1:
+            return VersionedSecret(name, version, value)
+
+        previous_version = str(int(version) - 1)
+        try:
+            previous_value = self._access(
+                name, previous_version, timeout=SECRETS_FETCH_TIMEOUT
+            )
+            created = self.client.get_secret_version(
+                request={
+                    "name": f"projects/{self.project_id}/secrets/{name}/versions/{version}"
+                },
+                timeout=SECRETS_FETCH_TIMEOUT,
+            ).create_time
+        except Exception as e:
+            # الإصدار السابق معطل أو محذوف
+            logger.info(f"الإصدار السابق للسر {name} غير متاح: {e}")
+            return VersionedSecret(name, version, value)
+
+        return VersionedSecret(
+            name, version, value, previous_version, previous_value, created.timestamp()
+        )
+
+    def prefetch(
+        self, secret_names: Iterable[str], timeout: float = SECRETS_FETCH_TIMEOUT
+    ) -> None:
+        """
+        جلب مجموعة أسرار دفعة واحدة وحفظها في الذاكرة
+
+        يُقرأ cache المحلي المشفر أولاً، وما ينقص يُجلب بالتوازي مع مهلة
+        لكل طلب. الأسرار التي يفشل جلبها تُترك لـ get_secret (والبيئة).
+
+        Args:
+            secret_names: أسماء الأسرار المطلوبة
+            timeout: مهلة كل طلب بالثواني
+        """
+        if not self.client or not self.project_id:
+            return
+
+        secret_names = list(dict.fromkeys(secret_names))
+        self._values.update(self._read_cache())
+        missing = [name for name in secret_names if name not in self._values]
+        if not missing:
+            return
+
+        from google.api_core import exceptions
+
+        fetched = {}
+        executor = ThreadPoolExecutor(max_workers=len(missing))
+        futures = {
+            executor.submit(self._access, name, timeout=timeout): name
+            for name in missing
+        }
+        done, not_done = wait(futures, timeout=timeout)
+        for future in done:
+            name = futures[future]
+            try:
+                fetched[name] = future.result()
+            except exceptions.NotFound:
+                logger.warning(f"السر غير موجود: {name}")
+                fetched[name] = None
+            except Exception as e:
+                logger.error(f"خطأ في جلب السر {name}: {e}")
+        for future in not_done:
+            logger.error(f"انتهت مهلة جلب السر: {futures[future]}")
+        # لا ننتظر الطلبات العالقة
+        executor.shutdown(wait=False)
+
+        if fetched:
+            self._values.update(fetched)
+            self._write_cache()
+        logger.info(f"تم جلب {len(fetched)} من {len(missing)} سر بالتوازي")
+
+    def _read_cache(self) -> Dict[str, Optional[str]]:
+        """
+        قراءة cache الأسرار المشفر إذا كان صالحاً ولم تنته مدته
+        """
+        if not self._fernet or not self.cache_file:
+            return {}
+
+        from cryptography.fernet import InvalidToken
+
+        try:
+            with open(self.cache_file, "rb") as f:
+                data = json.loads(self._fernet.decrypt(f.read(), ttl=self.cache_ttl))
+        except FileNotFoundError:
+            return {}
+        except (InvalidToken, ValueError, OSError):
+            # منتهي الصلاحية أو مفتاح مختلف أو ملف تالف
+            return {}
+        if data.get("project_id") != self.project_id:
+            return {}
+        return data.get("secrets", {})
+
+    def _write_cache(self) -> None:
+        """
+        كتابة الأسرار المجلوبة إلى ملف مشفر بصلاحيات المالك فقط
+        """
+        if not self._fernet or not self.cache_file:
+            return
+        payload = json.dumps({"project_id": self.project_id, "secrets": self._values})
+        token = self._fernet.encrypt(payload.encode())
+        directory = os.path.dirname(os.path.abspath(self.cache_file))
+        try:
+            fd, path = tempfile.mkstemp(dir=directory, prefix=".secrets-")
+            with os.fdopen(fd, "wb") as f:
+                f.write(token)
+            os.chmod(path, 0o600)
+            os.replace(path, self.cache_file)
+        except OSError as e:
+            logger.warning(f"فشل في كتابة cache الأسرار: {e}")
+
     def create_secret(self, secret_name: str, secret_value: str) -> bool:
         """
         إنشاء سر جديد في Google Secret Manager
@@ -88,6 +443,8 @@ class SecretsManager:
             logger.warning("Secret Manager غير متاح، لا يمكن إنشاء أسرار جديدة")
             return False
 
+        from google.api_core import exceptions
+
         try:
             parent = f"projects/{self.project_id}"
 
@@ -138,3 +495,39 @@ def get_secret(secret_name: str, default: str = None) -> str:
     """
     secret_value = secrets_manager.get_secret(secret_name)
     return secret_value or default or ""
+
+
+def get_versioned_secret(secret_name: str) -> Optional[VersionedSecret]:
+    """
+    دالة مساعدة للحصول على سر متابَع بإصداريه الحالي والسابق
+
+    Args:
+        secret_name: اسم السر
+
+    Returns:
+        VersionedSecret أو None إذا كان Secret Manager غير متاح
+    """
+    return secrets_manager.get_versioned_secret(secret_name)
+
+
+def refresh_versioned_secret(secret_name: str) -> Optional[VersionedSecret]:
+    """
+    دالة مساعدة لإعادة جلب سر متابَع فوراً (محدودة المعدل)
+
+    Args:
+        secret_name: اسم السر
+
+    Returns:
+        VersionedSecret أو None إذا كان Secret Manager غير متاح
+    """
+    return secrets_manager.refresh_versioned_secret(secret_name)
+
+
+def prefetch_secrets(secret_names: Iterable[str]) -> None:
+    """
+    دالة مساعدة لجلب الأسرار المطلوبة عند بدء التشغيل دفعة واحدة
+
+    Args:
+        secret_names: أسماء الأسرار المطلوبة
+    """
+    secrets_manager.prefetch(secret_names)
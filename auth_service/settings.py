@@ -14,8 +14,23 @@ import os
 from pathlib import Path
 
 from decouple import config
-
-from .secrets_manager import get_secret
+from django.core.exceptions import ImproperlyConfigured
+
+from .secrets_manager import get_secret, prefetch_secrets
+
+# جلب جميع الأسرار المطلوبة بالتوازي (أو من cache المحلي) قبل استخدامها
+prefetch_secrets(
+    [
+        "DJANGO_SECRET_KEY",
+        "DB_NAME",
+        "DB_USER",
+        "DB_PASSWORD",
+        "DB_HOST",
+        "DB_PORT",
+        "JWT_SECRET_KEY",
+        "INTROSPECTION_SERVICE_TOKEN",
+    ]
+)
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -51,7 +66,6 @@ INSTALLED_APPS = [
     "rest_framework",
     "corsheaders",
     "django_extensions",
-    "django_ratelimit",
     "drf_spectacular",
     "authentication",
 ]
@@ -60,14 +74,23 @@ MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
+    # يحسب IP ومعرف الطلب واسم المسار مرة واحدة لبقية الطبقات
+    "authentication.middleware.RequestContextMiddleware",
+    # ترويسة Server-Timing لأزمنة المراحل (تُحمّل فقط عند SERVER_TIMING_ENABLED)
+    "authentication.timing.ServerTimingMiddleware",
     "authentication.monitoring.MonitoringMiddleware",
+    "authentication.query_budget.QueryBudgetMiddleware",
+    # يوجه قراءات views القراءة فقط إلى الـ replica (يُحمّل فقط عند READ_REPLICA_ENABLED)
+    "authentication.db_routing.ReadReplicaMiddleware",
     "authentication.middleware.SecurityMiddleware",
     "authentication.middleware.LoginAttemptMiddleware",
-    "django.contrib.sessions.middleware.SessionMiddleware",
+    "authentication.middleware.RateLimitMiddleware",
+    # الجلسات و CSRF والرسائل تُتخطى لمسارات /api/ (مصادقة JWT)
+    "authentication.middleware.WebSessionMiddleware",
     "django.middleware.common.CommonMiddleware",
-    "django.middleware.csrf.CsrfViewMiddleware",
-    "django.contrib.auth.middleware.AuthenticationMiddleware",
-    "django.contrib.messages.middleware.MessageMiddleware",
+    "authentication.middleware.WebCsrfViewMiddleware",
+    "authentication.middleware.WebAuthenticationMiddleware",
+    "authentication.middleware.WebMessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
@@ -96,9 +119,38 @@ WSGI_APPLICATION = "auth_service.wsgi.application"
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
 # استخدام PostgreSQL في جميع البيئات (التطوير والإنتاج)
+# نسخة قراءة (streaming replica) لـ views القراءة فقط، انظر authentication.db_routing
+DB_REPLICA_HOST = config("DB_REPLICA_HOST", default="")
+READ_REPLICA_ENABLED = bool(DB_REPLICA_HOST)
+
+# مع DB_POOL_ENABLED تُستعار الاتصالات من مجمّع لكل عامل وتُعاد بنهاية كل طلب.
+# DB_POOL_MAX_CONNECTIONS يُقسم على قواعد البيانات (default والـ replica) ثم على
+# عمال gunicorn، ولا يقل مجمّع العامل عن عدد خيوطه حتى لا ينتظر خيط اتصالاً؛
+# لذلك يجب ألا يقل الحد عن العمال × الخيوط لكل قاعدة، وإلا يتوقف التشغيل.
+DB_POOL_ENABLED = config("DB_POOL_ENABLED", default=True, cast=bool)
+DB_POOL_MAX_CONNECTIONS = config("DB_POOL_MAX_CONNECTIONS", default=20, cast=int)
+_db_aliases = 2 if READ_REPLICA_ENABLED else 1
+_gunicorn_workers = int(os.getenv("GUNICORN_WORKERS", 1))
+DB_POOL_SIZE = max(
+    int(os.getenv("GUNICORN_THREADS", 1)),
+    DB_POOL_MAX_CONNECTIONS // _db_aliases // _gunicorn_workers,
+)
+if DB_POOL_ENABLED and DB_POOL_SIZE * _db_aliases * _gunicorn_workers > (
+    DB_POOL_MAX_CONNECTIONS
+):
+    raise ImproperlyConfigured(
+        f"DB_POOL_MAX_CONNECTIONS={DB_POOL_MAX_CONNECTIONS} is below "
+        f"{_gunicorn_workers} workers x {DB_POOL_SIZE} connections x "
+        f"{_db_aliases} database(s); raise it or lower GUNICORN_WORKERS/THREADS"
+    )
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": (
+            "auth_service.db_pool"
+            if DB_POOL_ENABLED
+            else "django.db.backends.postgresql"
+        ),
         "NAME": get_secret("DB_NAME", config("DB_NAME", default="naebak_auth")),
         "USER": get_secret("DB_USER", config("DB_USER", default="postgres")),
         "PASSWORD": get_secret("DB_PASSWORD", config("DB_PASSWORD", default="")),
@@ -107,10 +159,37 @@ DATABASES = {
         "OPTIONS": {
             "connect_timeout": 60,
         },
-        "CONN_MAX_AGE": 600,
+        "CONN_MAX_AGE": 0 if DB_POOL_ENABLED else 600,
+        "POOL": {
+            "MAX_SIZE": DB_POOL_SIZE,
+            "TIMEOUT": config("DB_POOL_TIMEOUT", default=5, cast=int),
+        },
     }
 }
 
+if READ_REPLICA_ENABLED:
+    DATABASES["replica"] = dict(
+        DATABASES["default"],
+        HOST=DB_REPLICA_HOST,
+        PORT=config("DB_REPLICA_PORT", default=DATABASES["default"]["PORT"], cast=int),
+        # الاختبارات لا تنشئ قاعدة على الـ replica بل تستخدم default
+        TEST={"MIRROR": "default"},
+    )
+
+DATABASE_ROUTERS = ["authentication.db_routing.ReplicaRouter"]
+
+# مدة تثبيت العميل على default بعد الكتابة (أكبر من تأخر النسخ المتوقع)
+REPLICA_STICKY_SECONDS = config("REPLICA_STICKY_SECONDS", default=5, cast=int)
+
+
+# نفس PBKDF2 الافتراضي مع قياس زمن التجزئة ضمن Server-Timing
+PASSWORD_HASHERS = [
+    "authentication.timing.TimedPBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+]
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -152,71 +231,84 @@ USE_I18N = True
 USE_TZ = True
 
 # Logging Configuration
+# خيوط الطلبات تضيف السجلات إلى طابور فقط، والتنسيق والكتابة في خيط خلفي
+LOG_QUEUE_SIZE = config("LOG_QUEUE_SIZE", default=10000, cast=int)
+
+# أخذ عينات من سجلات INFO الروتينية للطلبات (لكل عملية)
+LOG_SAMPLING_RATE = config("LOG_SAMPLING_RATE", default=1.0, cast=float)
+LOG_SAMPLING_TARGET_PER_SECOND = config(
+    "LOG_SAMPLING_TARGET_PER_SECOND", default=50, cast=int
+)
+LOG_SAMPLING_SLOW_THRESHOLD = config(
+    "LOG_SAMPLING_SLOW_THRESHOLD", default=1.0, cast=float
+)
+
+# قياس أزمنة المراحل في ترويسة Server-Timing وفي Prometheus
+SERVER_TIMING_ENABLED = config("SERVER_TIMING_ENABLED", default=False, cast=bool)
+
+# فاحص الاعتماديات الخلفي لمسار readiness (بالثواني)
+HEALTH_CHECK_INTERVAL = config("HEALTH_CHECK_INTERVAL", default=10, cast=int)
+HEALTH_CHECK_TIMEOUT = config("HEALTH_CHECK_TIMEOUT", default=2, cast=float)
+
+# views غير متزامنة للمسارات الساخنة تحت ASGI (اختيارية، انظر gunicorn.conf.py)
+ASYNC_VIEWS_ENABLED = config("ASYNC_VIEWS_ENABLED", default=False, cast=bool)
+
+# رفع استثناء عند تجاوز ميزانية استعلامات SQL بدلاً من تسجيله فقط
+QUERY_BUDGET_STRICT = config("QUERY_BUDGET_STRICT", default=False, cast=bool)
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
-    "formatters": {
-        "json": {
-            "()": "pythonjsonlogger.jsonlogger.JsonFormatter",
-            "format": "%(asctime)s %(name)s %(levelname)s %(message)s %(pathname)s %(lineno)d",
-        },
-        "verbose": {
-            "format": "{levelname} {asctime} {module} {process:d} {thread:d} {message}",
-            "style": "{",
-        },
-        "simple": {
-            "format": "{levelname} {message}",
-            "style": "{",
+    "filters": {
+        "sampling": {
+            "()": "auth_service.log_handlers.AdaptiveSamplingFilter",
+            "rate": LOG_SAMPLING_RATE,
+            "target_per_second": LOG_SAMPLING_TARGET_PER_SECOND,
+            "slow_threshold": LOG_SAMPLING_SLOW_THRESHOLD,
         },
     },
     "handlers": {
-        "console": {
+        "default": {
             "level": "INFO",
-            "class": "logging.StreamHandler",
-            "formatter": "json" if not DEBUG else "verbose",
-        },
-        "file": {
-            "level": "INFO",
-            "class": "logging.handlers.RotatingFileHandler",
-            "filename": "logs/auth_service.log",
-            "maxBytes": 1024 * 1024 * 15,  # 15MB
-            "backupCount": 10,
-            "formatter": "json",
+            "filters": ["sampling"],
+            "()": "auth_service.log_handlers.QueueLogHandler",
+            "filename": BASE_DIR / "logs" / "auth_service.log",
+            "console_format": "json" if not DEBUG else "verbose",
+            "queue_size": LOG_QUEUE_SIZE,
         },
         "security": {
             "level": "WARNING",
-            "class": "logging.handlers.RotatingFileHandler",
-            "filename": "logs/security.log",
-            "maxBytes": 1024 * 1024 * 15,  # 15MB
-            "backupCount": 10,
-            "formatter": "json",
+            "()": "auth_service.log_handlers.QueueLogHandler",
+            "filename": BASE_DIR / "logs" / "security.log",
+            "console_format": "json" if not DEBUG else "verbose",
+            "queue_size": LOG_QUEUE_SIZE,
         },
     },
     "loggers": {
         "django": {
-            "handlers": ["console", "file"],
+            "handlers": ["default"],
             "level": "INFO",
             "propagate": False,
         },
         "authentication": {
-            "handlers": ["console", "file"],
+            "handlers": ["default"],
             "level": "INFO",
             "propagate": False,
         },
         "security": {
-            "handlers": ["console", "security"],
+            "handlers": ["security"],
             "level": "WARNING",
             "propagate": False,
         },
         "django.security": {
-            "handlers": ["console", "security"],
+            "handlers": ["security"],
             "level": "WARNING",
             "propagate": False,
         },
     },
     "root": {
         "level": "INFO",
-        "handlers": ["console"],
+        "handlers": ["default"],
     },
 }
 
@@ -240,6 +332,16 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    # orjson بدل json من المكتبة القياسية (انظر authentication.renderers)
+    "DEFAULT_RENDERER_CLASSES": [
+        "authentication.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "authentication.renderers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 20,
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
@@ -291,20 +393,39 @@ REDIS_URL = config("REDIS_URL", default="redis://localhost:6379/0")
 
 CACHES = {
     "default": {
-        "BACKEND": "django_redis.cache.RedisCache",
+        # L1 داخل العملية أمام Redis لمفاتيح القراءة الكثيرة، انظر tiered_cache
+        "BACKEND": "authentication.tiered_cache.TieredRedisCache",
         "LOCATION": REDIS_URL,
         "OPTIONS": {
-            "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            "CLIENT_CLASS": "authentication.timing.TimedRedisClient",
+            # مهلة قصيرة حتى لا ينتظر الطلب طويلاً قبل أن يفتح redis_breaker
+            "SOCKET_CONNECT_TIMEOUT": 0.5,
+            "SOCKET_TIMEOUT": 0.5,
+            "L1_KEY_PREFIXES": [
+                "response_cache:",
+                "django.contrib.sessions.cached_db",
+                "user_profile:",
+            ],
+            "L1_MAX_ENTRIES": config("CACHE_L1_MAX_ENTRIES", default=1000, cast=int),
+            "L1_TIMEOUT": config("CACHE_L1_TIMEOUT", default=5, cast=int),
         },
         "KEY_PREFIX": "naebak_auth",
         "TIMEOUT": 300,  # 5 minutes default timeout
     }
 }
 
-# استخدام Redis للجلسات
-SESSION_ENGINE = "django.contrib.sessions.backends.cache"
+# الجلسات في Redis مع نسخة في قاعدة البيانات تبقى متاحة عند تعطل Redis
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
 SESSION_CACHE_ALIAS = "default"
 
+# قاطع دائرة Redis: عدد الأخطاء المتتالية قبل الفتح ومدة الفتح بالثواني
+REDIS_BREAKER_FAILURE_THRESHOLD = config(
+    "REDIS_BREAKER_FAILURE_THRESHOLD", default=5, cast=int
+)
+REDIS_BREAKER_RESET_TIMEOUT = config(
+    "REDIS_BREAKER_RESET_TIMEOUT", default=10, cast=int
+)
+
 # JWT Configuration
 JWT_SECRET_KEY = get_secret(
     "JWT_SECRET_KEY",
@@ -315,6 +436,38 @@ JWT_ACCESS_TOKEN_LIFETIME = config("JWT_ACCESS_TOKEN_LIFETIME", default=3600, ca
 JWT_REFRESH_TOKEN_LIFETIME = config(
     "JWT_REFRESH_TOKEN_LIFETIME", default=86400, cast=int
 )
+# مدة قبول مفتاح JWT السابق بعد تدويره في Secret Manager
+JWT_KEY_GRACE_PERIOD = config(
+    "JWT_KEY_GRACE_PERIOD", default=JWT_REFRESH_TOKEN_LIFETIME, cast=int
+)
+# رمز الخدمات الداخلية لمسار فحص الرموز (فارغ: رموز وصول المستخدمين فقط)
+INTROSPECTION_SERVICE_TOKEN = get_secret(
+    "INTROSPECTION_SERVICE_TOKEN", config("INTROSPECTION_SERVICE_TOKEN", default="")
+)
+
+# عدد الـ reverse proxies الموثوقة أمام الخدمة (nginx)؛ IP العميل هو العنوان
+# الذي أضافه أبعدها في X-Forwarded-For. 0: استخدام REMOTE_ADDR فقط
+TRUSTED_PROXY_COUNT = config("TRUSTED_PROXY_COUNT", default=1, cast=int)
+
+# Login throttling (نافذة منزلقة لكل IP ولكل حساب)
+LOGIN_THROTTLE_WINDOW = config("LOGIN_THROTTLE_WINDOW", default=900, cast=int)
+LOGIN_THROTTLE_IP_LIMIT = config("LOGIN_THROTTLE_IP_LIMIT", default=5, cast=int)
+LOGIN_THROTTLE_ACCOUNT_LIMIT = config(
+    "LOGIN_THROTTLE_ACCOUNT_LIMIT", default=10, cast=int
+)
+
+# Rate limiting (دلو رموز لكل مسار، بنطاق ip أو account)
+RATE_LIMIT_ENABLED = config("RATE_LIMIT_ENABLED", default=True, cast=bool)
+RATE_LIMIT_RULES = {
+    "register": [("ip", "3/m")],
+    "login": [("ip", "5/m"), ("account", "10/m")],
+    "google_auth": [("ip", "10/m")],
+    "forgot_password": [("ip", "2/m"), ("account", "5/h")],
+    "reset_password": [("ip", "5/m")],
+    "verify_email": [("ip", "10/m")],
+    "resend_verification": [("ip", "2/m"), ("account", "5/h")],
+    "introspect_token": [("ip", "60/m")],
+}
 
 # Custom User Model
 AUTH_USER_MODEL = "authentication.User"
@@ -337,50 +490,5 @@ FRONTEND_URL = config("FRONTEND_URL", default="http://localhost:3000")
 GOOGLE_OAUTH2_CLIENT_ID = config("GOOGLE_OAUTH2_CLIENT_ID", default="")
 GOOGLE_OAUTH2_CLIENT_SECRET = config("GOOGLE_OAUTH2_CLIENT_SECRET", default="")
 
-# Logging Configuration
-LOGGING = {
-    "version": 1,
-    "disable_existing_loggers": False,
-    "formatters": {
-        "verbose": {
-            "format": "{levelname} {asctime} {module} {process:d} {thread:d} {message}",
-            "style": "{",
-        },
-        "simple": {
-            "format": "{levelname} {message}",
-            "style": "{",
-        },
-    },
-    "handlers": {
-        "file": {
-            "level": "INFO",
-            "class": "logging.FileHandler",
-            "filename": BASE_DIR / "logs" / "auth_service.log",
-            "formatter": "verbose",
-        },
-        "console": {
-            "level": "DEBUG",
-            "class": "logging.StreamHandler",
-            "formatter": "simple",
-        },
-    },
-    "root": {
-        "handlers": ["console", "file"],
-        "level": "INFO",
-    },
-    "loggers": {
-        "django": {
-            "handlers": ["console", "file"],
-            "level": "INFO",
-            "propagate": False,
-        },
-        "authentication": {
-            "handlers": ["console", "file"],
-            "level": "INFO",
-            "propagate": False,
-        },
-    },
-}
-
 # Create logs directory if it doesn't exist
 os.makedirs(BASE_DIR / "logs", exist_ok=True)
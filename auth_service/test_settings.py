@@ -3,9 +3,6 @@
 """
 from .settings import *
 
-# إزالة django_ratelimit من INSTALLED_APPS للاختبارات
-INSTALLED_APPS = [app for app in INSTALLED_APPS if app != 'django_ratelimit']
-
 # إزالة middleware الخاص بـ rate limiting
 MIDDLEWARE = [
     middleware for middleware in MIDDLEWARE 
@@ -24,9 +21,18 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': ':memory:',
-    }
+    },
+    # قاعدة محلية ثانية منفصلة تقوم مقام الـ replica في اختبارات التوجيه
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+        'REPLICA_STANDIN': True,
+    },
 }
 
+# التوجيه إلى الـ replica يُفعّل فقط في اختبارات التوجيه
+READ_REPLICA_ENABLED = False
+
 
 
 # تعطيل التسجيل أثناء الاختبارات
@@ -44,7 +50,10 @@ LOGGING = {
 }
 
 # تعطيل Rate Limiting للاختبارات
-RATELIMIT_ENABLE = False
+RATE_LIMIT_ENABLED = False
+
+# فشل الاختبارات عند تجاوز ميزانية استعلامات SQL لأي view
+QUERY_BUDGET_STRICT = True
 
 # إعدادات أمان مبسطة للاختبارات
 SECRET_KEY = 'test-secret-key-for-testing-only'
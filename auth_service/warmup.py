@@ -0,0 +1,95 @@
+"""
+تهيئة العامل بعد fork حتى لا يدفع أول طلب كلفة فتح الاتصالات وملء الذاكرة
+"""
+
+import logging
+import time
+from functools import partial
+
+logger = logging.getLogger(__name__)
+
+
+def _warm_database(threaded=False):
+    from django.db import connections
+
+    for connection in connections.all():
+        if getattr(connection, "pooled", False):
+            # يبقى الاتصال خاملاً في المجمّع لأول طلب من أي خيط
+            connection.ensure_connection()
+            connection.close()
+        elif not threaded:
+            # اتصال غير مُجمّع يخص هذا الخيط فقط
+            connection.ensure_connection()
+
+
+def _warm_cache():
+    from django.core.cache import cache
+
+    cache.get("warmup")
+    if hasattr(cache, "start_listener"):
+        # الاشتراك في قناة إبطال L1 قبل أول طلب
+        cache.start_listener()
+
+
+def _warm_jwt_keys():
+    from authentication.authentication import get_jwt_keys
+
+    get_jwt_keys()
+
+
+def _warm_urls():
+    from django.urls import get_resolver
+
+    # يستورد جميع الـ views ويبني جداول المطابقة
+    get_resolver().reverse_dict
+
+
+def _warm_health_checker():
+    from authentication.health import health_checker
+
+    health_checker.start()
+
+
+WARMUP_STEPS = {
+    "database": _warm_database,
+    "cache": _warm_cache,
+    "jwt_keys": _warm_jwt_keys,
+    "urls": _warm_urls,
+    "health_checker": _warm_health_checker,
+}
+
+
+def warm_up_worker(threaded=False):
+    """
+    فتح اتصالات قاعدة البيانات و Redis وتحميل مفاتيح JWT ومسارات URL
+
+    فشل أي خطوة يُسجل فقط؛ العامل يبقى قادراً على فتح الاتصالات عند الطلب.
+
+    Args:
+        threaded: الطلبات لا تُخدم في الخيط الحالي (عمال gthread و uvicorn)،
+            فلا تُفتح إلا اتصالات المجمّع المشتركة بين الخيوط
+
+    Returns:
+        زمن كل خطوة بالثواني (None للخطوات الفاشلة)
+    """
+    steps = dict(WARMUP_STEPS, database=partial(_warm_database, threaded=threaded))
+    timings = {}
+    for name, step in steps.items():
+        start = time.perf_counter()
+        try:
+            step()
+            timings[name] = time.perf_counter() - start
+        except Exception as e:
+            timings[name] = None
+            logger.warning(f"Worker warmup step {name} failed: {str(e)}")
+
+    logger.info(
+        "Worker warmed up: "
+        + ", ".join(
+            f"{name}={duration * 1000:.1f}ms"
+            if duration is not None
+            else f"{name}=failed"
+            for name, duration in timings.items()
+        )
+    )
+    return timings
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "auth_service.settings")
 
 application = get_wsgi_application()
+
+# liveness و readiness يُجاب عليهما قبل Django (انظر authentication.health)
+from authentication.health import HealthProbeMiddleware  # noqa: E402
+
+application = HealthProbeMiddleware(application)
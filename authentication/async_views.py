@@ -0,0 +1,193 @@
+"""
+views غير متزامنة للمسارات الساخنة عند التشغيل تحت ASGI (عمال uvicorn)
+
+تعيد نفس الاستجابات التي تعيدها views في views.py، لكن بدون DRF وبدون
+انتقال إلى خيط لكل طلب: المصادقة والاستعلامات عبر async ORM.
+
+لأنها لا تمر عبر APIView فإن إعدادات REST_FRAMEWORK لا تنطبق عليها:
+- الاستجابات JSON فقط (لا تفاوض على renderer ولا واجهة قابلة للتصفح)
+- الأخطاء تُبنى هنا مباشرة ولا يُستدعى EXCEPTION_HANDLER
+- لا DEFAULT_THROTTLE_CLASSES ولا DEFAULT_PERMISSION_CLASSES؛ المصادقة صريحة
+  في كل view، وتحديد المعدل من RateLimitMiddleware و RATE_LIMIT_RULES فقط
+"""
+
+import hmac
+import json
+import logging
+
+import jwt
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.http import HttpResponseNotAllowed, JsonResponse
+from rest_framework.exceptions import AuthenticationFailed
+
+from .authentication import AsyncJWTAuthentication, JWTTokenGenerator, adecode_token
+from .db_routing import read_replica
+from .health import health_checker
+from .models import RefreshToken
+from .profile_cache import aprofile_response
+from .query_budget import query_budget
+from .serializers import RefreshTokenSerializer
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+authentication = AsyncJWTAuthentication()
+
+
+def _parse_json(request):
+    try:
+        return json.loads(request.body or b"{}")
+    except ValueError:
+        return None
+
+
+def _invalid_data(errors):
+    return JsonResponse({"message": "بيانات غير صحيحة", "errors": errors}, status=400)
+
+
+@read_replica
+@query_budget(1)
+async def user_info(request):
+    """
+    الحصول على معلومات المستخدم الحالي
+    """
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+
+    try:
+        result = await authentication.authenticate(request)
+    except AuthenticationFailed as e:
+        return JsonResponse({"detail": str(e.detail)}, status=403)
+    if result is None:
+        return JsonResponse(
+            {"detail": "Authentication credentials were not provided."}, status=403
+        )
+
+    user, _ = result
+    return await aprofile_response(request, user, envelope="user")
+
+
+@query_budget(2)
+async def refresh_token(request):
+    """
+    تحديث رمز الوصول
+    """
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+
+    data = _parse_json(request)
+    if data is None:
+        return _invalid_data({"non_field_errors": ["Invalid JSON"]})
+
+    serializer = RefreshTokenSerializer(data=data)
+    if not serializer.is_valid():
+        return _invalid_data(serializer.errors)
+
+    try:
+        tokens = await JWTTokenGenerator.arefresh_access_token(
+            serializer.validated_data["refresh_token"]
+        )
+    except Exception as e:
+        return JsonResponse(
+            {"message": "فشل في تحديث الرمز", "error": str(e)}, status=401
+        )
+
+    return JsonResponse({"message": "تم تحديث الرمز بنجاح", "tokens": tokens})
+
+
+async def health_check(request):
+    """
+    فحص صحة الخدمة الشامل من آخر نتائج الفاحص الخلفي
+    """
+    health_data = health_checker.snapshot()
+    status_code = 503 if health_data["status"] == "unhealthy" else 200
+
+    health_data.update(
+        {
+            "service": "naebak-auth-service",
+            "version": "2.0.0",
+        }
+    )
+
+    return JsonResponse(health_data, status=status_code)
+
+
+async def _is_introspection_caller(request):
+    """
+    مصادقة مستدعي فحص الرموز (RFC 7662، القسم 2.1): رمز الخدمات الداخلية
+    INTROSPECTION_SERVICE_TOKEN أو رمز وصول مستخدم نشط
+    """
+    auth_header = request.META.get("HTTP_AUTHORIZATION", "")
+    if not auth_header.startswith("Bearer "):
+        return False
+
+    service_token = settings.INTROSPECTION_SERVICE_TOKEN
+    if service_token and hmac.compare_digest(
+        auth_header[len("Bearer ") :].encode(), service_token.encode()
+    ):
+        return True
+
+    try:
+        return await authentication.authenticate(request) is not None
+    except AuthenticationFailed:
+        return False
+
+
+@query_budget(2)
+async def introspect_token(request):
+    """
+    فحص رمز وصول أو تحديث وإرجاع حالته (على نمط RFC 7662)
+
+    يتطلب مستدعياً مصادقاً (انظر _is_introspection_caller). الرمز نشط إذا
+    كان توقيعه صالحاً وغير منتهٍ، ومستخدمه نشطاً (رمز الوصول) أو لم يُلغَ في
+    قاعدة البيانات (رمز التحديث).
+    """
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+
+    if not await _is_introspection_caller(request):
+        response = JsonResponse(
+            {"detail": "Authentication credentials were not provided."}, status=401
+        )
+        response["WWW-Authenticate"] = 'Bearer realm="api"'
+        return response
+
+    data = _parse_json(request)
+    token = data.get("token") if isinstance(data, dict) else None
+    if not token:
+        return _invalid_data({"token": ["This field is required."]})
+
+    inactive = JsonResponse({"active": False})
+    try:
+        payload = await adecode_token(token)
+    except jwt.InvalidTokenError:
+        return inactive
+
+    token_type = payload.get("type")
+    if token_type == "access":
+        active = await User.objects.filter(
+            id=payload.get("user_id"), is_active=True
+        ).aexists()
+    elif token_type == "refresh":
+        active = await RefreshToken.objects.filter(
+            user_id=payload.get("user_id"),
+            token=payload.get("token_id"),
+            is_revoked=False,
+            user__is_active=True,
+        ).aexists()
+    else:
+        active = False
+
+    if not active:
+        return inactive
+
+    return JsonResponse(
+        {
+            "active": True,
+            "token_type": token_type,
+            "user_id": payload.get("user_id"),
+            "exp": payload.get("exp"),
+            "iat": payload.get("iat"),
+        }
+    )
@@ -2,16 +2,97 @@ import uuid
 from datetime import datetime, timedelta
 
 import jwt
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 
+from auth_service.secrets_manager import get_versioned_secret, refresh_versioned_secret
+
 from .models import RefreshToken
+from .timing import span
 
 User = get_user_model()
 
 
+def get_jwt_keys(refresh=False):
+    """
+    مفاتيح JWT المقبولة كقائمة (kid، المفتاح): الحالي أولاً، ثم السابق
+    خلال JWT_KEY_GRACE_PERIOD بعد التدوير
+
+    مع refresh يُعاد جلب السر فوراً (محدود المعدل) بدل انتظار التحديث الدوري.
+    """
+    if refresh:
+        secret = refresh_versioned_secret("JWT_SECRET_KEY")
+    else:
+        secret = get_versioned_secret("JWT_SECRET_KEY")
+    if secret is None or not secret.value:
+        return [(None, settings.JWT_SECRET_KEY)]
+    return secret.keys(settings.JWT_KEY_GRACE_PERIOD)
+
+
+def encode_token(payload):
+    """
+    توقيع الرمز بالمفتاح الحالي مع رقم إصداره في ترويسة kid
+    """
+    kid, key = get_jwt_keys()[0]
+    with span("jwt"):
+        return jwt.encode(
+            payload,
+            key,
+            algorithm=settings.JWT_ALGORITHM,
+            headers={"kid": kid} if kid else None,
+        )
+
+
+def _is_unknown_kid(kid, keys):
+    return bool(kid) and all(key_id != kid for key_id, _ in keys)
+
+
+def _decode_with_keys(token, kid, keys):
+    candidates = [key for key_id, key in keys if kid and key_id == kid] or [
+        key for _, key in keys
+    ]
+    for key in candidates[:-1]:
+        try:
+            return jwt.decode(token, key, algorithms=[settings.JWT_ALGORITHM])
+        except jwt.InvalidSignatureError:
+            continue
+    return jwt.decode(token, candidates[-1], algorithms=[settings.JWT_ALGORITHM])
+
+
+def decode_token(token):
+    """
+    التحقق من الرمز بالمفتاح المطابق لـ kid، أو بتجربة المفاتيح المقبولة
+    للرموز الصادرة دون kid
+
+    kid غير معروف يعني غالباً أن عاملاً آخر اكتشف التدوير قبل هذا العامل،
+    فيُعاد جلب المفتاح فوراً قبل الرفض.
+    """
+    with span("jwt"):
+        keys = get_jwt_keys()
+        kid = jwt.get_unverified_header(token).get("kid")
+        if _is_unknown_kid(kid, keys):
+            keys = get_jwt_keys(refresh=True)
+        return _decode_with_keys(token, kid, keys)
+
+
+async def adecode_token(token):
+    """
+    نظير decode_token لحلقة الأحداث
+
+    إعادة جلب المفتاح عند kid غير معروف طلب شبكة إلى Secret Manager، فتُنفذ
+    في خيط حتى لا يوقف رمز بـ kid مختلق حلقة أحداث العامل كلها.
+    """
+    with span("jwt"):
+        keys = get_jwt_keys()
+        kid = jwt.get_unverified_header(token).get("kid")
+        if _is_unknown_kid(kid, keys):
+            keys = await sync_to_async(get_jwt_keys)(refresh=True)
+        return _decode_with_keys(token, kid, keys)
+
+
 class JWTAuthentication(BaseAuthentication):
     """
     نظام المصادقة باستخدام JWT
@@ -26,9 +107,7 @@ class JWTAuthentication(BaseAuthentication):
         token = auth_header.split(" ")[1]
 
         try:
-            payload = jwt.decode(
-                token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM]
-            )
+            payload = decode_token(token)
 
             user_id = payload.get("user_id")
             if not user_id:
@@ -49,6 +128,41 @@ class JWTAuthentication(BaseAuthentication):
             raise AuthenticationFailed("User not found")
 
 
+class AsyncJWTAuthentication:
+    """
+    نظير JWTAuthentication للـ views غير المتزامنة باستخدام async ORM
+    """
+
+    async def authenticate(self, request):
+        auth_header = request.META.get("HTTP_AUTHORIZATION")
+
+        if not auth_header or not auth_header.startswith("Bearer "):
+            return None
+
+        token = auth_header.split(" ")[1]
+
+        try:
+            payload = await adecode_token(token)
+
+            user_id = payload.get("user_id")
+            if not user_id:
+                raise AuthenticationFailed("Invalid token payload")
+
+            user = await User.objects.aget(id=user_id)
+
+            if not user.is_active:
+                raise AuthenticationFailed("User account is disabled")
+
+            return (user, token)
+
+        except jwt.ExpiredSignatureError:
+            raise AuthenticationFailed("Token has expired")
+        except jwt.InvalidTokenError:
+            raise AuthenticationFailed("Invalid token")
+        except User.DoesNotExist:
+            raise AuthenticationFailed("User not found")
+
+
 class JWTTokenGenerator:
     """
     مولد رموز JWT
@@ -69,9 +183,7 @@ class JWTTokenGenerator:
             "type": "access",
         }
 
-        return jwt.encode(
-            payload, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM
-        )
+        return encode_token(payload)
 
     @staticmethod
     def generate_refresh_token(user):
@@ -90,9 +202,7 @@ class JWTTokenGenerator:
             "type": "refresh",
         }
 
-        token = jwt.encode(
-            payload, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM
-        )
+        token = encode_token(payload)
 
         # حفظ الرمز في قاعدة البيانات
         RefreshToken.objects.create(
@@ -125,11 +235,7 @@ class JWTTokenGenerator:
         تحديث رمز الوصول باستخدام رمز التحديث
         """
         try:
-            payload = jwt.decode(
-                refresh_token,
-                settings.JWT_SECRET_KEY,
-                algorithms=[settings.JWT_ALGORITHM],
-            )
+            payload = decode_token(refresh_token)
 
             if payload.get("type") != "refresh":
                 raise AuthenticationFailed("Invalid token type")
@@ -169,17 +275,53 @@ class JWTTokenGenerator:
         except User.DoesNotExist:
             raise AuthenticationFailed("User not found")
 
+    @staticmethod
+    async def arefresh_access_token(refresh_token):
+        """
+        نظير refresh_access_token غير المتزامن
+        """
+        try:
+            payload = await adecode_token(refresh_token)
+
+            if payload.get("type") != "refresh":
+                raise AuthenticationFailed("Invalid token type")
+
+            user_id = payload.get("user_id")
+            token_id = payload.get("token_id")
+
+            refresh_token_obj = await RefreshToken.objects.select_related("user").aget(
+                user_id=user_id, token=token_id, is_revoked=False
+            )
+
+            if refresh_token_obj.is_expired():
+                await refresh_token_obj.arevoke()
+                raise AuthenticationFailed("Refresh token has expired")
+
+            user = refresh_token_obj.user
+
+            if not user.is_active:
+                raise AuthenticationFailed("User account is disabled")
+
+            return {
+                "access_token": JWTTokenGenerator.generate_access_token(user),
+                "token_type": "Bearer",
+                "expires_in": settings.JWT_ACCESS_TOKEN_LIFETIME,
+            }
+
+        except jwt.ExpiredSignatureError:
+            raise AuthenticationFailed("Refresh token has expired")
+        except jwt.InvalidTokenError:
+            raise AuthenticationFailed("Invalid refresh token")
+        except RefreshToken.DoesNotExist:
+            raise AuthenticationFailed("Refresh token not found or revoked")
+
     @staticmethod
     def revoke_refresh_token(refresh_token):
         """
         إلغاء رمز التحديث
         """
         try:
-            payload = jwt.decode(
-                refresh_token,
-                settings.JWT_SECRET_KEY,
-                algorithms=[settings.JWT_ALGORITHM],
-            )
+            payload = decode_token(refresh_token)
 
             token_id = payload.get("token_id")
 
@@ -0,0 +1,147 @@
+"""
+تخزين مؤقت لاستجابات نقاط النهاية العامة مع الحماية من التدافع
+"""
+
+import functools
+import logging
+import math
+import random
+import time
+
+from django.core.cache import cache
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+
+def _cache_call(method, *args, default=None):
+    """
+    استدعاء cache مع تجاهل أعطال الاتصال حتى لا يتعطل العرض
+    """
+    try:
+        return getattr(cache, method)(*args)
+    except Exception as e:
+        logger.warning(f"Response cache {method} failed: {str(e)}")
+        return default
+
+
+def _should_recompute(entry, beta):
+    """
+    انتهاء صلاحية احتمالي مبكر (XFetch)
+
+    كلما اقترب موعد الانتهاء وطال زمن الحساب، زاد احتمال إعادة الحساب
+    المبكر من طلب واحد قبل أن تنتهي الصلاحية لدى الجميع في آن واحد.
+    """
+    now = time.time()
+    return (
+        now - entry["delta"] * beta * math.log(1.0 - random.random())
+        >= entry["expires_at"]
+    )
+
+
+def _build_response(entry, cache_status):
+    response = Response(entry["data"], status=entry["status"])
+    response["X-Cache"] = cache_status
+    return response
+
+
+def _wait_for_entry(key, wait_timeout):
+    """
+    انتظار نسخة يخزنها الطلب الحامل للقفل، أو None عند انتهاء المهلة
+    """
+    deadline = time.monotonic() + wait_timeout
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        entry = _cache_call("get", key)
+        if entry:
+            return entry
+    return None
+
+
+def _revalidate(recompute, key, entry, lock_timeout, wait_timeout):
+    """
+    إعادة الحساب من طلب واحد فقط (single-flight) مع خدمة النسخة القديمة
+
+    عند تعطل Redis يحسب كل طلب لنفسه بدل الانتظار.
+    """
+    lock_key = f"{key}:lock"
+    if _cache_call("add", lock_key, 1, lock_timeout, default=True):
+        try:
+            return recompute()
+        finally:
+            _cache_call("delete", lock_key)
+
+    if entry:
+        return _build_response(entry, "STALE")
+
+    # لا توجد نسخة قديمة: انتظار انتهاء الطلب الحامل للقفل
+    entry = _wait_for_entry(key, wait_timeout)
+    if entry:
+        return _build_response(entry, "HIT")
+    return recompute()
+
+
+def cached_response(
+    timeout,
+    stale_timeout=300,
+    beta=1.0,
+    lock_timeout=10,
+    wait_timeout=2.0,
+    cache_statuses=(200,),
+):
+    """
+    Decorator لتخزين استجابة DRF مؤقتاً مع خدمة البيانات القديمة أثناء التحديث
+
+    يُطبق داخل @api_view (أي تحت @permission_classes) حتى يتم تخزين
+    Response.data قبل التفاوض على المحتوى. يتم تجاهل query string في المفتاح
+    لمنع تجاوز التخزين بمعاملات عشوائية.
+
+    Args:
+        timeout: مدة صلاحية البيانات بالثواني
+        stale_timeout: المدة الإضافية التي يمكن خلالها خدمة البيانات القديمة
+        beta: معامل الانتهاء المبكر الاحتمالي (أكبر = أبكر)
+        lock_timeout: مدة قفل إعادة الحساب في Redis
+        wait_timeout: مدة انتظار الطلبات عند غياب أي نسخة مخزنة
+        cache_statuses: رموز الحالة القابلة للتخزين
+    """
+
+    def decorator(view_func):
+        key_prefix = f"response_cache:{view_func.__module__}.{view_func.__name__}"
+
+        def recompute(request, key, *args, **kwargs):
+            start = time.time()
+            response = view_func(request, *args, **kwargs)
+            delta = time.time() - start
+
+            if response.status_code in cache_statuses:
+                entry = {
+                    "data": response.data,
+                    "status": response.status_code,
+                    "expires_at": time.time() + timeout,
+                    "delta": delta,
+                }
+                _cache_call("set", key, entry, timeout + stale_timeout)
+            response["X-Cache"] = "MISS"
+            return response
+
+        @functools.wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view_func(request, *args, **kwargs)
+
+            key = f"{key_prefix}:{request.path}"
+            entry = _cache_call("get", key)
+            if entry and not _should_recompute(entry, beta):
+                return _build_response(entry, "HIT")
+
+            return _revalidate(
+                functools.partial(recompute, request, key, *args, **kwargs),
+                key,
+                entry,
+                lock_timeout,
+                wait_timeout,
+            )
+
+        return wrapper
+
+    return decorator
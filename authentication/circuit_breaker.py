@@ -0,0 +1,136 @@
+"""
+قاطع دائرة (circuit breaker) للاعتماديات الخارجية غير الحرجة مثل Redis
+
+بعد failure_threshold فشلاً متتالياً تُفتح الدائرة فترفض الاستدعاءات فوراً
+بـ CircuitOpenError بدل انتظار مهلة الاتصال في كل طلب. بعد reset_timeout
+ثانية يُسمح باستدعاء تجريبي واحد (half-open): نجاحه يغلق الدائرة وفشله
+يعيد فتحها.
+"""
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django_redis.exceptions import ConnectionInterrupted
+from prometheus_client import Counter, Gauge
+from redis.exceptions import ConnectionError as RedisConnectionError
+from redis.exceptions import TimeoutError as RedisTimeoutError
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+BREAKER_STATE = Gauge(
+    "circuit_breaker_state",
+    "Circuit breaker state (0 closed, 1 half-open, 2 open)",
+    ["name"],
+    multiprocess_mode="livemax",
+)
+
+BREAKER_TRANSITIONS = Counter(
+    "circuit_breaker_transitions_total",
+    "Circuit breaker state changes",
+    ["name", "state"],
+)
+
+
+class CircuitOpenError(Exception):
+    """
+    الدائرة مفتوحة ولم يُنفذ الاستدعاء
+    """
+
+
+class CircuitBreaker:
+    """
+    قاطع دائرة آمن للخيوط لكل عملية
+    """
+
+    def __init__(self, name, failure_exceptions, failure_threshold=5, reset_timeout=10):
+        self.name = name
+        self.failure_exceptions = failure_exceptions
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+        BREAKER_STATE.labels(name=name).set(STATE_VALUES[CLOSED])
+
+    def _transition(self, state):
+        if state == self.state:
+            return
+        self.state = state
+        BREAKER_STATE.labels(name=self.name).set(STATE_VALUES[state])
+        BREAKER_TRANSITIONS.labels(name=self.name, state=state).inc()
+        log = logger.info if state == CLOSED else logger.warning
+        log(f"Circuit breaker {self.name} is now {state}")
+
+    def allow_request(self):
+        """
+        هل يُسمح بالاستدعاء الآن (يسمح بطلب تجريبي واحد بعد reset_timeout)
+        """
+        if self.state == CLOSED:
+            return True
+        with self._lock:
+            if (
+                self.state == OPEN
+                and time.monotonic() - self.opened_at >= self.reset_timeout
+            ):
+                self._transition(HALF_OPEN)
+                return True
+            return False
+
+    def record_success(self):
+        if self.state == CLOSED and not self.failures:
+            return
+        with self._lock:
+            self.failures = 0
+            self._transition(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self._transition(OPEN)
+
+    def call(self, func, *args, **kwargs):
+        """
+        تنفيذ func عبر القاطع
+
+        Raises:
+            CircuitOpenError: إذا كانت الدائرة مفتوحة
+        """
+        if not self.allow_request():
+            raise CircuitOpenError(f"Circuit breaker {self.name} is open")
+        try:
+            result = func(*args, **kwargs)
+        except self.failure_exceptions:
+            self.record_failure()
+            raise
+        except Exception:
+            # أي خطأ آخر يعني أن الخدمة ردّت
+            self.record_success()
+            raise
+        self.record_success()
+        return result
+
+    def reset(self):
+        with self._lock:
+            self.failures = 0
+            self._transition(CLOSED)
+
+
+REDIS_ERRORS = (RedisConnectionError, RedisTimeoutError, ConnectionInterrupted)
+
+# Redis واحد مشترك بين cache و rate limiting، فقاطع واحد لكل عملية
+redis_breaker = CircuitBreaker(
+    "redis",
+    REDIS_ERRORS,
+    failure_threshold=getattr(settings, "REDIS_BREAKER_FAILURE_THRESHOLD", 5),
+    reset_timeout=getattr(settings, "REDIS_BREAKER_RESET_TIMEOUT", 10),
+)
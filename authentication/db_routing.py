@@ -0,0 +1,214 @@
+"""
+توجيه القراءات إلى قاعدة بيانات نسخة القراءة (replica) للـ views المعلنة فقط
+
+الـ view المعلن بـ read_replica (ومعه صفحات القوائم في لوحة الإدارة) يقرأ من
+REPLICA_DATABASE_ALIAS في طلبات GET/HEAD. الكتابة تذهب دائماً إلى default،
+وبعد أي كتابة تُقرأ بقية الطلب من default، ويُثبَّت العميل (المستخدم أو
+الجلسة) على default لمدة REPLICA_STICKY_SECONDS حتى يرى ما كتبه رغم تأخر
+النسخ إلى الـ replica.
+"""
+
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import jwt
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+from prometheus_client import Counter
+
+from .middleware import AsyncCapableMiddleware
+
+logger = logging.getLogger(__name__)
+
+REPLICA_DATABASE_ALIAS = "replica"
+READ_METHODS = ("GET", "HEAD")
+
+DB_READS = Counter("db_reads_total", "ORM reads by database alias", ["database"])
+_primary_reads = DB_READS.labels(database=DEFAULT_DB_ALIAS)
+_replica_reads = DB_READS.labels(database=REPLICA_DATABASE_ALIAS)
+
+_routing = ContextVar("db_routing", default=None)
+
+
+class RoutingState:
+    """
+    حالة التوجيه لطلب واحد
+    """
+
+    def __init__(self):
+        self.use_replica = False
+        self.wrote = False
+        self.written_user_ids = set()
+
+
+def read_replica(view):
+    """
+    decorator يسمح لـ view للقراءة فقط (دالة أو صنف) بالقراءة من الـ replica
+
+    يجب أن يكون الأبعد (فوق api_view) مثل query_budget.
+    """
+    view.read_replica = True
+    return view
+
+
+def uses_read_replica(match):
+    """
+    هل يقرأ الـ view المطابق من الـ replica
+    """
+    if match is None:
+        return False
+    view = match.func
+    if getattr(view, "read_replica", False) or getattr(
+        getattr(view, "view_class", None), "read_replica", False
+    ):
+        return True
+    # صفحات القوائم في لوحة الإدارة
+    return "admin" in match.namespaces and (match.url_name or "").endswith(
+        "_changelist"
+    )
+
+
+def get_sticky_keys(request, response=None):
+    """
+    مفاتيح تثبيت العميل على default: المستخدم من رمز JWT والجلسة من الكوكي
+
+    الرمز لا يُتحقق من توقيعه هنا؛ أسوأ ما يفعله رمز مزور هو القراءة من default.
+    """
+    keys = []
+    auth_header = request.META.get("HTTP_AUTHORIZATION", "")
+    if auth_header.startswith("Bearer "):
+        try:
+            payload = jwt.decode(auth_header[7:], options={"verify_signature": False})
+            if payload.get("user_id"):
+                keys.append(f"user:{payload['user_id']}")
+        except jwt.InvalidTokenError:
+            pass
+
+    session_key = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if response is not None and settings.SESSION_COOKIE_NAME in response.cookies:
+        # جلسة جديدة بعد تسجيل الدخول (cycle_key)
+        session_key = response.cookies[settings.SESSION_COOKIE_NAME].value
+    if session_key:
+        keys.append(f"session:{session_key}")
+    return keys
+
+
+def _sticky_cache_key(key):
+    return f"db_sticky:{key}"
+
+
+class ReplicaRouter:
+    """
+    Database router: القراءة من الـ replica فقط عندما يسمح بها الطلب الحالي
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _routing.get()
+        if (
+            state is None
+            or not state.use_replica
+            or state.wrote
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            _primary_reads.inc()
+            return DEFAULT_DB_ALIAS
+        _replica_reads.inc()
+        return REPLICA_DATABASE_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _routing.get()
+        if state is not None:
+            state.wrote = True
+            instance = hints.get("instance")
+            user_id = getattr(instance, "user_id", None)
+            if user_id is None and instance is not None:
+                if instance._meta.label == settings.AUTH_USER_MODEL:
+                    user_id = instance.pk
+            if user_id is not None:
+                state.written_user_ids.add(user_id)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # الـ replica نسخة من default، فالكائنات من أي منهما مترابطة
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # الـ replica تتلقى المخطط من default عبر النسخ ولا تُرحّل مباشرة، إلا
+        # قاعدة مستقلة تقوم مقامها (REPLICA_STANDIN) كما في الاختبارات
+        if db == REPLICA_DATABASE_ALIAS:
+            return connections[db].settings_dict.get("REPLICA_STANDIN", False)
+        return None
+
+
+class ReadReplicaMiddleware(AsyncCapableMiddleware):
+    """
+    Middleware يحدد لكل طلب هل يقرأ من الـ replica، ويثبت العميل بعد الكتابة
+
+    لا يُحمّل إلا عند تفعيل READ_REPLICA_ENABLED.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "READ_REPLICA_ENABLED", False):
+            raise MiddlewareNotUsed()
+        super().__init__(get_response)
+
+    @contextmanager
+    def request_scope(self, request):
+        state = RoutingState()
+        token = _routing.set(state)
+        try:
+            yield state
+        finally:
+            _routing.reset(token)
+
+    def finalize(self, request, response, state):
+        if state.wrote:
+            self.pin_to_primary(request, response, state)
+        return response
+
+    async def afinalize(self, request, response, state):
+        if state.wrote:
+            await sync_to_async(self.pin_to_primary)(request, response, state)
+        return response
+
+    def process_view_blocks(self, request):
+        return request.method in READ_METHODS and uses_read_replica(
+            request.resolver_match
+        )
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = _routing.get()
+        if (
+            state is None
+            or request.method not in READ_METHODS
+            or not uses_read_replica(request.resolver_match)
+        ):
+            return None
+
+        sticky_keys = [_sticky_cache_key(key) for key in get_sticky_keys(request)]
+        try:
+            pinned = bool(sticky_keys) and bool(cache.get_many(sticky_keys))
+        except Exception as e:
+            logger.warning(f"Replica stickiness lookup failed: {str(e)}")
+            pinned = True
+        state.use_replica = not pinned
+        return None
+
+    @staticmethod
+    def pin_to_primary(request, response, state):
+        """
+        تثبيت العميل ومن كُتبت بياناتهم على default لفترة تأخر النسخ
+        """
+        keys = get_sticky_keys(request, response)
+        keys.extend(f"user:{user_id}" for user_id in state.written_user_ids)
+        try:
+            cache.set_many(
+                {_sticky_cache_key(key): True for key in keys},
+                timeout=getattr(settings, "REPLICA_STICKY_SECONDS", 5),
+            )
+        except Exception as e:
+            logger.warning(f"Replica stickiness update failed: {str(e)}")
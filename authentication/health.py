@@ -0,0 +1,232 @@
+"""
+فحوصات liveness و readiness منخفضة الكلفة
+
+liveness يُجاب مباشرة من طبقة WSGI دون Django أو middleware. أما readiness
+فيقرأ آخر نتائج خيط خلفي يفحص قاعدة البيانات و Redis دورياً، فلا يلمس أي
+طلب فحص قاعدة البيانات بنفسه.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+
+from .monitoring import HealthChecker
+
+logger = logging.getLogger(__name__)
+
+LIVENESS_PATH = "/health/live/"
+READINESS_PATH = "/health/ready/"
+
+
+def check_database():
+    """
+    فحص قاعدة البيانات مع إغلاق اتصال الخيط عند الفشل ليُعاد فتحه لاحقاً،
+    وإعادته إلى المجمّع بعد كل فحص حتى لا يحجز الفاحص اتصالاً دائماً
+    """
+    from django.db import connection
+
+    healthy, message = HealthChecker.check_database()
+    if not healthy or getattr(connection, "pooled", False):
+        connection.close()
+    return healthy, message
+
+
+class BackgroundHealthChecker:
+    """
+    خيط خلفي يشغل فحوصات الاعتماديات كل interval ثانية
+
+    لكل فحص مهلة خاصة، ويُحفظ لكل فحص آخر نتيجة ووقت آخر نجاح. تُعتبر
+    النتائج قديمة (غير جاهزة) إذا لم تُحدّث خلال stale_after ثانية. فشل فحص
+    من optional يجعل الحالة degraded مع بقاء الخدمة جاهزة.
+    """
+
+    def __init__(self, checks, interval=10, timeout=2, stale_after=None, optional=()):
+        self.checks = checks
+        self.optional = set(optional)
+        self.interval = interval
+        self.timeout = timeout
+        self.stale_after = stale_after or interval * 3
+        self.results = {}
+        self._futures = {}
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def start(self):
+        """
+        تشغيل الخيط مرة واحدة لكل عملية (يُعاد تشغيله بعد fork)
+        """
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self.results = {}
+            self._futures = {}
+            self._stop.clear()
+            # خيوط المنفذ لا تنتقل عبر fork
+            self._executor = None
+            threading.Thread(
+                target=self._run, name="health-checker", daemon=True
+            ).start()
+            self._pid = os.getpid()
+
+    def stop(self):
+        self._stop.set()
+        self._pid = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_checks()
+            except RuntimeError:
+                # المنفذ أُغلق عند خروج المفسر
+                return
+            self._stop.wait(self.interval)
+
+    def run_checks(self):
+        """
+        تشغيل جميع الفحوصات بالتوازي مع مهلة لكل فحص
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=len(self.checks), thread_name_prefix="health-check"
+            )
+
+        started = time.time()
+        for name, check in self.checks.items():
+            # فحص ما زال عالقاً من دورة سابقة لا يُعاد إرساله
+            future = self._futures.get(name)
+            if future is None or future.done():
+                self._futures[name] = self._executor.submit(check)
+
+        for name, future in self._futures.items():
+            previous = self.results.get(name, {})
+            remaining = max(0.0, self.timeout - (time.time() - started))
+            try:
+                healthy, message = future.result(timeout=remaining)
+            except FutureTimeoutError:
+                healthy, message = False, f"Timed out after {self.timeout}s"
+            except Exception as e:
+                healthy, message = False, f"Check failed: {str(e)}"
+
+            now = time.time()
+            self.results[name] = {
+                "status": healthy,
+                "message": message,
+                "checked_at": now,
+                "last_success": now if healthy else previous.get("last_success"),
+            }
+            if not healthy:
+                logger.warning(f"Health check {name} failed: {message}")
+
+    def snapshot(self):
+        """
+        آخر نتائج الفحوصات دون تشغيلها
+        """
+        self.start()
+        now = time.time()
+        checks = {name: dict(result) for name, result in self.results.items()}
+
+        def passing(name):
+            result = checks.get(name)
+            return bool(
+                result
+                and result["status"]
+                and now - result["checked_at"] <= self.stale_after
+            )
+
+        if all(passing(name) for name in self.checks):
+            status = "healthy"
+        elif all(passing(name) for name in self.checks if name not in self.optional):
+            # الخدمة تعمل بدون الاعتماديات الاختيارية (مثل Redis) بأداء أقل
+            status = "degraded"
+        else:
+            status = "unhealthy"
+        return {
+            "status": status,
+            "checks": checks,
+            "timestamp": now,
+        }
+
+
+health_checker = BackgroundHealthChecker(
+    {"database": check_database, "redis": HealthChecker.check_redis},
+    interval=getattr(settings, "HEALTH_CHECK_INTERVAL", 10),
+    timeout=getattr(settings, "HEALTH_CHECK_TIMEOUT", 2),
+    # تعطل Redis يبطئ الخدمة (بدون cache) لكن لا يوقف المصادقة
+    optional=("redis",),
+)
+
+
+def probe(path):
+    """
+    الإجابة على مسار فحص كـ (status code، body)، أو None لبقية المسارات
+    """
+    if path == LIVENESS_PATH:
+        return 200, LIVENESS_BODY
+    if path == READINESS_PATH:
+        health = health_checker.snapshot()
+        return (503 if health["status"] == "unhealthy" else 200), json.dumps(
+            health
+        ).encode()
+    return None
+
+
+LIVENESS_BODY = json.dumps({"status": "alive"}).encode()
+
+PROBE_HEADERS = [("Content-Type", "application/json"), ("Cache-Control", "no-store")]
+
+
+class HealthProbeMiddleware:
+    """
+    WSGI middleware يجيب على مسارات liveness و readiness قبل Django
+    """
+
+    def __init__(self, application):
+        self.application = application
+
+    def __call__(self, environ, start_response):
+        result = probe(environ.get("PATH_INFO"))
+        if result is None:
+            return self.application(environ, start_response)
+
+        status_code, body = result
+        start_response(
+            "200 OK" if status_code == 200 else "503 Service Unavailable",
+            PROBE_HEADERS + [("Content-Length", str(len(body)))],
+        )
+        return [body]
+
+
+class AsyncHealthProbeMiddleware:
+    """
+    نظير HealthProbeMiddleware لتطبيق ASGI (عمال uvicorn)
+    """
+
+    def __init__(self, application):
+        self.application = application
+
+    async def __call__(self, scope, receive, send):
+        result = probe(scope["path"]) if scope["type"] == "http" else None
+        if result is None:
+            await self.application(scope, receive, send)
+            return
+
+        status_code, body = result
+        headers = PROBE_HEADERS + [("Content-Length", str(len(body)))]
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status_code,
+                "headers": [(k.lower().encode(), v.encode()) for k, v in headers],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
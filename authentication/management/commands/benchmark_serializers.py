@@ -0,0 +1,141 @@
+"""
+مقارنة زمن تسليس استجابات نقاط النهاية بين JSONRenderer و ORJSONRenderer
+
+تُبنى الحمولات من المسلسلات الحالية بكائنات غير محفوظة (بدون قاعدة بيانات)،
+ويُقاس زمن to_representation مرة وزمن التحويل إلى JSON لكل renderer.
+في النهاية يُقارن UserProfileSerializer بمساره السريع المُجمّع.
+"""
+
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from authentication.authentication import JWTTokenGenerator
+from authentication.models import LoginHistory, User
+from authentication.renderers import ORJSONRenderer
+from authentication.serializers import (
+    LoginHistorySerializer,
+    UserProfileSerializer,
+    fast_user_profile_serializer,
+)
+
+
+def _sample_user():
+    now = timezone.now()
+    return User(
+        id=1,
+        username="benchmark",
+        email="benchmark@example.com",
+        first_name="محمد",
+        last_name="أحمد",
+        phone="01012345678",
+        user_type="citizen",
+        national_id="29001011234567",
+        governorate="القاهرة",
+        city="مدينة نصر",
+        address="شارع عباس العقاد",
+        birth_date=now.date(),
+        profile_picture="https://example.com/avatar.png",
+        is_verified=True,
+        created_at=now,
+        updated_at=now,
+        last_login=now,
+    )
+
+
+def build_payloads(user):
+    """
+    حمولات الاستجابة لكل نقطة نهاية كما تبنيها الـ views
+    """
+    token = JWTTokenGenerator.generate_access_token(user)
+    tokens = {
+        "access_token": token,
+        "refresh_token": token,
+        "token_type": "Bearer",
+        "expires_in": settings.JWT_ACCESS_TOKEN_LIFETIME,
+    }
+    profile = fast_user_profile_serializer.to_representation
+    history = [
+        LoginHistory(
+            user=user,
+            ip_address=f"10.0.0.{i}",
+            user_agent="Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36",
+            login_time=timezone.now(),
+            is_successful=i % 5 != 0,
+        )
+        for i in range(settings.REST_FRAMEWORK.get("PAGE_SIZE", 20))
+    ]
+
+    return {
+        "login": lambda: {
+            "message": "تم تسجيل الدخول بنجاح",
+            "user": profile(user),
+            "tokens": tokens,
+        },
+        "refresh_token": lambda: {"message": "تم تحديث الرمز بنجاح", "tokens": tokens},
+        "user_info": lambda: {"user": profile(user)},
+        "user_profile": lambda: profile(user),
+        "login_history": lambda: {
+            "count": 250,
+            "next": "http://testserver/api/auth/login-history/?page=2",
+            "previous": None,
+            "results": LoginHistorySerializer(history, many=True).data,
+        },
+        "introspect_token": lambda: {
+            "active": True,
+            "token_type": "access",
+            "user_id": user.id,
+            "jti": uuid.uuid4(),
+            "exp": timezone.now(),
+        },
+    }
+
+
+def _per_call(func, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+class Command(BaseCommand):
+    help = "Benchmark JSON rendering of endpoint payloads with stdlib json vs orjson"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        renderers = {"json": JSONRenderer(), "orjson": ORJSONRenderer()}
+
+        self.stdout.write(
+            f"{'endpoint':<18}{'bytes':>8}{'serialize':>12}"
+            f"{'json':>10}{'orjson':>10}{'speedup':>9}"
+        )
+        for endpoint, build in build_payloads(_sample_user()).items():
+            serialize = _per_call(build, max(1, iterations // 10))
+            data = build()
+            timings = {
+                name: _per_call(lambda: renderer.render(data), iterations)
+                for name, renderer in renderers.items()
+            }
+            self.stdout.write(
+                f"{endpoint:<18}{len(renderers['orjson'].render(data)):>8}"
+                f"{serialize:>10.1f}us{timings['json']:>8.1f}us"
+                f"{timings['orjson']:>8.1f}us"
+                f"{timings['json'] / timings['orjson']:>8.1f}x"
+            )
+
+        user = _sample_user()
+        serializer = _per_call(lambda: UserProfileSerializer(user).data, iterations)
+        fast = _per_call(
+            lambda: fast_user_profile_serializer.to_representation(user), iterations
+        )
+        self.stdout.write(
+            f"\nUserProfileSerializer: {serializer:.1f}us, "
+            f"fast path: {fast:.1f}us ({serializer / fast:.1f}x)"
+        )
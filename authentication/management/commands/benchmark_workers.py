@@ -0,0 +1,116 @@
+"""
+مقارنة إنتاجية عامل gunicorn واحد (نواة واحدة) بين sync و uvicorn
+
+يشغل gunicorn بعامل واحد لكل نوع على منفذ محلي، ثم يرسل طلبات متزامنة
+عبر اتصالات keep-alive ويطبع عدد الطلبات في الثانية.
+"""
+
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+WORKER_CLASSES = ("sync", "uvicorn.workers.UvicornWorker")
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_live(port, timeout=15):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", "/health/live/")
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise CommandError(f"Server on port {port} did not start")
+
+
+def _run_client(port, path, count):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    for _ in range(count):
+        try:
+            connection.request("GET", path)
+            connection.getresponse().read()
+        except (ConnectionError, http.client.HTTPException):
+            # عمال sync لا يدعمون keep-alive ويغلقون الاتصال بعد كل رد
+            connection.close()
+            connection.request("GET", path)
+            connection.getresponse().read()
+    connection.close()
+
+
+class Command(BaseCommand):
+    help = "Benchmark single-worker throughput of sync vs uvicorn gunicorn workers"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default="/api/auth/health/")
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--concurrency", type=int, default=20)
+        parser.add_argument("--worker-class", action="append", dest="worker_classes")
+
+    def handle(self, *args, **options):
+        results = {}
+        for worker_class in options["worker_classes"] or WORKER_CLASSES:
+            results[worker_class] = self.benchmark(worker_class, options)
+            self.stdout.write(
+                f"{worker_class}: {results[worker_class]:.0f} req/s per core"
+            )
+
+    def benchmark(self, worker_class, options):
+        """
+        تشغيل خادم بعامل واحد وقياس عدد الطلبات في الثانية
+        """
+        port = _free_port()
+        env = dict(
+            os.environ,
+            GUNICORN_WORKER_CLASS=worker_class,
+            GUNICORN_WORKERS="1",
+            GUNICORN_BIND=f"127.0.0.1:{port}",
+            PROMETHEUS_MULTIPROC_DIR=os.path.join("/tmp", f"benchmark_metrics_{port}"),
+        )
+        server = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "gunicorn",
+                "--config",
+                "gunicorn.conf.py",
+                "--access-logfile",
+                "/dev/null",
+            ],
+            cwd=settings.BASE_DIR,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            _wait_until_live(port)
+            concurrency = options["concurrency"]
+            per_client = max(1, options["requests"] // concurrency)
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                for future in [
+                    executor.submit(_run_client, port, options["path"], per_client)
+                    for _ in range(concurrency)
+                ]:
+                    future.result()
+            duration = time.perf_counter() - start
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+        return per_client * concurrency / duration
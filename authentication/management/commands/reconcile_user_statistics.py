@@ -0,0 +1,17 @@
+"""
+مطابقة عدادات إحصائيات المستخدمين مع البيانات الفعلية
+"""
+
+from django.core.management.base import BaseCommand
+
+from authentication.services import UserService
+
+
+class Command(BaseCommand):
+    help = "Reconcile incrementally maintained user statistics counters"
+
+    def handle(self, *args, **options):
+        corrected = UserService.reconcile_user_statistics()
+        self.stdout.write(
+            self.style.SUCCESS(f"Reconciled {corrected} user statistics counters")
+        )
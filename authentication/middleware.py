@@ -3,16 +3,191 @@ Middleware للأمان وتحديد المعدل
 """
 
 import logging
-import time
+import math
+import uuid
+from contextlib import nullcontext
 
-from django.core.cache import cache
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.messages.middleware import MessageMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
 from django.http import JsonResponse
+from django.middleware.csrf import CsrfViewMiddleware
 from django.utils.deprecation import MiddlewareMixin
-from django_ratelimit.decorators import ratelimit
-from django_ratelimit.exceptions import Ratelimited
+
+from .throttling import login_throttle, rate_limiter
 
 logger = logging.getLogger(__name__)
 
+API_PATH_PREFIX = "/api/"
+LOGIN_PATH = "/api/auth/login/"
+
+
+def get_client_ip(request):
+    """
+    الحصول على IP الحقيقي للعميل (يُحسب مرة واحدة لكل طلب)
+
+    nginx يبني X-Forwarded-For بـ $proxy_add_x_forwarded_for، أي يُلحق عنوان
+    من اتصل به بعد أي قيمة أرسلها العميل نفسه. لذلك يُقرأ من اليمين: آخر
+    TRUSTED_PROXY_COUNT عناوين أضافتها proxies موثوقة وأولها هو العميل، وما
+    قبلها يتحكم فيه العميل ولا يُستخدم (وإلا تجاوز تحديد المعدل بتغييره).
+    """
+    ip = getattr(request, "client_ip", None)
+    if ip is None:
+        ip = request.META.get("REMOTE_ADDR")
+        trusted_proxies = settings.TRUSTED_PROXY_COUNT
+        x_forwarded_for = request.META.get("HTTP_X_FORWARDED_FOR")
+        if trusted_proxies and x_forwarded_for:
+            hops = x_forwarded_for.split(",")
+            if len(hops) >= trusted_proxies:
+                ip = hops[-trusted_proxies].strip()
+        request.client_ip = ip
+    return ip
+
+
+def is_api_request(request):
+    """
+    هل الطلب موجه إلى واجهة JWT (لا يحتاج جلسات أو CSRF أو رسائل)
+    """
+    is_api = getattr(request, "is_api", None)
+    if is_api is None:
+        is_api = request.path_info.startswith(API_PATH_PREFIX)
+        request.is_api = is_api
+    return is_api
+
+
+class AsyncCapableMiddleware:
+    """
+    أساس middleware يعمل في نمطي Django المتزامن وغير المتزامن
+
+    تحت ASGI يستدعي Django ‏__acall__ في حلقة الأحداث مباشرة بدل تغليف
+    middleware متزامن بـ sync_to_async والانتقال إلى خيط في كل طلب.
+    الأصناف الفرعية تطبق:
+        request_scope(request): context manager حول بقية السلسلة، وقيمته
+            تُمرر إلى finalize
+        finalize(request, response, state): تعديل الاستجابة بعد السلسلة
+            (afinalize نظيره غير المتزامن إذا كان فيه عمل حاجب)
+        process_view_blocks(request): هل process_view يحجب (مثل Redis)،
+            فيُنفذ عبر sync_to_async بدل حلقة الأحداث
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+            if hasattr(self, "process_view"):
+                self._sync_process_view = self.process_view
+                self.process_view = self._async_process_view
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        with self.request_scope(request) as state:
+            response = self.get_response(request)
+        return self.finalize(request, response, state)
+
+    async def __acall__(self, request):
+        with self.request_scope(request) as state:
+            response = await self.get_response(request)
+        return await self.afinalize(request, response, state)
+
+    async def _async_process_view(self, request, view_func, view_args, view_kwargs):
+        process_view = self._sync_process_view
+        if self.process_view_blocks(request):
+            process_view = sync_to_async(process_view)
+            return await process_view(request, view_func, view_args, view_kwargs)
+        return process_view(request, view_func, view_args, view_kwargs)
+
+    def request_scope(self, request):
+        return nullcontext()
+
+    def finalize(self, request, response, state):
+        return response
+
+    async def afinalize(self, request, response, state):
+        return self.finalize(request, response, state)
+
+    def process_view_blocks(self, request):
+        return False
+
+
+class RequestContextMiddleware(AsyncCapableMiddleware):
+    """
+    Middleware يحسب سياق الطلب مرة واحدة لبقية الطبقات
+
+    يضيف إلى الطلب: client_ip و correlation_id و is_api و route_name.
+    """
+
+    def request_scope(self, request):
+        request.client_ip = get_client_ip(request)
+        request.correlation_id = uuid.uuid4().hex
+        request.is_api = request.path_info.startswith(API_PATH_PREFIX)
+        request.route_name = None
+        return nullcontext()
+
+    def finalize(self, request, response, state):
+        response["X-Correlation-ID"] = request.correlation_id
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        """
+        تسجيل اسم المسار بعد مطابقة URL دون إعادة حلّه
+        """
+        request.route_name = request.resolver_match.url_name
+        return None
+
+
+class WebOnlyMiddlewareMixin:
+    """
+    تخطي middleware الخاص بالمتصفح لطلبات الواجهة البرمجية
+    """
+
+    def __call__(self, request):
+        if is_api_request(request):
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class WebSessionMiddleware(WebOnlyMiddlewareMixin, SessionMiddleware):
+    """
+    جلسات Django لغير مسارات /api/ فقط
+    """
+
+
+class WebCsrfViewMiddleware(WebOnlyMiddlewareMixin, CsrfViewMiddleware):
+    """
+    حماية CSRF لغير مسارات /api/ فقط (المصادقة فيها عبر JWT)
+    """
+
+    def process_view(self, request, callback, callback_args, callback_kwargs):
+        if is_api_request(request):
+            return None
+        return super().process_view(request, callback, callback_args, callback_kwargs)
+
+
+class WebAuthenticationMiddleware(WebOnlyMiddlewareMixin, AuthenticationMiddleware):
+    """
+    مصادقة الجلسة لغير مسارات /api/ فقط
+    """
+
+    def __call__(self, request):
+        if is_api_request(request):
+            # DRF يستبدله بالمستخدم المصادق عبر JWT
+            request.user = AnonymousUser()
+        return super().__call__(request)
+
+
+class WebMessageMiddleware(WebOnlyMiddlewareMixin, MessageMiddleware):
+    """
+    رسائل Django لغير مسارات /api/ فقط
+    """
+
 
 class SecurityMiddleware(MiddlewareMixin):
     """
@@ -30,7 +205,8 @@ class SecurityMiddleware(MiddlewareMixin):
 
         # تسجيل معلومات الطلب
         logger.info(
-            f"Request: {request.method} {request.path} from {self.get_client_ip(request)}"
+            f"Request: {request.method} {request.path} from {get_client_ip(request)}",
+            extra={"correlation_id": getattr(request, "correlation_id", None)},
         )
 
         return None
@@ -47,37 +223,48 @@ class SecurityMiddleware(MiddlewareMixin):
 
         return response
 
-    def process_exception(self, request, exception):
+    get_client_ip = staticmethod(get_client_ip)
+
+
+class RateLimitMiddleware(AsyncCapableMiddleware):
+    """
+    Middleware لتحديد معدل الطلبات مركزياً حسب قواعد RATE_LIMIT_RULES
+    """
+
+    def finalize(self, request, response, state):
+        result = getattr(request, "rate_limit", None)
+        if result is not None:
+            for header, value in result.headers().items():
+                response[header] = value
+        return response
+
+    def process_view_blocks(self, request):
+        # المسارات بلا قواعد لا تصل إلى Redis
+        return rate_limiter.enabled and bool(
+            rate_limiter.get_rules(request.resolver_match.url_name)
+        )
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
         """
-        معالجة الاستثناءات
+        تطبيق قواعد المسار بعد مطابقة URL
         """
-        if isinstance(exception, Ratelimited):
+        result = rate_limiter.check(request, request.resolver_match.url_name)
+        request.rate_limit = result
+
+        if not result.allowed:
             logger.warning(
-                f"Rate limit exceeded for {self.get_client_ip(request)} on {request.path}"
+                f"Rate limit exceeded for {get_client_ip(request)} on {request.path}"
             )
             return JsonResponse(
                 {
                     "error": "تم تجاوز الحد المسموح من الطلبات",
                     "message": "يرجى المحاولة مرة أخرى بعد قليل",
-                    "retry_after": 60,
+                    "retry_after": math.ceil(result.retry_after),
                 },
                 status=429,
             )
-
         return None
 
-    @staticmethod
-    def get_client_ip(request):
-        """
-        الحصول على IP الحقيقي للعميل
-        """
-        x_forwarded_for = request.META.get("HTTP_X_FORWARDED_FOR")
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(",")[0]
-        else:
-            ip = request.META.get("REMOTE_ADDR")
-        return ip
-
 
 class LoginAttemptMiddleware(MiddlewareMixin):
     """
@@ -88,25 +275,30 @@ class LoginAttemptMiddleware(MiddlewareMixin):
         """
         مراقبة محاولات تسجيل الدخول
         """
-        if request.path == "/api/auth/login/" and request.method == "POST":
-            client_ip = SecurityMiddleware.get_client_ip(request)
+        request.is_login_attempt = (
+            request.method == "POST" and request.path == LOGIN_PATH
+        )
+        if request.is_login_attempt:
+            client_ip = get_client_ip(request)
+            request.login_account = login_throttle.get_account(request)
 
-            # فحص محاولات تسجيل الدخول الفاشلة
-            failed_attempts_key = f"failed_login_attempts:{client_ip}"
-            failed_attempts = cache.get(failed_attempts_key, 0)
+            # فحص محاولات تسجيل الدخول الفاشلة لكل IP ولكل حساب
+            result = login_throttle.check(client_ip, request.login_account)
 
-            if failed_attempts >= 5:
+            if result.blocked:
                 logger.warning(
                     f"IP {client_ip} blocked due to too many failed login attempts"
                 )
-                return JsonResponse(
+                response = JsonResponse(
                     {
                         "error": "تم حظر IP مؤقتاً",
                         "message": "تم تجاوز عدد محاولات تسجيل الدخول المسموحة",
-                        "retry_after": 900,  # 15 minutes
+                        "retry_after": result.retry_after_seconds,
                     },
                     status=429,
                 )
+                response["Retry-After"] = str(result.retry_after_seconds)
+                return response
 
         return None
 
@@ -114,16 +306,15 @@ class LoginAttemptMiddleware(MiddlewareMixin):
         """
         تسجيل نتائج محاولات تسجيل الدخول
         """
-        if request.path == "/api/auth/login/" and request.method == "POST":
-            client_ip = SecurityMiddleware.get_client_ip(request)
-            failed_attempts_key = f"failed_login_attempts:{client_ip}"
+        if getattr(request, "is_login_attempt", False):
+            client_ip = get_client_ip(request)
+            account = getattr(request, "login_account", None)
 
             if response.status_code == 401:  # فشل تسجيل الدخول
-                failed_attempts = cache.get(failed_attempts_key, 0)
-                cache.set(failed_attempts_key, failed_attempts + 1, 900)  # 15 minutes
+                login_throttle.register_failure(client_ip, account)
                 logger.warning(f"Failed login attempt from {client_ip}")
             elif response.status_code == 200:  # نجح تسجيل الدخول
-                cache.delete(failed_attempts_key)  # إزالة العداد عند النجاح
+                login_throttle.reset(client_ip, account)  # إزالة العداد عند النجاح
                 logger.info(f"Successful login from {client_ip}")
 
         return response
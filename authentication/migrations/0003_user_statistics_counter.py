@@ -0,0 +1,68 @@
+# Generated by Django 4.2.7 on 2026-10-19 03:12
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def seed_user_statistics(apps, schema_editor):
+    """
+    تعبئة العدادات الأولية من جدول المستخدمين الحالي
+    """
+    User = apps.get_model("authentication", "User")
+    UserStatisticsCounter = apps.get_model("authentication", "UserStatisticsCounter")
+    # قاعدة البيانات التي تُطبّق عليها الـ migration وليس ما يختاره الـ router
+    db_alias = schema_editor.connection.alias
+    users = User.objects.using(db_alias)
+
+    counters = {
+        "total": users.count(),
+        "verified": users.filter(is_verified=True).count(),
+    }
+    for row in users.values("user_type").annotate(count=Count("id")):
+        counters[f"user_type:{row['user_type']}"] = row["count"]
+    for row in (
+        users.exclude(governorate__isnull=True)
+        .exclude(governorate="")
+        .values("governorate")
+        .annotate(count=Count("id"))
+    ):
+        counters[f"governorate:{row['governorate']}"] = row["count"]
+
+    UserStatisticsCounter.objects.using(db_alias).bulk_create(
+        [UserStatisticsCounter(key=key, value=value) for key, value in counters.items()]
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        (
+            "authentication",
+            "0002_user_google_email_user_google_id_passwordresettoken_and_more",
+        ),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserStatisticsCounter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("key", models.CharField(max_length=100, unique=True)),
+                ("value", models.BigIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "عداد إحصائيات المستخدمين",
+                "verbose_name_plural": "عدادات إحصائيات المستخدمين",
+                "db_table": "auth_user_statistics",
+            },
+        ),
+        migrations.RunPython(seed_user_statistics, migrations.RunPython.noop),
+    ]
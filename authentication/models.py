@@ -5,7 +5,84 @@ from django.db import models
 from django.utils import timezone
 
 
-class User(AbstractUser):
+class DirtyFieldsMixin(models.Model):
+    """
+    تتبع الحقول المعدلة منذ التحميل حتى يكتب save() الأعمدة المتغيرة فقط
+
+    للكائنات المحمّلة من قاعدة البيانات يصبح save() بدون update_fields
+    تحديثاً للحقول التي تغيرت قيمتها فقط، ولا يُرسل أي استعلام إذا لم يتغير
+    شيء. حقول auto_now تُضاف دائماً إلى أي update_fields غير فارغ.
+    الكائنات الجديدة تُدرج كاملة كالمعتاد ثم تُتتبع.
+
+    التعديل داخل قيمة قابلة للتغيير (مثل dict في JSONField) لا يُكتشف.
+    """
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {}
+        instance._remember_loaded_values()
+        return instance
+
+    def _remember_loaded_values(self, fields=None):
+        if not hasattr(self, "_loaded_values"):
+            self._loaded_values = {}
+        values = self.__dict__
+        for field in self._meta.concrete_fields:
+            if field.attname not in values:
+                continue
+            if fields is None or field.name in fields or field.attname in fields:
+                self._loaded_values[field.attname] = values[field.attname]
+
+    def get_dirty_fields(self):
+        """
+        الحقول التي تغيرت منذ التحميل، أو None إذا لم يُحمّل الكائن من قاعدة البيانات
+        """
+        loaded = getattr(self, "_loaded_values", None)
+        if loaded is None:
+            return None
+        values = self.__dict__
+        return [
+            field.attname
+            for field in self._meta.concrete_fields
+            if not field.primary_key
+            and field.attname in values
+            and (
+                field.attname not in loaded
+                or values[field.attname] != loaded[field.attname]
+            )
+        ]
+
+    def save(self, *args, update_fields=None, **kwargs):
+        if (
+            update_fields is None
+            and not args
+            and not self._state.adding
+            and not kwargs.get("force_insert")
+        ):
+            update_fields = self.get_dirty_fields()
+
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if update_fields:
+                update_fields.update(
+                    field.attname
+                    for field in self._meta.concrete_fields
+                    if getattr(field, "auto_now", False)
+                )
+
+        super().save(*args, update_fields=update_fields, **kwargs)
+        self._remember_loaded_values(update_fields)
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        self._remember_loaded_values(fields)
+
+
+class User(DirtyFieldsMixin, AbstractUser):
     """
     نموذج المستخدم المخصص لمنصة نائبك.كوم
     """
@@ -83,7 +160,7 @@ class User(AbstractUser):
         return self.user_type == "admin"
 
 
-class RefreshToken(models.Model):
+class RefreshToken(DirtyFieldsMixin, models.Model):
     """
     نموذج رموز التحديث (Refresh Tokens)
     """
@@ -111,6 +188,10 @@ class RefreshToken(models.Model):
         self.is_revoked = True
         self.save()
 
+    async def arevoke(self):
+        self.is_revoked = True
+        await self.asave()
+
 
 class LoginHistory(models.Model):
     """
@@ -136,7 +217,7 @@ class LoginHistory(models.Model):
         return f"{self.user.email} - {self.login_time}"
 
 
-class PasswordResetToken(models.Model):
+class PasswordResetToken(DirtyFieldsMixin, models.Model):
     """
     رموز استرجاع كلمة المرور
     """
@@ -164,7 +245,7 @@ class PasswordResetToken(models.Model):
         return not self.is_used and not self.is_expired()
 
 
-class EmailVerificationToken(models.Model):
+class EmailVerificationToken(DirtyFieldsMixin, models.Model):
     """
     رموز التحقق من البريد الإلكتروني
     """
@@ -190,3 +271,21 @@ class EmailVerificationToken(models.Model):
 
     def is_valid(self):
         return not self.is_used and not self.is_expired()
+
+
+class UserStatisticsCounter(models.Model):
+    """
+    عدادات إحصائيات المستخدمين المحدثة تدريجياً
+    """
+
+    key = models.CharField(max_length=100, unique=True)
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "عداد إحصائيات المستخدمين"
+        verbose_name_plural = "عدادات إحصائيات المستخدمين"
+        db_table = "auth_user_statistics"
+
+    def __str__(self):
+        return f"{self.key}: {self.value}"
@@ -7,8 +7,19 @@ import uuid
 from typing import Optional
 
 from django.http import HttpRequest, HttpResponse
+from django.urls import Resolver404, resolve
 from django.utils.deprecation import MiddlewareMixin
-from prometheus_client import Counter, Histogram, generate_latest
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+from auth_service.metrics import get_registry
+
+from .middleware import get_client_ip
 
 logger = logging.getLogger(__name__)
 
@@ -31,7 +42,68 @@ FAILED_LOGIN_ATTEMPTS = Counter(
     "failed_login_attempts_total", "Failed login attempts", ["reason"]
 )
 
-ACTIVE_SESSIONS = Counter("active_sessions_total", "Active user sessions")
+# تُحدّث من قاعدة البيانات عند عرض المقاييس؛ في وضع تعدد العمليات تؤخذ
+# أحدث قيمة من أي عامل
+ACTIVE_SESSIONS = Gauge(
+    "active_sessions",
+    "Active user sessions (unrevoked, unexpired refresh tokens)",
+    multiprocess_mode="mostrecent",
+)
+
+ACTIVE_SESSIONS_REFRESH_INTERVAL = 30
+
+# حد أقصى لعدد تسميات endpoint لمنع انفجار سلاسل Prometheus
+ENDPOINT_LABEL_LIMIT = 100
+UNMATCHED_ENDPOINT = "unmatched"
+OVERFLOW_ENDPOINT = "other"
+
+# نمط URL -> تسمية endpoint
+_endpoint_labels = {}
+
+SIZE_BUCKETS = (100, 500, 1000, 5000, 10000, 50000, 100000, 500000, 1000000, 10000000)
+
+REQUEST_SIZE = Histogram(
+    "http_request_size_bytes",
+    "HTTP request body size",
+    ["method", "endpoint"],
+    buckets=SIZE_BUCKETS,
+)
+
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "HTTP response body size",
+    ["method", "endpoint"],
+    buckets=SIZE_BUCKETS,
+)
+
+
+class MeteredStream:
+    """
+    مكرر يعدّ بايتات الاستجابة المتدفقة ويستدعي on_finish مرة واحدة عند
+    انتهاء التدفق أو إغلاقه (مثل انقطاع اتصال العميل)
+    """
+
+    def __init__(self, content, on_finish):
+        self._iterator = iter(content)
+        self._on_finish = on_finish
+        self.size = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            chunk = next(self._iterator)
+        except StopIteration:
+            self.close()
+            raise
+        self.size += len(chunk)
+        return chunk
+
+    def close(self):
+        if self._on_finish is not None:
+            on_finish, self._on_finish = self._on_finish, None
+            on_finish(self.size)
 
 
 class MonitoringMiddleware(MiddlewareMixin):
@@ -44,7 +116,8 @@ class MonitoringMiddleware(MiddlewareMixin):
         معالجة الطلب وإضافة معرف فريد
         """
         request.start_time = time.time()
-        request.correlation_id = str(uuid.uuid4())
+        if not getattr(request, "correlation_id", None):
+            request.correlation_id = str(uuid.uuid4())
 
         # إضافة correlation ID للسجلات
         logger.info(
@@ -54,7 +127,7 @@ class MonitoringMiddleware(MiddlewareMixin):
                 "method": request.method,
                 "path": request.path,
                 "user_agent": request.META.get("HTTP_USER_AGENT", ""),
-                "remote_addr": self.get_client_ip(request),
+                "remote_addr": get_client_ip(request),
             },
         )
 
@@ -63,68 +136,105 @@ class MonitoringMiddleware(MiddlewareMixin):
     ) -> HttpResponse:
         """
         معالجة الاستجابة وتسجيل المقاييس
-        """
-        if hasattr(request, "start_time"):
-            duration = time.time() - request.start_time
 
-            # تسجيل مقاييس Prometheus
-            endpoint = self.get_endpoint_name(request.path)
-            REQUEST_COUNT.labels(
-                method=request.method, endpoint=endpoint, status=response.status_code
-            ).inc()
-
-            REQUEST_DURATION.labels(method=request.method, endpoint=endpoint).observe(
-                duration
+        الاستجابات المتدفقة لا تُقرأ في الذاكرة، بل يتم عدّ البايتات أثناء
+        مرورها وتسجيل المدة عند انتهاء التدفق.
+        """
+        if not hasattr(request, "start_time"):
+            return response
+
+        if not response.streaming:
+            self.record_metrics(request, response, len(response.content))
+        elif getattr(response, "file_to_stream", None) is not None:
+            # قد يُرسل الملف عبر wsgi.file_wrapper دون المرور بالمكرر
+            self.record_metrics(
+                request, response, int(response.get("Content-Length") or 0)
             )
-
-            # تسجيل تفاصيل الاستجابة
-            logger.info(
-                "Request completed",
-                extra={
-                    "correlation_id": getattr(request, "correlation_id", "unknown"),
-                    "method": request.method,
-                    "path": request.path,
-                    "status_code": response.status_code,
-                    "duration": duration,
-                    "response_size": len(response.content),
-                },
+        elif response.is_async:
+            response.streaming_content = self._count_async(
+                request, response, response.streaming_content
+            )
+        else:
+            response.streaming_content = MeteredStream(
+                response.streaming_content,
+                lambda size: self.record_metrics(request, response, size),
             )
 
         return response
 
-    @staticmethod
-    def get_client_ip(request: HttpRequest) -> str:
+    async def _count_async(self, request, response, content):
+        size = 0
+        try:
+            async for chunk in content:
+                size += len(chunk)
+                yield chunk
+        finally:
+            self.record_metrics(request, response, size)
+
+    def record_metrics(
+        self, request: HttpRequest, response: HttpResponse, response_size: int
+    ) -> None:
         """
-        الحصول على IP الحقيقي للعميل
+        تسجيل مقاييس Prometheus وسطر السجل للطلب المكتمل
         """
-        x_forwarded_for = request.META.get("HTTP_X_FORWARDED_FOR")
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(",")[0]
-        else:
-            ip = request.META.get("REMOTE_ADDR")
-        return ip
+        duration = time.time() - request.start_time
+        try:
+            request_size = int(request.META.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            request_size = 0
+
+        endpoint = self.get_endpoint_label(request)
+        REQUEST_COUNT.labels(
+            method=request.method, endpoint=endpoint, status=response.status_code
+        ).inc()
+        REQUEST_DURATION.labels(method=request.method, endpoint=endpoint).observe(
+            duration
+        )
+        REQUEST_SIZE.labels(method=request.method, endpoint=endpoint).observe(
+            request_size
+        )
+        RESPONSE_SIZE.labels(method=request.method, endpoint=endpoint).observe(
+            response_size
+        )
+
+        # تسجيل تفاصيل الاستجابة
+        logger.info(
+            "Request completed",
+            extra={
+                "correlation_id": getattr(request, "correlation_id", "unknown"),
+                "method": request.method,
+                "path": request.path,
+                "status_code": response.status_code,
+                "duration": duration,
+                "request_size": request_size,
+                "response_size": response_size,
+            },
+        )
+
+    get_client_ip = staticmethod(get_client_ip)
 
     @staticmethod
-    def get_endpoint_name(path: str) -> str:
+    def get_endpoint_label(request: HttpRequest) -> str:
         """
-        تحويل المسار إلى اسم endpoint مبسط
+        اسم endpoint من نمط URL المطابق بدلاً من فحص نص المسار
+
+        التسميات محفوظة لكل نمط، وعددها محدود بـ ENDPOINT_LABEL_LIMIT؛ ما
+        يتجاوز الحد يُجمع في "other" والمسارات غير المطابقة في "unmatched".
         """
-        if path.startswith("/api/auth/"):
-            if "login" in path:
-                return "auth_login"
-            elif "register" in path:
-                return "auth_register"
-            elif "logout" in path:
-                return "auth_logout"
-            elif "refresh" in path:
-                return "auth_refresh"
-            elif "profile" in path:
-                return "auth_profile"
-            elif "health" in path:
-                return "health_check"
-            else:
-                return "auth_other"
-        return "other"
+        match = getattr(request, "resolver_match", None)
+        if match is None:
+            try:
+                match = resolve(request.path_info)
+            except Resolver404:
+                return UNMATCHED_ENDPOINT
+
+        label = _endpoint_labels.get(match.route)
+        if label is None:
+            if len(_endpoint_labels) >= ENDPOINT_LABEL_LIMIT:
+                return OVERFLOW_ENDPOINT
+            label = match.view_name or match.route or "root"
+            _endpoint_labels[match.route] = label
+        return label
 
 
 class AuthMetricsLogger:
@@ -231,13 +341,42 @@ class AuthMetricsLogger:
         )
 
 
-def metrics_view(request):
+_active_sessions_updated_at = 0.0
+
+
+def update_active_sessions():
     """
-    عرض مقاييس Prometheus
+    تحديث عدد الجلسات النشطة بحد أقصى مرة كل ACTIVE_SESSIONS_REFRESH_INTERVAL
     """
-    from django.http import HttpResponse
+    global _active_sessions_updated_at
+
+    now = time.time()
+    if now - _active_sessions_updated_at < ACTIVE_SESSIONS_REFRESH_INTERVAL:
+        return
+    _active_sessions_updated_at = now
+
+    try:
+        from django.utils import timezone
 
-    return HttpResponse(generate_latest(), content_type="text/plain")
+        from .models import RefreshToken
+
+        ACTIVE_SESSIONS.set(
+            RefreshToken.objects.filter(
+                is_revoked=False, expires_at__gt=timezone.now()
+            ).count()
+        )
+    except Exception as e:
+        logger.warning(f"Failed to update active sessions gauge: {str(e)}")
+
+
+def metrics_view(request):
+    """
+    عرض مقاييس Prometheus مجمعة من جميع العمال
+    """
+    update_active_sessions()
+    return HttpResponse(
+        generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST
+    )
 
 
 class HealthChecker:
@@ -0,0 +1,179 @@
+"""
+تمثيل الملف الشخصي المُسلسل مخزناً لكل مستخدم مع ETag و Last-Modified
+
+يُخزن JSON الملف الشخصي (bytes) تحت user_profile:<id> مع نسخة مشتقة من
+updated_at. الـ view يحمّل المستخدم من قاعدة البيانات على أي حال للمصادقة،
+فيُقارن ETag المشتق من updated_at مع If-None-Match ويُرد بـ 304 بدون تسليس
+ولا قراءة من cache. عند عدم التطابق يُعاد استخدام bytes المخزنة إذا كانت
+نسختها هي نسخة المستخدم المحمّل، وإلا يُعاد بناؤها.
+
+الحذف عند الحفظ (إشارة post_save) يوفر الذاكرة فقط؛ الصحة تأتي من مقارنة
+النسخة، ولذلك يُكتب updated_at (auto_now) مع أي حفظ جزئي (DirtyFieldsMixin).
+"""
+
+from django.core.cache import cache
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+from django.utils.http import http_date
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from .renderers import ORJSONRenderer
+from .serializers import fast_user_profile_serializer
+
+PROFILE_CACHE_PREFIX = "user_profile:"
+PROFILE_CACHE_TIMEOUT = 3600
+
+_renderer = ORJSONRenderer()
+
+
+def _cache_key(user_id):
+    return f"{PROFILE_CACHE_PREFIX}{user_id}"
+
+
+def profile_version(user):
+    """
+    نسخة الملف الشخصي: updated_at بالميكروثانية
+    """
+    return int(user.updated_at.timestamp() * 1_000_000)
+
+
+def profile_etag(user):
+    return f'"{user.pk}-{profile_version(user)}"'
+
+
+def render_profile(user):
+    return _renderer.render(fast_user_profile_serializer.to_representation(user))
+
+
+def get_profile_json(user):
+    """
+    JSON الملف الشخصي من cache إذا طابقت نسخته نسخة المستخدم، وإلا يُبنى ويُخزن
+    """
+    key = _cache_key(user.pk)
+    version = profile_version(user)
+
+    entry = cache.get(key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    data = render_profile(user)
+    cache.set(key, (version, data), PROFILE_CACHE_TIMEOUT)
+    return data
+
+
+async def aget_profile_json(user):
+    """
+    نظير get_profile_json للـ views غير المتزامنة عبر cache.aget و cache.aset
+    """
+    key = _cache_key(user.pk)
+    version = profile_version(user)
+
+    entry = await cache.aget(key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    data = render_profile(user)
+    await cache.aset(key, (version, data), PROFILE_CACHE_TIMEOUT)
+    return data
+
+
+def invalidate_profile(user_id):
+    cache.delete(_cache_key(user_id))
+
+
+class ProfileResponse(Response):
+    """
+    Response للملف الشخصي يرسل JSON المخزن كما هو
+
+    عند اختيار JSON بدون تنسيق تُستخدم bytes الملف الشخصي المخزنة مباشرة
+    (أو profile_json إذا جُلبت مسبقاً)، وأي renderer آخر (مثل الواجهة القابلة
+    للتصفح) يمر عبر DRF كالمعتاد. data تُبنى عند الطلب فقط.
+    """
+
+    def __init__(self, user, envelope=None, profile_json=None, **kwargs):
+        self.user = user
+        self.envelope = envelope
+        self.profile_json = profile_json
+        super().__init__(**kwargs)
+
+    @property
+    def data(self):
+        if self._data is None:
+            data = fast_user_profile_serializer.to_representation(self.user)
+            self._data = {self.envelope: data} if self.envelope else data
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+
+    @property
+    def rendered_content(self):
+        renderer = self.accepted_renderer
+        if not isinstance(renderer, JSONRenderer) or renderer.get_indent(
+            self.accepted_media_type, self.renderer_context
+        ):
+            return super().rendered_content
+
+        self["Content-Type"] = self.content_type or renderer.media_type
+        body = self.profile_json
+        if body is None:
+            body = get_profile_json(self.user)
+        if self.envelope:
+            body = b'{"%s":%s}' % (self.envelope.encode(), body)
+        return body
+
+
+def _validators(user):
+    # Last-Modified بالثانية كاملة مثل If-Modified-Since، وإلا لن يساوي
+    # التاريخ الذي أرسلناه
+    return profile_etag(user), int(user.updated_at.timestamp())
+
+
+def _finish(response, etag, last_modified):
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    # بيانات خاصة بالمستخدم: لا تخزنها الـ proxies والعميل يعيد التحقق دائماً
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ("Authorization",))
+    return response
+
+
+def profile_response(request, user, envelope=None):
+    """
+    استجابة الملف الشخصي مع دعم If-None-Match و If-Modified-Since
+
+    Args:
+        request: طلب DRF
+        user: المستخدم المحمّل من قاعدة البيانات
+        envelope: اسم مفتاح يُغلّف به الملف الشخصي (مثل "user")
+    """
+    etag, last_modified = _validators(user)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = ProfileResponse(user, envelope=envelope)
+    return _finish(response, etag, last_modified)
+
+
+async def aprofile_response(request, user, envelope=None):
+    """
+    نظير profile_response للـ views غير المتزامنة (خارج DRF)
+
+    bytes الملف الشخصي تُجلب من cache عبر aget_profile_json حتى لا تُحجب
+    حلقة الأحداث بانتظار Redis، ثم تُعرض بـ ORJSONRenderer مباشرة.
+    """
+    etag, last_modified = _validators(user)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = ProfileResponse(
+            user, envelope=envelope, profile_json=await aget_profile_json(user)
+        )
+        response.accepted_renderer = _renderer
+        response.accepted_media_type = _renderer.media_type
+        response.renderer_context = {}
+        response.render()
+    return _finish(response, etag, last_modified)
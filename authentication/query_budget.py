@@ -0,0 +1,131 @@
+"""
+عدّ استعلامات SQL وزمنها لكل طلب ومقارنتها بميزانية معلنة لكل view
+
+في الإنتاج يتم تسجيل التجاوز في السجلات و Prometheus، وعند تفعيل
+QUERY_BUDGET_STRICT (في الاختبارات) يرفع التجاوز استثناء QueryBudgetExceeded.
+"""
+
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from prometheus_client import Counter, Histogram
+
+from .middleware import AsyncCapableMiddleware
+from .monitoring import MonitoringMiddleware
+
+logger = logging.getLogger(__name__)
+
+DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "SQL queries per request",
+    ["endpoint"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55),
+)
+
+DB_DURATION = Histogram(
+    "http_request_db_duration_seconds", "SQL time per request", ["endpoint"]
+)
+
+QUERY_BUDGET_EXCEEDED = Counter(
+    "query_budget_exceeded_total", "Requests over their SQL query budget", ["endpoint"]
+)
+
+
+class QueryBudgetExceeded(Exception):
+    """
+    تجاوز عدد الاستعلامات الميزانية المعلنة للـ view
+    """
+
+
+def query_budget(max_queries):
+    """
+    decorator يعلن الحد الأقصى لاستعلامات SQL لـ view (دالة أو صنف)
+
+    يجب أن يكون الأبعد (فوق api_view) حتى يصل إلى الدالة التي يطابقها المسار.
+    """
+
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+
+    return decorator
+
+
+def get_query_budget(view_func):
+    """
+    الحصول على ميزانية الـ view المطابق إن وُجدت
+    """
+    budget = getattr(view_func, "query_budget", None)
+    if budget is None:
+        budget = getattr(getattr(view_func, "view_class", None), "query_budget", None)
+    return budget
+
+
+class QueryCounter:
+    """
+    execute_wrapper يعدّ الاستعلامات ويجمع زمنها
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class QueryBudgetMiddleware(AsyncCapableMiddleware):
+    """
+    Middleware يسجل عدد الاستعلامات وزمنها لكل طلب ويفرض ميزانية الـ view
+    """
+
+    @contextmanager
+    def request_scope(self, request):
+        counter = QueryCounter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            yield counter
+
+    def finalize(self, request, response, counter):
+        endpoint = MonitoringMiddleware.get_endpoint_label(request)
+        DB_QUERIES.labels(endpoint=endpoint).observe(counter.count)
+        DB_DURATION.labels(endpoint=endpoint).observe(counter.duration)
+
+        match = getattr(request, "resolver_match", None)
+        budget = get_query_budget(match.func) if match else None
+        if budget is not None and counter.count > budget:
+            self.budget_exceeded(request, endpoint, counter, budget)
+
+        return response
+
+    @staticmethod
+    def budget_exceeded(request, endpoint, counter, budget):
+        """
+        تسجيل تجاوز الميزانية، أو رفع استثناء في الوضع الصارم
+        """
+        message = (
+            f"{endpoint} ran {counter.count} SQL queries "
+            f"({counter.duration * 1000:.1f}ms), budget is {budget}"
+        )
+        if getattr(settings, "QUERY_BUDGET_STRICT", False):
+            raise QueryBudgetExceeded(message)
+
+        QUERY_BUDGET_EXCEEDED.labels(endpoint=endpoint).inc()
+        logger.warning(
+            f"Query budget exceeded: {message}",
+            extra={
+                "correlation_id": getattr(request, "correlation_id", None),
+                "path": request.path,
+                "queries": counter.count,
+                "db_duration": counter.duration,
+            },
+        )
@@ -0,0 +1,64 @@
+"""
+Renderer و parser لـ DRF مبنيان على orjson
+
+orjson يسلسل datetime و date و time و UUID والقواميس والقوائم (ومنها ReturnDict
+و ReturnList) مباشرة. بقية الأنواع (Decimal، النصوص المترجمة الكسولة،
+timedelta، QuerySet...) تمر عبر encoder الخاص بـ DRF نفسه، وما لا يدعمه orjson
+إطلاقاً (أعداد صحيحة أكبر من 64 بت) يُعاد تسليسله بـ JSONRenderer الافتراضي.
+"""
+
+import codecs
+
+import orjson
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+
+_default = JSONEncoder().default
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    بديل JSONRenderer بنفس نوع المحتوى والمخرجات
+
+    التنسيق عند طلب indent (مثل الواجهة القابلة للتصفح) يكون بمسافتين دائماً
+    لأنه الخيار الوحيد في orjson.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        options = ORJSON_OPTIONS
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            options |= orjson.OPT_INDENT_2
+
+        try:
+            return orjson.dumps(data, default=_default, option=options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+class ORJSONParser(BaseParser):
+    """
+    بديل JSONParser يحلل جسم الطلب عبر orjson
+    """
+
+    media_type = "application/json"
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+
+        try:
+            data = stream.read()
+            if codecs.lookup(encoding).name != "utf-8":
+                data = data.decode(encoding)
+            return orjson.loads(data)
+        except (ValueError, LookupError) as exc:
+            raise ParseError(f"JSON parse error - {str(exc)}")
@@ -1,8 +1,10 @@
+import inspect
 import re
+from operator import attrgetter, methodcaller
 
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
-from django.core.exceptions import ValidationError
+from django.core.exceptions import ImproperlyConfigured, ValidationError
 from rest_framework import serializers
 
 from .models import EmailVerificationToken, LoginHistory, PasswordResetToken, User
@@ -179,6 +181,78 @@ class UserProfileSerializer(serializers.ModelSerializer):
         ]
 
 
+class FastReadSerializer:
+    """
+    تمثيل للقراءة فقط مُجمّع مرة واحدة من حقول ModelSerializer
+
+    ModelSerializer يبني حقوله من الـ model مع كل إنشاء (introspection
+    و deepcopy وvalidators)، ثم يمر على كل حقل. هنا تُبنى الحقول مرة واحدة
+    ويُحفظ لكل حقل getter ودالة تحويل، وتُتخطى دالة التحويل عندما تكون القيمة
+    من نوعها الأصلي (str لحقول النص، bool، int) لأن ناتجها هو القيمة نفسها.
+
+    الناتج dict عادي مطابق لـ serializer_class(instance).data. الحقول المتداخلة
+    والعلاقات و source="*" غير مدعومة.
+    """
+
+    # أنواع حقول تعيد القيمة كما هي إذا كانت من هذا النوع
+    NATIVE_TYPES = {
+        serializers.CharField: str,
+        serializers.EmailField: str,
+        serializers.URLField: str,
+        serializers.IntegerField: int,
+        serializers.BooleanField: bool,
+    }
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self._plan = None
+
+    def _compile(self):
+        model = self.serializer_class.Meta.model
+        plan = []
+        for field in self.serializer_class()._readable_fields:
+            if (
+                isinstance(
+                    field, (serializers.BaseSerializer, serializers.RelatedField)
+                )
+                or len(field.source_attrs) != 1
+            ):
+                raise ImproperlyConfigured(
+                    f"{self.serializer_class.__name__}.{field.field_name} "
+                    f"cannot be compiled to a fast read serializer"
+                )
+            attr = field.source_attrs[0]
+            if inspect.isfunction(getattr(model, attr, None)):
+                getter = methodcaller(attr)
+            else:
+                getter = attrgetter(attr)
+            if isinstance(field, serializers.ReadOnlyField):
+                native_type, convert = object, None
+            else:
+                native_type = self.NATIVE_TYPES.get(type(field))
+                convert = field.to_representation
+            plan.append((field.field_name, getter, native_type, convert))
+        return plan
+
+    def to_representation(self, instance):
+        plan = self._plan
+        if plan is None:
+            plan = self._plan = self._compile()
+
+        data = {}
+        for name, getter, native_type, convert in plan:
+            value = getter(instance)
+            if value is not None and convert is not None:
+                if native_type is None or type(value) is not native_type:
+                    value = convert(value)
+            data[name] = value
+        return data
+
+
+# مسار القراءة السريع للملف الشخصي في login و register و user_info وغيرها
+fast_user_profile_serializer = FastReadSerializer(UserProfileSerializer)
+
+
 class ChangePasswordSerializer(serializers.Serializer):
     """
     مسلسل تغيير كلمة المرور
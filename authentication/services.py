@@ -1,16 +1,22 @@
 import logging
+from collections import Counter
 from datetime import timedelta
 
-import requests
 from django.conf import settings
 from django.core.mail import send_mail
+from django.db import transaction
+from django.db.models import Count, F
 from django.template.loader import render_to_string
 from django.urls import reverse
 from django.utils import timezone
-from google.auth.transport import requests as google_requests
-from google.oauth2 import id_token
 
-from .models import EmailVerificationToken, PasswordResetToken, User
+from .models import (
+    EmailVerificationToken,
+    PasswordResetToken,
+    User,
+    UserStatisticsCounter,
+)
+from .timing import span
 
 logger = logging.getLogger(__name__)
 
@@ -51,13 +57,14 @@ class EmailService:
             مع تحيات فريق منصة نائبك
             """
 
-            send_mail(
-                subject=subject,
-                message=message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[user.email],
-                fail_silently=False,
-            )
+            with span("smtp"):
+                send_mail(
+                    subject=subject,
+                    message=message,
+                    from_email=settings.DEFAULT_FROM_EMAIL,
+                    recipient_list=[user.email],
+                    fail_silently=False,
+                )
 
             logger.info(f"Verification email sent to {user.email}")
             return True
@@ -97,13 +104,14 @@ class EmailService:
             مع تحيات فريق منصة نائبك
             """
 
-            send_mail(
-                subject=subject,
-                message=message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[user.email],
-                fail_silently=False,
-            )
+            with span("smtp"):
+                send_mail(
+                    subject=subject,
+                    message=message,
+                    from_email=settings.DEFAULT_FROM_EMAIL,
+                    recipient_list=[user.email],
+                    fail_silently=False,
+                )
 
             logger.info(f"Password reset email sent to {user.email}")
             return True
@@ -125,11 +133,16 @@ class GoogleAuthService:
         """
         التحقق من رمز Google والحصول على معلومات المستخدم
         """
+        # مكتبات Google ثقيلة، لذا تُحمّل عند أول استخدام فقط
+        from google.auth.transport import requests as google_requests
+        from google.oauth2 import id_token
+
         try:
             # التحقق من الرمز مع Google
-            idinfo = id_token.verify_oauth2_token(
-                token, google_requests.Request(), settings.GOOGLE_OAUTH2_CLIENT_ID
-            )
+            with span("google"):
+                idinfo = id_token.verify_oauth2_token(
+                    token, google_requests.Request(), settings.GOOGLE_OAUTH2_CLIENT_ID
+                )
 
             # التحقق من صحة الجهة المصدرة
             if idinfo["iss"] not in [
@@ -251,24 +264,118 @@ class UserService:
     @staticmethod
     def get_user_statistics():
         """
-        الحصول على إحصائيات المستخدمين
+        الحصول على إحصائيات المستخدمين من جدول العدادات
         """
         try:
-            total_users = User.objects.count()
-            verified_users = User.objects.filter(is_verified=True).count()
-            citizens = User.objects.filter(user_type="citizen").count()
-            representatives = User.objects.filter(user_type="representative").count()
-            admins = User.objects.filter(user_type="admin").count()
+            counters = dict(UserStatisticsCounter.objects.values_list("key", "value"))
+            total_users = counters.get("total", 0)
+            verified_users = counters.get("verified", 0)
 
             return {
                 "total_users": total_users,
                 "verified_users": verified_users,
                 "unverified_users": total_users - verified_users,
-                "citizens": citizens,
-                "representatives": representatives,
-                "admins": admins,
+                "citizens": counters.get("user_type:citizen", 0),
+                "representatives": counters.get("user_type:representative", 0),
+                "admins": counters.get("user_type:admin", 0),
+                "by_governorate": {
+                    key.split(":", 1)[1]: value
+                    for key, value in counters.items()
+                    if key.startswith("governorate:") and value
+                },
             }
 
         except Exception as e:
             logger.error(f"Error getting user statistics: {str(e)}")
             return None
+
+    @staticmethod
+    def get_statistics_keys(user_type, governorate, is_verified):
+        """
+        مفاتيح العدادات التي يساهم فيها مستخدم بهذه القيم
+        """
+        keys = ["total", f"user_type:{user_type}"]
+        if is_verified:
+            keys.append("verified")
+        if governorate:
+            keys.append(f"governorate:{governorate}")
+        return keys
+
+    @staticmethod
+    def adjust_user_statistics(old_keys=(), new_keys=()):
+        """
+        تعديل العدادات بالفرق بين المفاتيح القديمة والجديدة
+        """
+        deltas = Counter(new_keys)
+        deltas.subtract(old_keys)
+
+        for key, delta in deltas.items():
+            if not delta:
+                continue
+            updated = UserStatisticsCounter.objects.filter(key=key).update(
+                value=F("value") + delta, updated_at=timezone.now()
+            )
+            if not updated:
+                counter, created = UserStatisticsCounter.objects.get_or_create(
+                    key=key, defaults={"value": delta}
+                )
+                if not created:
+                    UserStatisticsCounter.objects.filter(pk=counter.pk).update(
+                        value=F("value") + delta, updated_at=timezone.now()
+                    )
+
+    @staticmethod
+    def compute_user_statistics():
+        """
+        حساب العدادات مباشرة من جدول المستخدمين
+        """
+        counters = Counter(
+            {
+                "total": User.objects.count(),
+                "verified": User.objects.filter(is_verified=True).count(),
+            }
+        )
+        for row in User.objects.values("user_type").annotate(count=Count("id")):
+            counters[f"user_type:{row['user_type']}"] = row["count"]
+        for row in (
+            User.objects.exclude(governorate__isnull=True)
+            .exclude(governorate="")
+            .values("governorate")
+            .annotate(count=Count("id"))
+        ):
+            counters[f"governorate:{row['governorate']}"] = row["count"]
+        return counters
+
+    @staticmethod
+    def reconcile_user_statistics():
+        """
+        تصحيح انحراف العدادات عن البيانات الفعلية
+
+        تُستدعى دورياً (مثلاً عبر cron) لتصحيح أي تغييرات تجاوزت الإشارات
+        مثل QuerySet.update أو bulk_create.
+        """
+        actual = UserService.compute_user_statistics()
+        corrected = 0
+
+        with transaction.atomic():
+            stored = {
+                counter.key: counter
+                for counter in UserStatisticsCounter.objects.select_for_update()
+            }
+            for key, counter in stored.items():
+                value = actual.get(key, 0)
+                if counter.value != value:
+                    counter.value = value
+                    counter.save(update_fields=["value", "updated_at"])
+                    corrected += 1
+            missing = [
+                UserStatisticsCounter(key=key, value=value)
+                for key, value in actual.items()
+                if key not in stored
+            ]
+            UserStatisticsCounter.objects.bulk_create(missing)
+            corrected += len(missing)
+
+        if corrected:
+            logger.warning(f"Reconciled {corrected} drifted user statistics counters")
+        return corrected
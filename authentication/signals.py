@@ -0,0 +1,75 @@
+"""
+إشارات تحديث عدادات إحصائيات المستخدمين وإبطال الملف الشخصي المخزن
+"""
+
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .models import User
+from .profile_cache import invalidate_profile
+from .services import UserService
+
+STATISTICS_FIELDS = ("user_type", "governorate", "is_verified")
+
+
+def _snapshot_statistics_keys(instance):
+    """
+    مفاتيح العدادات للقيم الحالية، أو None إذا كانت بعض الحقول مؤجلة
+    """
+    values = instance.__dict__
+    if any(field not in values for field in STATISTICS_FIELDS):
+        return None
+    return UserService.get_statistics_keys(
+        values["user_type"], values["governorate"], values["is_verified"]
+    )
+
+
+@receiver(post_init, sender=User)
+def remember_user_statistics(sender, instance, **kwargs):
+    """
+    حفظ القيم المحمّلة لحساب الفرق عند الحفظ
+    """
+    instance._statistics_keys = (
+        _snapshot_statistics_keys(instance) if instance.pk else []
+    )
+
+
+@receiver(post_save, sender=User)
+def update_user_statistics(sender, instance, created, **kwargs):
+    """
+    تعديل العدادات بعد إنشاء أو تحديث مستخدم
+    """
+    old_keys = [] if created else instance._statistics_keys
+    new_keys = _snapshot_statistics_keys(instance)
+
+    # الحقول المؤجلة لا تسمح بحساب الفرق، وتتكفل المطابقة الدورية بالتصحيح
+    if old_keys is None or new_keys is None:
+        instance._statistics_keys = new_keys
+        return
+
+    UserService.adjust_user_statistics(old_keys, new_keys)
+    instance._statistics_keys = new_keys
+
+
+@receiver(post_save, sender=User)
+def invalidate_cached_profile(sender, instance, created, **kwargs):
+    """
+    حذف JSON الملف الشخصي المخزن بعد أي تعديل على المستخدم
+    """
+    if not created:
+        invalidate_profile(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def remove_user_statistics(sender, instance, **kwargs):
+    """
+    إنقاص العدادات بعد حذف مستخدم
+    """
+    old_keys = getattr(instance, "_statistics_keys", None)
+    if old_keys:
+        UserService.adjust_user_statistics(old_keys=old_keys)
+
+
+@receiver(post_delete, sender=User)
+def remove_cached_profile(sender, instance, **kwargs):
+    invalidate_profile(instance.pk)
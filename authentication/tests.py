@@ -3,8 +3,11 @@
 # هذا الملف يجمع كل الاختبارات في مكان واحد.
 # مشغل اختبارات Django يكتشف تلقائيًا الاختبارات في الملفات التي يبدأ اسمها بـ `test`.
 
+from .tests_logging import *
 from .tests_models import *
+from .tests_monitoring import *
 from .tests_performance import *
+from .tests_secrets import *
 from .tests_security import *
 from .tests_services import *
 from .tests_views import *
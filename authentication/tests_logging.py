@@ -0,0 +1,171 @@
+# tests_logging.py
+
+import logging
+import threading
+from contextvars import copy_context
+from unittest.mock import patch
+
+import orjson
+from django.test import SimpleTestCase
+
+from auth_service.log_handlers import (
+    AdaptiveSamplingFilter,
+    JsonFormatter,
+    QueueLogHandler,
+)
+
+
+def make_record(message, level=logging.INFO, **extra):
+    record = logging.LogRecord(
+        "authentication", level, __file__, 1, message, None, None
+    )
+    record.__dict__.update(extra)
+    return record
+
+
+class CaptureHandler(logging.Handler):
+    """
+    معالج يحفظ السجلات المنسقة وخيط التنسيق
+    """
+
+    def __init__(self, block=None):
+        super().__init__()
+        self.block = block
+        self.lines = []
+        self.threads = set()
+
+    def emit(self, record):
+        if self.block:
+            self.block.wait()
+        self.threads.add(threading.get_ident())
+        self.lines.append(self.format(record))
+
+
+class QueueLogHandlerTest(SimpleTestCase):
+    """
+    اختبارات معالج السجلات القائم على الطابور
+    """
+
+    def _make_handler(self, target, queue_size=100):
+        handler = QueueLogHandler(console=False, queue_size=queue_size)
+        handler.targets.append(target)
+        self.addCleanup(handler.close)
+        return handler
+
+    def test_records_written_by_listener_thread(self):
+        """اختبار أن التنسيق والكتابة يتمان خارج خيط الطلب"""
+        target = CaptureHandler()
+        target.setFormatter(JsonFormatter())
+        handler = self._make_handler(target)
+
+        handler.handle(make_record("Request completed", correlation_id="abc"))
+        handler.close()
+
+        self.assertNotIn(threading.get_ident(), target.threads)
+        payload = orjson.loads(target.lines[0])
+        self.assertEqual(payload["message"], "Request completed")
+        self.assertEqual(payload["correlation_id"], "abc")
+
+    def test_full_queue_drops_without_blocking(self):
+        """اختبار الإسقاط وعدّه عند امتلاء الطابور"""
+        block = threading.Event()
+        handler = self._make_handler(CaptureHandler(block=block), queue_size=2)
+
+        for index in range(10):
+            handler.handle(make_record(f"line {index}"))
+        block.set()
+
+        # سجل واحد لدى المستمع وسجلان في الطابور
+        self.assertGreaterEqual(handler.dropped, 7)
+
+
+@patch("auth_service.log_handlers.time.monotonic")
+class AdaptiveSamplingFilterTest(SimpleTestCase):
+    """
+    اختبارات أخذ العينات التكيفي للسجلات
+    """
+
+    def _flood(self, sampling, mock_monotonic, second, count):
+        mock_monotonic.return_value = second
+        return [
+            sampling.filter(make_record("Request started", correlation_id=f"{i}"))
+            for i in range(count)
+        ]
+
+    def test_rate_adapts_to_throughput(self, mock_monotonic):
+        """اختبار انخفاض النسبة عند تجاوز المعدل الهدف"""
+        mock_monotonic.return_value = 0
+        sampling = AdaptiveSamplingFilter(target_per_second=100)
+
+        self.assertTrue(all(self._flood(sampling, mock_monotonic, 0, 1000)))
+        kept = sum(self._flood(sampling, mock_monotonic, 1, 1000))
+
+        self.assertAlmostEqual(sampling.rate, 0.1)
+        self.assertLess(kept, 200)
+        self.assertEqual(sampling.sampled_out, 1000 - kept)
+
+    def test_important_records_always_kept(self, mock_monotonic):
+        """اختبار الاحتفاظ بالتحذيرات والطلبات البطيئة والفاشلة"""
+        mock_monotonic.return_value = 0
+        sampling = AdaptiveSamplingFilter(rate=0.0, min_rate=0.0)
+
+        self.assertTrue(
+            sampling.filter(make_record("x", logging.WARNING, correlation_id="a"))
+        )
+        self.assertTrue(
+            sampling.filter(make_record("x", correlation_id="a", duration=2.0))
+        )
+        self.assertTrue(
+            sampling.filter(make_record("x", correlation_id="a", status_code=500))
+        )
+        self.assertTrue(sampling.filter(make_record("User logged in")))
+        self.assertFalse(sampling.filter(make_record("x", correlation_id="b")))
+
+    def test_decision_consistent_per_request(self, mock_monotonic):
+        """اختبار بقاء سطور الطلب الواحد معاً"""
+        mock_monotonic.return_value = 0
+        sampling = AdaptiveSamplingFilter(rate=0.5)
+
+        for index in range(50):
+            started = sampling.filter(make_record("started", correlation_id=index))
+            completed = sampling.filter(make_record("completed", correlation_id=index))
+            self.assertEqual(started, completed)
+
+    def test_decision_survives_rate_change(self, mock_monotonic):
+        """اختبار أن تغير النسبة بين سطري الطلب لا يفصل بينهما"""
+        mock_monotonic.return_value = 0
+        sampling = AdaptiveSamplingFilter(target_per_second=10)
+
+        self.assertTrue(sampling.filter(make_record("started", correlation_id="r")))
+        # الطلبات الأخرى تعمل في سياقاتها الخاصة
+        for second, count in ((0, 1000), (1, 1)):
+            copy_context().run(self._flood, sampling, mock_monotonic, second, count)
+        self.assertLess(sampling.rate, 0.1)
+
+        self.assertTrue(sampling.filter(make_record("completed", correlation_id="r")))
+
+    def test_slow_request_keeps_started_line(self, mock_monotonic):
+        """اختبار كتابة سطر بداية الطلب البطيء أو الفاشل مع سطر نهايته"""
+        mock_monotonic.return_value = 0
+        sampling = AdaptiveSamplingFilter(rate=0.0, min_rate=0.0)
+        target = CaptureHandler()
+        target.setFormatter(JsonFormatter())
+        handler = QueueLogHandler(console=False)
+        handler.targets.append(target)
+        handler.addFilter(sampling)
+        self.addCleanup(handler.close)
+
+        handler.handle(make_record("Request started", correlation_id="fast"))
+        handler.handle(make_record("Request completed", correlation_id="fast"))
+        handler.handle(make_record("Request started", correlation_id="slow"))
+        handler.handle(
+            make_record("Request completed", correlation_id="slow", duration=2.0)
+        )
+        handler.close()
+
+        lines = [orjson.loads(line) for line in target.lines]
+        self.assertEqual(
+            [(line["message"], line["correlation_id"]) for line in lines],
+            [("Request started", "slow"), ("Request completed", "slow")],
+        )
+        self.assertEqual(sampling.sampled_out, 2)
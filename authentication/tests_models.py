@@ -3,7 +3,9 @@
 from datetime import timedelta
 
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
 from .models import EmailVerificationToken, PasswordResetToken, RefreshToken
@@ -92,3 +94,90 @@ class TokenModelsTest(TestCase):
         verification_token.is_used = True
         verification_token.save()
         self.assertFalse(verification_token.is_valid())
+
+
+class DirtyFieldsTest(TestCase):
+    """
+    اختبارات كتابة الأعمدة المعدلة فقط عند الحفظ
+    """
+
+    def setUp(self):
+        created = User.objects.create_user(
+            username="dirty",
+            email="dirty@example.com",
+            password="password123",
+            address="عنوان طويل",
+        )
+        self.user = User.objects.get(pk=created.pk)
+
+    def capture_save(self, instance):
+        with CaptureQueriesContext(connection) as queries:
+            instance.save()
+        return [query["sql"] for query in queries.captured_queries]
+
+    def test_save_updates_only_changed_columns(self):
+        """اختبار أن UPDATE يشمل الحقول المعدلة و updated_at فقط"""
+        self.user.last_login = timezone.now()
+        self.user.is_verified = True
+
+        # إشارة العدادات تضيف استعلاماتها الخاصة لتغير is_verified
+        queries = [
+            sql
+            for sql in self.capture_save(self.user)
+            if sql.startswith('UPDATE "auth_users"')
+        ]
+
+        self.assertEqual(len(queries), 1)
+        sql = queries[0]
+        for column in ("last_login", "is_verified", "updated_at"):
+            self.assertIn(f'"{column}"', sql)
+        for column in ("address", "email", "password", "first_name"):
+            self.assertNotIn(f'"{column}"', sql)
+
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_verified)
+
+    def test_unchanged_save_issues_no_query(self):
+        """اختبار عدم إرسال أي استعلام عند عدم وجود تعديل"""
+        self.assertEqual(self.capture_save(self.user), [])
+
+        self.user.first_name = "Changed"
+        self.capture_save(self.user)
+        # بعد الحفظ تصبح القيم المحفوظة هي الأساس للمقارنة
+        self.assertEqual(self.capture_save(self.user), [])
+
+    def test_new_instance_tracked_after_insert(self):
+        """اختبار تتبع الكائن بعد إنشائه"""
+        token = RefreshToken.objects.create(
+            user=self.user,
+            token="dirty-token",
+            expires_at=timezone.now() + timedelta(days=1),
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            token.revoke()
+
+        self.assertEqual(len(queries), 1)
+        sql = queries.captured_queries[0]["sql"]
+        self.assertIn('"is_revoked"', sql)
+        self.assertNotIn('"token"', sql)
+        self.assertNotIn('"expires_at"', sql)
+
+    def test_deferred_field_assignment_is_saved(self):
+        """اختبار حفظ حقل مؤجل تم تعيينه"""
+        user = User.objects.only("id", "email").get(pk=self.user.pk)
+        user.city = "الإسكندرية"
+
+        queries = self.capture_save(user)
+
+        self.assertEqual(len(queries), 1)
+        self.assertIn('"city"', queries[0])
+        self.assertNotIn('"address"', queries[0])
+        self.assertEqual(User.objects.get(pk=user.pk).city, "الإسكندرية")
+
+    def test_explicit_update_fields_include_auto_now(self):
+        """اختبار إضافة updated_at إلى update_fields الصريحة"""
+        with CaptureQueriesContext(connection) as queries:
+            self.user.save(update_fields=["last_login"])
+
+        self.assertIn('"updated_at"', queries.captured_queries[0]["sql"])
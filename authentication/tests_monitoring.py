@@ -0,0 +1,304 @@
+# tests_monitoring.py
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from prometheus_client import REGISTRY
+
+from auth_service import metrics
+
+from . import monitoring
+from .health import (
+    AsyncHealthProbeMiddleware,
+    BackgroundHealthChecker,
+    HealthProbeMiddleware,
+)
+from .models import RefreshToken
+from .monitoring import HealthChecker, MonitoringMiddleware
+
+User = get_user_model()
+
+WORKER_SCRIPT = """
+from prometheus_client import Counter
+Counter("worker_requests_total", "Requests", ["endpoint"]).labels("login").inc(3)
+"""
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class MonitoringMiddlewareTest(SimpleTestCase):
+    """
+    اختبارات middleware المراقبة
+    """
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def _process(self, response, path="/api/auth/refresh-token/"):
+        request = self.factory.post(path, data="x" * 40, content_type="text/plain")
+        middleware = MonitoringMiddleware(lambda request: response)
+        return middleware(request)
+
+    def test_regular_response_size(self):
+        """اختبار قياس حجم الاستجابة العادية"""
+        before = sample(
+            "http_response_size_bytes_sum", method="POST", endpoint="refresh_token"
+        )
+        self._process(HttpResponse(b"a" * 123))
+
+        after = sample(
+            "http_response_size_bytes_sum", method="POST", endpoint="refresh_token"
+        )
+        self.assertEqual(after - before, 123)
+
+    def test_streaming_response_counted_when_finished(self):
+        """اختبار عدّ بايتات الاستجابة المتدفقة عند انتهائها فقط"""
+        labels = {"method": "POST", "endpoint": "refresh_token"}
+        count_before = sample("http_response_size_bytes_count", **labels)
+        sum_before = sample("http_response_size_bytes_sum", **labels)
+        request_before = sample("http_request_size_bytes_sum", **labels)
+
+        response = self._process(
+            StreamingHttpResponse(b"chunk-%d" % i for i in range(100))
+        )
+        self.assertEqual(
+            sample("http_response_size_bytes_count", **labels), count_before
+        )
+
+        body = b"".join(response.streaming_content)
+        response.close()
+
+        self.assertEqual(
+            sample("http_response_size_bytes_count", **labels), count_before + 1
+        )
+        self.assertEqual(
+            sample("http_response_size_bytes_sum", **labels) - sum_before, len(body)
+        )
+        self.assertEqual(
+            sample("http_request_size_bytes_sum", **labels) - request_before, 40
+        )
+
+    def test_interrupted_stream_recorded_once(self):
+        """اختبار تسجيل التدفق المقطوع مرة واحدة عند الإغلاق"""
+        labels = {"method": "POST", "endpoint": "refresh_token"}
+        count_before = sample("http_response_size_bytes_count", **labels)
+
+        response = self._process(StreamingHttpResponse(iter([b"a", b"b", b"c"])))
+        next(iter(response.streaming_content))
+        response.close()
+        response.close()
+
+        self.assertEqual(
+            sample("http_response_size_bytes_count", **labels), count_before + 1
+        )
+
+
+class EndpointLabelTest(SimpleTestCase):
+    """
+    اختبارات تسميات endpoint المبنية على نمط URL
+    """
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def _label(self, path):
+        return MonitoringMiddleware.get_endpoint_label(self.factory.get(path))
+
+    def test_labels_from_url_names(self):
+        """اختبار أخذ التسمية من اسم النمط المطابق"""
+        self.assertEqual(self._label("/api/auth/google-auth/"), "google_auth")
+        self.assertEqual(self._label("/api/auth/login/"), "login")
+        self.assertEqual(self._label("/monitoring/metrics/"), "metrics")
+        self.assertEqual(self._label("/admin/"), "admin:index")
+
+    def test_path_parameters_share_label(self):
+        """اختبار أن المسارات ذات المعاملات تشترك في تسمية واحدة"""
+        self.assertEqual(
+            self._label("/admin/authentication/user/1/change/"),
+            self._label("/admin/authentication/user/2/change/"),
+        )
+
+    def test_unmatched_paths_bucketed(self):
+        """اختبار جمع المسارات غير المعروفة في تسمية واحدة"""
+        self.assertEqual(self._label("/wp-login.php"), "unmatched")
+        self.assertEqual(self._label("/api/auth/%s/" % ("x" * 50)), "unmatched")
+
+    def test_label_limit(self):
+        """اختبار أن الأنماط الجديدة بعد بلوغ الحد تُجمع في other"""
+        with patch.object(monitoring, "_endpoint_labels", {}), patch.object(
+            monitoring, "ENDPOINT_LABEL_LIMIT", 1
+        ):
+            self.assertEqual(self._label("/api/auth/login/"), "login")
+            self.assertEqual(self._label("/api/auth/register/"), "other")
+            self.assertEqual(self._label("/api/auth/login/"), "login")
+
+
+class MultiprocessMetricsTest(TestCase):
+    """
+    اختبارات تجميع المقاييس من عدة عمال
+    """
+
+    def test_metrics_aggregated_across_workers(self):
+        """اختبار جمع قيم العمال المختلفين في endpoint واحد"""
+        with tempfile.TemporaryDirectory() as path:
+            env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=path)
+            for _ in range(2):
+                subprocess.run(
+                    [sys.executable, "-c", WORKER_SCRIPT], env=env, check=True
+                )
+
+            with patch.dict(os.environ, {"PROMETHEUS_MULTIPROC_DIR": path}):
+                response = self.client.get(reverse("metrics"))
+                metrics.mark_worker_dead(os.getpid())
+
+        self.assertIn(
+            'worker_requests_total{endpoint="login"} 6.0', response.content.decode()
+        )
+
+    def test_active_sessions_gauge(self):
+        """اختبار أن الجلسات النشطة gauge يعكس رموز التحديث الصالحة"""
+        user = User.objects.create_user(
+            username="gauge", email="gauge@example.com", password="pass"
+        )
+        future = timezone.now() + timedelta(days=1)
+        RefreshToken.objects.create(user=user, token="a", expires_at=future)
+        RefreshToken.objects.create(
+            user=user, token="b", expires_at=future, is_revoked=True
+        )
+        RefreshToken.objects.create(
+            user=user, token="c", expires_at=timezone.now() - timedelta(days=1)
+        )
+
+        with patch.object(monitoring, "_active_sessions_updated_at", 0.0):
+            self.client.get(reverse("metrics"))
+
+        self.assertEqual(REGISTRY.get_sample_value("active_sessions"), 1)
+
+
+class HealthProbeTest(SimpleTestCase):
+    """
+    اختبارات مسارات liveness و readiness
+    """
+
+    def setUp(self):
+        self.app_calls = []
+        self.checker = BackgroundHealthChecker(
+            {"database": lambda: (True, "ok"), "redis": lambda: (True, "ok")},
+            timeout=0.5,
+        )
+        self.checker._pid = os.getpid()  # بدون خيط خلفي في الاختبارات
+        patcher = patch("authentication.health.health_checker", self.checker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.middleware = HealthProbeMiddleware(self._app)
+
+    def _app(self, environ, start_response):
+        self.app_calls.append(environ["PATH_INFO"])
+        start_response("200 OK", [])
+        return [b"django"]
+
+    def _get(self, path):
+        result = {}
+
+        def start_response(status, headers):
+            result["status"] = status
+
+        body = b"".join(self.middleware({"PATH_INFO": path}, start_response))
+        return (
+            result["status"],
+            json.loads(body) if path.startswith("/health") else body,
+        )
+
+    def test_liveness_bypasses_django(self):
+        """اختبار أن liveness لا يمر عبر تطبيق Django"""
+        status, body = self._get("/health/live/")
+        self.assertEqual(status, "200 OK")
+        self.assertEqual(body, {"status": "alive"})
+        self.assertEqual(self.app_calls, [])
+
+    def test_asgi_liveness_bypasses_django(self):
+        """اختبار liveness لتطبيق ASGI (عمال uvicorn)"""
+        messages = []
+
+        async def app(scope, receive, send):
+            self.app_calls.append(scope["path"])
+
+        async def send(message):
+            messages.append(message)
+
+        middleware = AsyncHealthProbeMiddleware(app)
+        asyncio.run(middleware({"type": "http", "path": "/health/live/"}, None, send))
+        asyncio.run(middleware({"type": "http", "path": "/api/auth/"}, None, send))
+
+        self.assertEqual(messages[0]["status"], 200)
+        self.assertEqual(json.loads(messages[1]["body"]), {"status": "alive"})
+        self.assertEqual(self.app_calls, ["/api/auth/"])
+
+    def test_other_paths_reach_django(self):
+        """اختبار تمرير بقية المسارات إلى Django"""
+        self.assertEqual(self._get("/api/auth/login/"), ("200 OK", b"django"))
+
+    def test_readiness_serves_cached_results(self):
+        """اختبار أن readiness يقرأ النتائج المحفوظة دون تشغيل الفحوصات"""
+        status, body = self._get("/health/ready/")
+        self.assertTrue(status.startswith("503"))
+
+        self.checker.run_checks()
+        with patch.object(HealthChecker, "check_database") as check:
+            status, body = self._get("/health/ready/")
+        check.assert_not_called()
+        self.assertEqual(status, "200 OK")
+        self.assertEqual(body["status"], "healthy")
+        self.assertIsNotNone(body["checks"]["database"]["last_success"])
+
+    def test_check_timeout_and_last_success(self):
+        """اختبار مهلة الفحص والاحتفاظ بوقت آخر نجاح"""
+        self.checker.run_checks()
+        last_success = self.checker.results["redis"]["last_success"]
+
+        release = threading.Event()
+        self.checker.checks["redis"] = lambda: release.wait(5) and (True, "ok")
+        self.checker.run_checks()
+        release.set()
+
+        result = self.checker.results["redis"]
+        self.assertFalse(result["status"])
+        self.assertIn("Timed out", result["message"])
+        self.assertEqual(result["last_success"], last_success)
+        self.assertEqual(self.checker.snapshot()["status"], "unhealthy")
+
+    def test_stale_results_not_ready(self):
+        """اختبار أن النتائج القديمة تعتبر غير جاهزة"""
+        self.checker.run_checks()
+        for result in self.checker.results.values():
+            result["checked_at"] -= self.checker.stale_after + 1
+        self.assertEqual(self.checker.snapshot()["status"], "unhealthy")
+
+    def test_optional_check_failure_is_degraded(self):
+        """اختبار بقاء الخدمة جاهزة عند تعطل اعتمادية اختيارية"""
+        self.checker.optional = {"redis"}
+        self.checker.checks["redis"] = lambda: (False, "Redis connection failed")
+        self.checker.run_checks()
+
+        status, body = self._get("/health/ready/")
+        self.assertEqual(status, "200 OK")
+        self.assertEqual(body["status"], "degraded")
+
+        self.checker.checks["database"] = lambda: (False, "Database down")
+        self.checker.run_checks()
+        status, body = self._get("/health/ready/")
+        self.assertTrue(status.startswith("503"))
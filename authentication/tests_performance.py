@@ -1,13 +1,81 @@
 # tests_performance.py
 
+import datetime
+import decimal
+import io
+import json
+import os
+import subprocess
+import sys
+import threading
 import time
+import uuid
+from contextlib import ExitStack
+from unittest import SkipTest, skipUnless
+from unittest.mock import patch
 
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.urls import reverse
-from rest_framework.test import APITestCase
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.messages.middleware import MessageMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import OperationalError, connections
+from django.db.utils import ConnectionHandler
+from django.http import HttpResponse
+from django.middleware.csrf import CsrfViewMiddleware
+from django.test import (
+    AsyncRequestFactory,
+    Client,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import resolve, reverse
+from django.utils import timezone
+from prometheus_client import REGISTRY
+from psycopg2 import extensions
+from rest_framework import serializers
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ParseError
+from rest_framework.permissions import AllowAny
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from auth_service.db_pool.base import ConnectionPool
+from auth_service.warmup import warm_up_worker
+
+from . import async_views, views
+from .authentication import JWTTokenGenerator
+from .caching import cached_response
+from .db_routing import ReadReplicaMiddleware, ReplicaRouter, uses_read_replica
+from .management.commands.benchmark_serializers import _sample_user, build_payloads
+from .middleware import RateLimitMiddleware, RequestContextMiddleware
+from .profile_cache import _cache_key
+from .query_budget import QueryBudgetExceeded, QueryBudgetMiddleware
+from .renderers import ORJSONParser, ORJSONRenderer
+from .serializers import (
+    FastReadSerializer,
+    UserProfileSerializer,
+    fast_user_profile_serializer,
+)
+from .tiered_cache import LocalLRU, TieredRedisCache
+from .timing import ServerTimingMiddleware, span
+
+try:
+    import fakeredis
+except ImportError:  # fakeredis من متطلبات التطوير فقط
+    fakeredis = None
 
 User = get_user_model()
 
+# اختبارات الزمن الفعلي تتأثر بحمل الجهاز، فلا تعمل إلا عند طلبها صراحة
+RUN_BENCHMARKS = os.environ.get("RUN_BENCHMARKS", "").lower() == "true"
+
 
 class PerformanceAPITest(APITestCase):
     """
@@ -50,3 +118,939 @@ class PerformanceAPITest(APITestCase):
         # نتوقع أن تكون الاستجابة سريعة جداً (أقل من 200 مللي ثانية)
         self.assertLess(duration, 0.2)
         print(f"Profile View API response time: {duration:.4f} seconds")
+
+
+LOCMEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ResponseCacheTest(TestCase):
+    """
+    اختبارات التخزين المؤقت المحمي من التدافع
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.factory = APIRequestFactory()
+        self.calls = 0
+
+        @api_view(["GET"])
+        @permission_classes([AllowAny])
+        @cached_response(timeout=60, stale_timeout=60)
+        def slow_view(request):
+            self.calls += 1
+            time.sleep(0.2)
+            return Response({"calls": self.calls})
+
+        self.view = slow_view
+
+    def test_concurrent_requests_compute_once(self):
+        """اختبار أن الطلبات المتزامنة تسبب حساباً واحداً فقط"""
+        responses = []
+
+        def call():
+            responses.append(self.view(self.factory.get("/stats/")))
+
+        threads = [threading.Thread(target=call) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(len(responses), 8)
+        self.assertTrue(all(r.data == {"calls": 1} for r in responses))
+
+    def test_stale_entry_served_while_locked(self):
+        """اختبار خدمة النسخة القديمة أثناء إعادة الحساب من طلب آخر"""
+        self.view(self.factory.get("/stats/"))
+        key = f"response_cache:{__name__}.slow_view:/stats/"
+        entry = cache.get(key)
+        entry["expires_at"] = time.time() - 1
+        cache.set(key, entry)
+        cache.add(f"{key}:lock", 1)
+
+        response = self.view(self.factory.get("/stats/"))
+
+        self.assertEqual(response["X-Cache"], "STALE")
+        self.assertEqual(self.calls, 1)
+
+
+LEGACY_MIDDLEWARE = [
+    "corsheaders.middleware.CorsMiddleware",
+    "django.middleware.security.SecurityMiddleware",
+    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "authentication.monitoring.MonitoringMiddleware",
+    "authentication.middleware.SecurityMiddleware",
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.middleware.common.CommonMiddleware",
+    "django.middleware.csrf.CsrfViewMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware",
+    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+]
+
+
+class MiddlewarePipelineTest(TestCase):
+    """
+    اختبارات سلسلة middleware لطلبات الواجهة البرمجية
+    """
+
+    def test_api_request_skips_session_machinery(self):
+        """اختبار تخطي الجلسات والرسائل لمسارات /api/"""
+        response = self.client.get(
+            reverse("user_statistics"), HTTP_X_FORWARDED_FOR="10.0.0.1, 10.0.0.2"
+        )
+        request = response.wsgi_request
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("X-Correlation-ID", response)
+        # العنوان الذي أضافه nginx (TRUSTED_PROXY_COUNT=1)، لا ما أرسله العميل
+        self.assertEqual(request.client_ip, "10.0.0.2")
+        self.assertEqual(request.route_name, "user_statistics")
+        self.assertFalse(hasattr(request, "session"))
+        self.assertFalse(hasattr(request, "_messages"))
+
+    def test_admin_request_keeps_session(self):
+        """اختبار بقاء الجلسات لمسارات لوحة الإدارة"""
+        response = self.client.get("/admin/login/")
+        self.assertTrue(hasattr(response.wsgi_request, "session"))
+
+    def _count_web_middleware_calls(self, path):
+        hooks = {
+            SessionMiddleware: "process_request",
+            CsrfViewMiddleware: "process_view",
+            AuthenticationMiddleware: "process_request",
+            MessageMiddleware: "process_request",
+        }
+        with ExitStack() as stack:
+            mocks = {
+                cls.__name__: stack.enter_context(
+                    patch.object(
+                        cls, name, autospec=True, side_effect=getattr(cls, name)
+                    )
+                )
+                for cls, name in hooks.items()
+            }
+            self.client.get(path)
+        return {name: mock.call_count for name, mock in mocks.items()}
+
+    def test_web_only_middleware_runs_for_web_paths_only(self):
+        """اختبار أن middleware المتصفح لا يعمل على مسارات /api/"""
+        api_calls = self._count_web_middleware_calls(reverse("user_statistics"))
+        web_calls = self._count_web_middleware_calls("/admin/login/")
+
+        self.assertEqual(set(api_calls.values()), {0})
+        self.assertNotIn(0, web_calls.values())
+
+    def _time_requests(self, middleware, count=200):
+        with override_settings(MIDDLEWARE=middleware):
+            client = Client()
+            url = reverse("user_statistics")
+            client.get(url)
+            start_time = time.perf_counter()
+            for _ in range(count):
+                client.get(url)
+            return (time.perf_counter() - start_time) / count
+
+    @skipUnless(RUN_BENCHMARKS, "RUN_BENCHMARKS غير مفعل")
+    def test_middleware_overhead_benchmark(self):
+        """قياس زمن الطلب مع السلسلة القديمة والسلسلة الحالية"""
+        legacy = self._time_requests(LEGACY_MIDDLEWARE)
+        current = self._time_requests(settings.MIDDLEWARE)
+
+        print(
+            f"\nMiddleware per-request time: legacy {legacy * 1000:.3f} ms, "
+            f"current {current * 1000:.3f} ms"
+        )
+        self.assertLess(current, legacy * 1.5)
+
+    @override_settings(SERVER_TIMING_ENABLED=True, READ_REPLICA_ENABLED=True)
+    def test_service_middleware_is_async_capable(self):
+        """اختبار عمل middlewares الخدمة دون انتقال إلى خيط تحت ASGI"""
+
+        async def get_response(request):
+            return HttpResponse()
+
+        for cls in (
+            RequestContextMiddleware,
+            ServerTimingMiddleware,
+            QueryBudgetMiddleware,
+            RateLimitMiddleware,
+            ReadReplicaMiddleware,
+        ):
+            with self.subTest(middleware=cls.__name__):
+                middleware = cls(get_response)
+                self.assertTrue(iscoroutinefunction(middleware))
+                if hasattr(middleware, "process_view"):
+                    self.assertTrue(iscoroutinefunction(middleware.process_view))
+
+    @override_settings(SERVER_TIMING_ENABLED=True)
+    async def test_async_pipeline_headers(self):
+        """اختبار ترويسات middlewares الخدمة عبر معالج ASGI"""
+        response = await self.async_client.get(reverse("metrics"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("X-Correlation-ID", response)
+        self.assertIn("total;dur=", response["Server-Timing"])
+
+
+class ServerTimingTest(TestCase):
+    """
+    اختبارات ترويسة Server-Timing لأزمنة المراحل
+    """
+
+    def setUp(self):
+        User.objects.create_user(
+            username="timing", email="timing@example.com", password="TimingPass123!"
+        )
+
+    def _phases(self, response):
+        return {
+            entry.split(";")[0].strip()
+            for entry in response["Server-Timing"].split(",")
+        }
+
+    @override_settings(SERVER_TIMING_ENABLED=True)
+    def test_login_phases(self):
+        """اختبار تفصيل زمن تسجيل الدخول إلى مراحله"""
+        response = self.client.post(
+            reverse("login"),
+            {"email": "timing@example.com", "password": "TimingPass123!"},
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(
+            {"db", "hasher", "jwt", "total"}.issubset(self._phases(response))
+        )
+        self.assertRegex(response["Server-Timing"], r"hasher;dur=\d+\.\d{2}")
+
+    def test_disabled_by_default(self):
+        """اختبار عدم إضافة الترويسة عند تعطيل الميزة"""
+        response = self.client.get(reverse("metrics"))
+        self.assertFalse(response.has_header("Server-Timing"))
+
+    def test_span_outside_request_is_noop(self):
+        """اختبار أن span خارج طلب مُقاس لا يسجل شيئاً"""
+        with span("db") as timing:
+            pass
+        self.assertIsNone(timing.timings)
+
+
+class QueryBudgetTest(TestCase):
+    """
+    اختبارات ميزانية استعلامات SQL لكل view
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="budget", email="budget@example.com", password="BudgetPass123!"
+        )
+        self.auth = {
+            "HTTP_AUTHORIZATION": "Bearer "
+            + JWTTokenGenerator.generate_access_token(self.user)
+        }
+
+    def _google_login(self, google_id, email):
+        google_data = {
+            "google_id": google_id,
+            "email": email,
+            "first_name": "Google",
+            "last_name": "User",
+            "profile_picture": "",
+            "is_verified": True,
+        }
+        with patch(
+            "authentication.services.GoogleAuthService.verify_google_token",
+            return_value=google_data,
+        ):
+            return self.client.post(
+                reverse("google_auth"),
+                {"google_token": "token"},
+                content_type="application/json",
+            )
+
+    def test_google_auth_within_budget(self):
+        """اختبار مسارات Google (مستخدم جديد، ربط حساب، دخول متكرر)"""
+        self.assertEqual(self._google_login("g-1", "new@example.com").status_code, 200)
+        self.assertEqual(
+            self._google_login("g-2", "budget@example.com").status_code, 200
+        )
+        self.assertEqual(
+            self._google_login("g-2", "budget@example.com").status_code, 200
+        )
+
+    def test_authenticated_views_within_budget(self):
+        """اختبار views المحمية مع مصادقة JWT حقيقية"""
+        self.assertEqual(
+            self.client.get(reverse("user_info"), **self.auth).status_code, 200
+        )
+        response = self.client.patch(
+            reverse("user_profile"),
+            {"first_name": "Budget"},
+            content_type="application/json",
+            **self.auth,
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_exceeding_budget_fails_in_strict_mode(self):
+        """اختبار رفع استثناء عند تجاوز الميزانية في الاختبارات"""
+        with patch.object(views.user_info, "query_budget", 0):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(reverse("user_info"), **self.auth)
+
+    @override_settings(QUERY_BUDGET_STRICT=False)
+    def test_exceeding_budget_reported_in_production(self):
+        """اختبار تسجيل التجاوز دون إفشال الطلب خارج الوضع الصارم"""
+        before = (
+            REGISTRY.get_sample_value(
+                "query_budget_exceeded_total", {"endpoint": "user_info"}
+            )
+            or 0
+        )
+        with patch.object(views.user_info, "query_budget", 0):
+            response = self.client.get(reverse("user_info"), **self.auth)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            REGISTRY.get_sample_value(
+                "query_budget_exceeded_total", {"endpoint": "user_info"}
+            ),
+            before + 1,
+        )
+
+
+class ImportTimeTest(SimpleTestCase):
+    """
+    ميزانية زمن استيراد التطبيق عند بدء تشغيل العامل
+    """
+
+    # بالميكروثانية؛ القياس الحالي حوالي 0.3 ثانية
+    IMPORT_TIME_BUDGET = 1500000
+
+    LAZY_MODULES = ("google.cloud.secretmanager", "google.oauth2", "grpc")
+
+    def _import_times(self):
+        """
+        الزمن التراكمي لاستيراد كل وحدة عند استيراد auth_service.wsgi
+        عبر python -X importtime (بالميكروثانية)
+        """
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE="auth_service.test_settings")
+        env.pop("GOOGLE_CLOUD_PROJECT", None)
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import auth_service.wsgi"],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+        cumulative = {}
+        for line in result.stderr.splitlines():
+            if line.startswith("import time:") and "|" in line:
+                _, total, module = line.split("|")
+                if total.strip().isdigit():
+                    cumulative[module.strip()] = int(total)
+        return cumulative
+
+    def test_heavy_modules_imported_lazily(self):
+        """اختبار عدم استيراد مكتبات Google و grpc عند بدء التشغيل"""
+        cumulative = self._import_times()
+
+        self.assertIn("auth_service.wsgi", cumulative)
+        for module in self.LAZY_MODULES:
+            self.assertNotIn(module, cumulative)
+
+    @skipUnless(RUN_BENCHMARKS, "RUN_BENCHMARKS غير مفعل")
+    def test_wsgi_import_time_budget(self):
+        """قياس زمن استيراد auth_service.wsgi مقابل الميزانية"""
+        duration = self._import_times()["auth_service.wsgi"]
+        print(f"\nauth_service.wsgi import time: {duration / 1e6:.3f}s")
+        self.assertLess(duration, self.IMPORT_TIME_BUDGET)
+
+
+class WorkerWarmupTest(TestCase):
+    """
+    اختبارات تهيئة العامل بعد fork
+    """
+
+    databases = {"default", "replica"}
+
+    @patch("authentication.health.health_checker.start")
+    def test_warm_up_worker(self, start_checker):
+        """اختبار فتح الاتصالات وتحميل المسارات ومفاتيح JWT"""
+        from django.db import connection
+
+        timings = warm_up_worker()
+
+        self.assertIsNotNone(connection.connection)
+        self.assertTrue(all(duration is not None for duration in timings.values()))
+        start_checker.assert_called_once()
+
+    @patch("authentication.health.health_checker.start")
+    def test_threaded_worker_skips_thread_local_connection(self, start_checker):
+        """اختبار عدم فتح اتصال لخيط لا يخدم الطلبات في عمال gthread"""
+        from django.db import connection
+
+        with patch.object(connection, "ensure_connection") as ensure_connection:
+            timings = warm_up_worker(threaded=True)
+
+        ensure_connection.assert_not_called()
+        self.assertIsNotNone(timings["database"])
+
+
+@override_settings(
+    READ_REPLICA_ENABLED=True,
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+)
+class ReadReplicaRoutingTest(TransactionTestCase):
+    """
+    اختبارات توجيه القراءات إلى الـ replica (قاعدة SQLite محلية ثانية)
+
+    TransactionTestCase لأن القراءة داخل معاملة مفتوحة تبقى على default.
+    """
+
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="replica",
+            email="replica@example.com",
+            password="ReplicaPass123!",
+            first_name="Primary",
+        )
+        # نسخة متأخرة من نفس المستخدم على الـ replica
+        User.objects.filter(pk=self.user.pk).update(first_name="Primary")
+        replica_user = User.objects.get(pk=self.user.pk)
+        replica_user.first_name = "Replica"
+        replica_user.save(using="replica", force_insert=True)
+        self.auth = {
+            "HTTP_AUTHORIZATION": "Bearer "
+            + JWTTokenGenerator.generate_access_token(self.user)
+        }
+
+    def first_name(self, url_name):
+        response = self.client.get(reverse(url_name), **self.auth)
+        self.assertEqual(response.status_code, 200)
+        return response.json()["user" if url_name == "user_info" else "first_name"]
+
+    def test_read_only_view_reads_from_replica(self):
+        """اختبار قراءة user_info من الـ replica"""
+        self.assertEqual(self.first_name("user_info")["first_name"], "Replica")
+
+    def test_other_views_read_from_primary(self):
+        """اختبار أن الـ views غير المعلنة تقرأ من default"""
+        self.assertEqual(self.first_name("user_profile"), "Primary")
+
+    def test_reads_stick_to_primary_after_write(self):
+        """اختبار رؤية العميل لما كتبه رغم تأخر الـ replica"""
+        response = self.client.patch(
+            reverse("user_profile"),
+            {"first_name": "Updated"},
+            content_type="application/json",
+            **self.auth,
+        )
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.first_name("user_info")["first_name"], "Updated")
+
+        cache.clear()
+        self.assertEqual(self.first_name("user_info")["first_name"], "Replica")
+
+    def test_admin_changelist_uses_replica(self):
+        """اختبار توجيه صفحات القوائم في لوحة الإدارة فقط"""
+        self.assertTrue(
+            uses_read_replica(resolve(reverse("admin:authentication_user_changelist")))
+        )
+        self.assertFalse(
+            uses_read_replica(
+                resolve(reverse("admin:authentication_user_change", args=[1]))
+            )
+        )
+
+    def test_replica_is_never_migrated(self):
+        """اختبار منع الترحيل على الـ replica الحقيقية"""
+        router = ReplicaRouter()
+        self.assertIsNone(router.allow_migrate("default", "authentication"))
+        with patch.dict(connections["replica"].settings_dict, REPLICA_STANDIN=False):
+            self.assertFalse(router.allow_migrate("replica", "authentication"))
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+
+    def close(self):
+        self.closed = 1
+
+
+class ConnectionPoolTest(SimpleTestCase):
+    """
+    اختبارات مجمّع اتصالات قاعدة البيانات
+    """
+
+    def test_reuses_idle_connections(self):
+        """اختبار إعادة استخدام الاتصال الخامل بدل فتح اتصال جديد"""
+        pool = ConnectionPool(FakeConnection, max_size=2, timeout=0.1)
+        connection = pool.acquire()
+        pool.release(connection)
+        self.assertIs(pool.acquire(), connection)
+
+    def test_bounds_open_connections(self):
+        """اختبار انتظار المجمّع الممتلئ ثم فشله بـ OperationalError"""
+        pool = ConnectionPool(FakeConnection, max_size=2, timeout=0.1)
+        first = pool.acquire()
+        pool.acquire()
+        with self.assertRaises(OperationalError):
+            pool.acquire()
+
+        pool.release(first, discard=True)
+        self.assertTrue(first.closed)
+        self.assertIsNot(pool.acquire(), first)
+
+    def _load_settings(self, **env):
+        return subprocess.run(
+            [sys.executable, "-c", "import auth_service.settings"],
+            cwd=settings.BASE_DIR,
+            env=dict(os.environ, DB_POOL_ENABLED="true", DB_REPLICA_HOST="", **env),
+            capture_output=True,
+            text=True,
+        )
+
+    def test_pool_size_above_connection_cap_rejected(self):
+        """اختبار رفض إعداد تتجاوز مجمّعاته حد اتصالات قاعدة البيانات"""
+        workers = {"GUNICORN_WORKERS": "9", "GUNICORN_THREADS": "4"}
+
+        result = self._load_settings(DB_POOL_MAX_CONNECTIONS="20", **workers)
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn("ImproperlyConfigured", result.stderr)
+
+        result = self._load_settings(DB_POOL_MAX_CONNECTIONS="36", **workers)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+
+class PooledBackendTest(SimpleTestCase):
+    """
+    اختبارات محرك auth_service.db_pool على PostgreSQL حقيقي (متغيرات DB_* كما
+    في CI)، وتُتخطى إذا لم يكن PostgreSQL متاحاً
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.handler = ConnectionHandler(
+            {
+                "default": {"ENGINE": "django.db.backends.dummy"},
+                "pooled": {
+                    "ENGINE": "auth_service.db_pool",
+                    "NAME": os.getenv("DB_NAME", "naebak_auth"),
+                    "USER": os.getenv("DB_USER", "postgres"),
+                    "PASSWORD": os.getenv("DB_PASSWORD", ""),
+                    "HOST": os.getenv("DB_HOST", "localhost"),
+                    "PORT": os.getenv("DB_PORT", "5432"),
+                    "OPTIONS": {"connect_timeout": 2},
+                    "POOL": {"MAX_SIZE": 1, "TIMEOUT": 0.1},
+                },
+            }
+        )
+        probe = cls.handler.create_connection("pooled")
+        try:
+            probe.ensure_connection()
+        except OperationalError as e:
+            raise SkipTest(f"PostgreSQL is not available: {e}")
+        probe.close()
+        super().setUpClass()
+
+    def borrow(self):
+        """
+        اتصال Django جديد كما يحصل عليه خيط آخر في العامل
+        """
+        connection = self.handler.create_connection("pooled")
+        self.addCleanup(connection.close)
+        connection.ensure_connection()
+        return connection
+
+    def test_connections_are_bounded_and_reused(self):
+        """اختبار أن الخيط الثاني ينتظر المجمّع ثم يستعير الاتصال نفسه"""
+        first = self.borrow()
+        raw = first.connection
+        with self.assertRaises(OperationalError):
+            self.borrow()
+
+        first.close()
+        second = self.borrow()
+        self.assertIs(second.connection, raw)
+        with second.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            self.assertEqual(cursor.fetchone(), (1,))
+
+    def test_open_transaction_is_rolled_back_on_release(self):
+        """اختبار عدم انتقال معاملة مفتوحة إلى المستعير التالي"""
+        first = self.borrow()
+        first.set_autocommit(False)
+        with first.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        first.close()
+
+        second = self.borrow()
+        self.assertEqual(
+            second.connection.info.transaction_status,
+            extensions.TRANSACTION_STATUS_IDLE,
+        )
+
+
+@skipUnless(fakeredis, "fakeredis is not installed")
+class TieredCacheTest(SimpleTestCase):
+    """
+    اختبارات cache الطبقتين (L1 داخل العملية أمام Redis)
+    """
+
+    def setUp(self):
+        server = fakeredis.FakeServer()
+        # نسختان من الـ backend على نفس Redis كعاملين منفصلين
+        self.workers = [self.make_cache(server) for _ in range(2)]
+        for worker in self.workers:
+            worker.start_listener()
+            self.assertTrue(worker._subscribed.wait(2))
+
+    @staticmethod
+    def make_cache(server):
+        return TieredRedisCache(
+            "redis://localhost:6379/0",
+            {
+                "KEY_PREFIX": "test",
+                "OPTIONS": {
+                    "L1_KEY_PREFIXES": ["profile:"],
+                    "CONNECTION_POOL_KWARGS": {
+                        "connection_class": fakeredis.FakeConnection,
+                        "server": server,
+                    },
+                },
+            },
+        )
+
+    @staticmethod
+    def sample(tier, result):
+        return (
+            REGISTRY.get_sample_value(
+                "cache_requests_total", {"tier": tier, "result": result}
+            )
+            or 0
+        )
+
+    def test_second_read_is_served_from_l1(self):
+        """اختبار خدمة القراءة الثانية من الذاكرة وتسجيل نسب الإصابة"""
+        writer, reader = self.workers
+        writer.set("profile:1", {"name": "first"})
+        l1_hits = self.sample("l1", "hit")
+        l2_hits = self.sample("l2", "hit")
+
+        self.assertEqual(reader.get("profile:1"), {"name": "first"})
+        self.assertEqual(reader.get("profile:1"), {"name": "first"})
+
+        self.assertEqual(self.sample("l1", "hit") - l1_hits, 1)
+        self.assertEqual(self.sample("l2", "hit") - l2_hits, 1)
+
+    def test_writes_invalidate_other_workers(self):
+        """اختبار حذف النسخ المحلية لدى بقية العمال عبر pub/sub"""
+        writer, reader = self.workers
+        writer.set("profile:1", {"name": "first"})
+        self.assertEqual(reader.get("profile:1"), {"name": "first"})
+
+        writer.set("profile:1", {"name": "second"})
+        deadline = time.monotonic() + 1
+        while len(reader.l1) and time.monotonic() < deadline:
+            time.sleep(0.001)
+        self.assertEqual(reader.get("profile:1"), {"name": "second"})
+
+        writer.delete("profile:1")
+        deadline = time.monotonic() + 1
+        while len(reader.l1) and time.monotonic() < deadline:
+            time.sleep(0.001)
+        self.assertIsNone(reader.get("profile:1"))
+
+    def test_other_keys_bypass_l1(self):
+        """اختبار بقاء المفاتيح خارج L1_KEY_PREFIXES في Redis وحده"""
+        worker = self.workers[0]
+        worker.set("rate_limit:login", 3)
+        self.assertEqual(worker.get("rate_limit:login"), 3)
+        self.assertEqual(worker.get_many(["rate_limit:login"]), {"rate_limit:login": 3})
+        self.assertEqual(len(worker.l1), 0)
+
+    def test_l1_is_bounded(self):
+        """اختبار حدّي العدد والمدة في L1"""
+        lru = LocalLRU(max_entries=2)
+        for key in ("a", "b", "c"):
+            lru.set(key, key, timeout=60, generation=lru.generation)
+        self.assertEqual(len(lru), 2)
+        self.assertEqual(lru.get("c"), "c")
+
+        lru.set("d", "d", timeout=0, generation=lru.generation)
+        self.assertEqual(len(lru), 2)
+        self.assertNotEqual(lru.get("d"), "d")
+
+
+class ORJSONRendererTest(SimpleTestCase):
+    """
+    اختبارات تطابق مخرجات ORJSONRenderer مع JSONRenderer
+    """
+
+    def assert_same_output(self, data, *args):
+        self.assertEqual(
+            ORJSONRenderer().render(data, *args), JSONRenderer().render(data, *args)
+        )
+
+    def test_endpoint_payloads_match_stdlib_renderer(self):
+        """اختبار تطابق حمولات نقاط النهاية بايتاً ببايت"""
+        for endpoint, build in build_payloads(_sample_user()).items():
+            with self.subTest(endpoint=endpoint):
+                self.assert_same_output(build())
+
+    def test_native_and_fallback_types(self):
+        """اختبار datetime و UUID و Decimal والأعداد الكبيرة"""
+        self.assert_same_output(
+            {
+                "aware": datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc),
+                "naive": datetime.datetime(2024, 1, 1, 1, 2, 3, 456789),
+                "date": datetime.date(2024, 1, 1),
+                "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+                "decimal": decimal.Decimal("1.50"),
+                "duration": datetime.timedelta(seconds=90),
+                "big": 2**70,
+                1: "non-string key",
+            }
+        )
+
+    def test_empty_and_indented_output(self):
+        """اختبار الاستجابة الفارغة والتنسيق عند طلبه"""
+        self.assertEqual(ORJSONRenderer().render(None), b"")
+        self.assertEqual(
+            ORJSONRenderer().render({"a": 1}, "application/json; indent=4"),
+            b'{\n  "a": 1\n}',
+        )
+
+    def test_parser(self):
+        """اختبار تحليل الطلبات ورفض JSON غير الصالح"""
+        parser = ORJSONParser()
+        self.assertEqual(
+            parser.parse(io.BytesIO('{"name": "محمد"}'.encode())), {"name": "محمد"}
+        )
+        with self.assertRaises(ParseError):
+            parser.parse(io.BytesIO(b"{invalid"))
+
+
+class FastReadSerializerTest(TestCase):
+    """
+    اختبارات تطابق المسار السريع مع UserProfileSerializer
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="fast",
+            email="fast@example.com",
+            password="FastPass123!",
+            first_name="محمد",
+            last_name="أحمد",
+            phone="01012345678",
+            birth_date=datetime.date(1990, 1, 1),
+            profile_picture="https://example.com/avatar.png",
+        )
+        self.user.refresh_from_db()
+
+    def assert_parity(self, user):
+        expected = UserProfileSerializer(user).data
+        fast = fast_user_profile_serializer.to_representation(user)
+        self.assertEqual(list(fast), list(expected))
+        self.assertEqual(fast, dict(expected))
+        self.assertEqual(
+            ORJSONRenderer().render(fast), ORJSONRenderer().render(expected)
+        )
+
+    def test_parity_with_model_serializer(self):
+        """اختبار تطابق الناتج لمستخدم محفوظ ولمستخدم بحقول فارغة"""
+        self.assert_parity(self.user)
+        self.assert_parity(_sample_user())
+        self.assert_parity(
+            User(id=2, username="empty", email="empty@example.com", user_type="citizen")
+        )
+
+    def test_profile_endpoints_use_fast_path(self):
+        """اختبار أن الملف الشخصي عبر الـ API مطابق للمسلسل الكامل"""
+        token = JWTTokenGenerator.generate_access_token(self.user)
+        auth = {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+        expected = dict(UserProfileSerializer(self.user).data)
+
+        self.assertEqual(
+            self.client.get(reverse("user_info"), **auth).json()["user"], expected
+        )
+        self.assertEqual(
+            self.client.get(reverse("user_profile"), **auth).json(), expected
+        )
+
+    def test_rejects_nested_fields(self):
+        """اختبار رفض الحقول التي لا يدعمها المسار السريع"""
+
+        class NestedSerializer(serializers.ModelSerializer):
+            profile = UserProfileSerializer(source="*")
+
+            class Meta:
+                model = User
+                fields = ["id", "profile"]
+
+        with self.assertRaises(ImproperlyConfigured):
+            FastReadSerializer(NestedSerializer).to_representation(self.user)
+
+    @skipUnless(RUN_BENCHMARKS, "RUN_BENCHMARKS غير مفعل")
+    def test_faster_than_model_serializer(self):
+        """اختبار أن المسار السريع أسرع بوضوح"""
+        iterations = 200
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            UserProfileSerializer(self.user).data
+        serializer_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fast_user_profile_serializer.to_representation(self.user)
+        fast_time = time.perf_counter() - start
+
+        self.assertLess(fast_time * 5, serializer_time)
+        print(
+            f"\nUserProfileSerializer: {serializer_time / iterations * 1e6:.1f}us, "
+            f"fast path: {fast_time / iterations * 1e6:.1f}us"
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ProfileETagTest(TestCase):
+    """
+    اختبارات ETag و 304 والملف الشخصي المخزن
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="etag", email="etag@example.com", password="ETagPass123!"
+        )
+        token = JWTTokenGenerator.generate_access_token(self.user)
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+
+    def test_not_modified_with_matching_etag(self):
+        """اختبار الرد بـ 304 عند تطابق If-None-Match"""
+        for name in ("user_info", "user_profile"):
+            with self.subTest(endpoint=name):
+                response = self.client.get(reverse(name), **self.auth)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn("Last-Modified", response)
+                self.assertIn("private", response["Cache-Control"])
+                self.assertIn("no-cache", response["Cache-Control"])
+
+                response = self.client.get(
+                    reverse(name), HTTP_IF_NONE_MATCH=response["ETag"], **self.auth
+                )
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b"")
+
+    def test_not_modified_since_last_modified(self):
+        """اختبار الرد بـ 304 عند إعادة إرسال Last-Modified في If-Modified-Since"""
+        for name in ("user_info", "user_profile"):
+            with self.subTest(endpoint=name):
+                last_modified = self.client.get(reverse(name), **self.auth)[
+                    "Last-Modified"
+                ]
+
+                response = self.client.get(
+                    reverse(name), HTTP_IF_MODIFIED_SINCE=last_modified, **self.auth
+                )
+                self.assertEqual(response.status_code, 304)
+
+    def test_update_changes_etag(self):
+        """اختبار أن تعديل الملف الشخصي يغير ETag ويعيد البيانات الجديدة"""
+        etag = self.client.get(reverse("user_profile"), **self.auth)["ETag"]
+
+        self.client.patch(
+            reverse("user_profile"),
+            {"first_name": "جديد"},
+            content_type="application/json",
+            **self.auth,
+        )
+        response = self.client.get(
+            reverse("user_info"), HTTP_IF_NONE_MATCH=etag, **self.auth
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.json()["user"]["first_name"], "جديد")
+
+    def test_partial_save_bumps_updated_at(self):
+        """اختبار تحديث updated_at مع update_fields"""
+        updated_at = self.user.updated_at
+        self.user.last_login = timezone.now()
+        self.user.save(update_fields=["last_login"])
+
+        self.user.refresh_from_db()
+        self.assertGreater(self.user.updated_at, updated_at)
+
+    def test_serialized_profile_is_cached_and_invalidated(self):
+        """اختبار إعادة استخدام bytes المخزنة وحذفها عند الحفظ"""
+        with patch.object(
+            fast_user_profile_serializer,
+            "to_representation",
+            wraps=fast_user_profile_serializer.to_representation,
+        ) as to_representation:
+            first = self.client.get(reverse("user_info"), **self.auth)
+            second = self.client.get(reverse("user_profile"), **self.auth)
+
+        self.assertEqual(to_representation.call_count, 1)
+        self.assertEqual(first.json()["user"], second.json())
+        self.assertIsNotNone(cache.get(_cache_key(self.user.pk)))
+
+        self.user.city = "الجيزة"
+        self.user.save()
+        self.assertIsNone(cache.get(_cache_key(self.user.pk)))
+
+    def test_browsable_api_still_rendered(self):
+        """اختبار أن renderers غير JSON تعمل كالمعتاد"""
+        response = self.client.get(
+            reverse("user_profile"), HTTP_ACCEPT="text/html", **self.auth
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("text/html", response["Content-Type"])
+
+    async def test_async_user_info_not_modified(self):
+        """اختبار 304 في user_info غير المتزامنة"""
+        factory = AsyncRequestFactory()
+        headers = {"Authorization": self.auth["HTTP_AUTHORIZATION"]}
+        response = await async_views.user_info(
+            factory.get("/api/auth/user-info/", headers=headers)
+        )
+        self.assertEqual(response.status_code, 200)
+
+        headers["If-None-Match"] = response["ETag"]
+        response = await async_views.user_info(
+            factory.get("/api/auth/user-info/", headers=headers)
+        )
+        self.assertEqual(response.status_code, 304)
+
+    async def test_async_user_info_serves_cached_profile(self):
+        """اختبار استخدام user_info غير المتزامنة لـ bytes الملف الشخصي المخزنة"""
+        headers = {"Authorization": self.auth["HTTP_AUTHORIZATION"]}
+        await self.async_client.get(reverse("user_profile"), headers=headers)
+        self.assertIsNotNone(await cache.aget(_cache_key(self.user.pk)))
+
+        factory = AsyncRequestFactory()
+        with patch.object(
+            fast_user_profile_serializer, "to_representation"
+        ) as to_representation:
+            response = await async_views.user_info(
+                factory.get("/api/auth/user-info/", headers=headers)
+            )
+
+        to_representation.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)["user"]["id"], self.user.pk)
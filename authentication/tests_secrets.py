@@ -0,0 +1,273 @@
+# tests_secrets.py
+
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest import skipUnless
+from unittest.mock import patch
+
+from cryptography.fernet import Fernet
+from django.test import SimpleTestCase
+from google.api_core import exceptions
+
+from auth_service.secrets_manager import SecretsManager
+
+# اختبارات الزمن الفعلي تتأثر بحمل الجهاز، فلا تعمل إلا عند طلبها صراحة
+RUN_BENCHMARKS = os.environ.get("RUN_BENCHMARKS", "").lower() == "true"
+
+STARTUP_SECRETS = [
+    "DJANGO_SECRET_KEY",
+    "DB_NAME",
+    "DB_USER",
+    "DB_PASSWORD",
+    "DB_HOST",
+    "DB_PORT",
+    "JWT_SECRET_KEY",
+]
+
+
+class FakeSecretClient:
+    """
+    عميل Secret Manager وهمي بزمن استجابة ثابت لكل طلب
+    """
+
+    def __init__(self, latency=0.1, slow=(), missing=(), versions=None):
+        self.latency = latency
+        self.slow = slow
+        self.missing = missing
+        # name -> قائمة القيم بترتيب الإصدارات (1، 2، ...)
+        self.versions = versions or {}
+        self.calls = []
+        # أقصى عدد من الطلبات الجارية في نفس الوقت
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+
+    def _resolve(self, request):
+        path = request["name"].split("/")
+        name, version = path[3], path[5]
+        values = self.versions.get(name, [f"value-{name}"])
+        if version == "latest":
+            version = str(len(values))
+        return name, version, values[int(version) - 1]
+
+    def access_secret_version(self, request, timeout=None):
+        name, version, value = self._resolve(request)
+        with self._lock:
+            self.calls.append(name)
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            time.sleep(2 if name in self.slow else self.latency)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        if name in self.missing:
+            raise exceptions.NotFound(name)
+        return SimpleNamespace(
+            name=f"projects/naebak-test/secrets/{name}/versions/{version}",
+            payload=SimpleNamespace(data=value.encode()),
+        )
+
+    def get_secret_version(self, request, timeout=None):
+        return SimpleNamespace(create_time=datetime.now(timezone.utc))
+
+
+class SecretsPrefetchTest(SimpleTestCase):
+    """
+    اختبارات جلب الأسرار المجمع و cache المحلي المشفر
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache_file = os.path.join(directory.name, "secrets.cache")
+        self.key = Fernet.generate_key()
+
+    def _manager(self, client, **kwargs):
+        with patch(
+            "google.cloud.secretmanager.SecretManagerServiceClient",
+            return_value=client,
+        ):
+            return SecretsManager(
+                project_id="naebak-test",
+                cache_file=self.cache_file,
+                cache_key=self.key,
+                **kwargs,
+            )
+
+    def test_startup_secrets_fetched_concurrently(self):
+        """اختبار جلب أسرار بدء التشغيل بطلبات متزامنة لا متسلسلة"""
+        client = FakeSecretClient(latency=0.05)
+        manager = self._manager(client)
+
+        manager.prefetch(STARTUP_SECRETS)
+
+        self.assertGreater(client.peak_in_flight, 1)
+        self.assertEqual(manager.get_secret("DB_HOST"), "value-DB_HOST")
+        self.assertEqual(len(client.calls), len(STARTUP_SECRETS))
+
+    @skipUnless(RUN_BENCHMARKS, "RUN_BENCHMARKS غير مفعل")
+    def test_startup_secrets_benchmark(self):
+        """قياس زمن جلب أسرار بدء التشغيل بالتوازي مقارنة بالجلب المتسلسل"""
+        client = FakeSecretClient(latency=0.1)
+        manager = self._manager(client)
+
+        start = time.perf_counter()
+        manager.prefetch(STARTUP_SECRETS)
+        duration = time.perf_counter() - start
+
+        print(
+            f"\nStartup secrets: {duration:.3f}s concurrent "
+            f"vs {client.latency * len(STARTUP_SECRETS):.3f}s serial"
+        )
+        self.assertLess(duration, client.latency * 3)
+
+    def test_restart_uses_encrypted_cache(self):
+        """اختبار أن إعادة التشغيل تقرأ الأسرار من الملف المشفر دون شبكة"""
+        self._manager(FakeSecretClient(latency=0)).prefetch(STARTUP_SECRETS)
+        with open(self.cache_file, "rb") as f:
+            self.assertNotIn(b"value-DB_PASSWORD", f.read())
+        self.assertEqual(os.stat(self.cache_file).st_mode & 0o777, 0o600)
+
+        client = FakeSecretClient(latency=0)
+        manager = self._manager(client)
+        manager.prefetch(STARTUP_SECRETS)
+
+        self.assertEqual(client.calls, [])
+        self.assertEqual(manager.get_secret("JWT_SECRET_KEY"), "value-JWT_SECRET_KEY")
+
+    def test_expired_or_foreign_cache_ignored(self):
+        """اختبار تجاهل الملف المنتهي أو المشفر بمفتاح آخر"""
+        self._manager(FakeSecretClient(latency=0)).prefetch(STARTUP_SECRETS)
+
+        client = FakeSecretClient(latency=0)
+        with patch("cryptography.fernet.time.time", return_value=time.time() + 7200):
+            self._manager(client, cache_ttl=3600).prefetch(STARTUP_SECRETS)
+        self.assertEqual(len(client.calls), len(STARTUP_SECRETS))
+
+        self.key = Fernet.generate_key()
+        client = FakeSecretClient(latency=0)
+        self._manager(client).prefetch(STARTUP_SECRETS)
+        self.assertEqual(len(client.calls), len(STARTUP_SECRETS))
+
+    def test_slow_secret_does_not_block_startup(self):
+        """اختبار أن سراً بطيئاً لا يؤخر البقية أكثر من المهلة"""
+        client = FakeSecretClient(latency=0, slow=("DB_PORT",))
+        manager = self._manager(client)
+
+        start = time.perf_counter()
+        manager.prefetch(STARTUP_SECRETS, timeout=0.2)
+
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertEqual(manager.get_secret("DB_NAME"), "value-DB_NAME")
+        self.assertNotIn("DB_PORT", manager._values)
+
+    def test_missing_secret_falls_back_to_environment(self):
+        """اختبار العودة إلى متغيرات البيئة للأسرار غير الموجودة"""
+        client = FakeSecretClient(latency=0, missing=("DB_HOST",))
+        manager = self._manager(client)
+        manager.prefetch(STARTUP_SECRETS)
+
+        with patch.dict(os.environ, {"DB_HOST": "db.local"}):
+            self.assertEqual(manager.get_secret("DB_HOST"), "db.local")
+        self.assertEqual(client.calls.count("DB_HOST"), 1)
+
+
+class SecretRotationTest(SimpleTestCase):
+    """
+    اختبارات متابعة إصدارات الأسرار واكتشاف التدوير
+    """
+
+    def _manager(self, client):
+        with patch(
+            "google.cloud.secretmanager.SecretManagerServiceClient",
+            return_value=client,
+        ):
+            manager = SecretsManager(project_id="naebak-test", cache_file=None)
+        manager._refresher_pid = os.getpid()  # بدون خيط خلفي في الاختبارات
+        return manager
+
+    def test_first_refresh_loads_previous_version(self):
+        """اختبار تحميل الإصدار السابق عند أول تحديث"""
+        client = FakeSecretClient(latency=0, versions={"JWT_SECRET_KEY": ["k1", "k2"]})
+        manager = self._manager(client)
+
+        secret = manager.get_versioned_secret("JWT_SECRET_KEY")
+        self.assertEqual((secret.version, secret.value), (None, "k2"))
+
+        manager.refresh()
+        secret = manager.get_versioned_secret("JWT_SECRET_KEY")
+        self.assertEqual(secret.keys(3600), [("2", "k2"), ("1", "k1")])
+
+    def test_refresh_detects_rotation(self):
+        """اختبار أن الإصدار الجديد يصبح حالياً والحالي سابقاً"""
+        versions = {"JWT_SECRET_KEY": ["k1"]}
+        client = FakeSecretClient(latency=0, versions=versions)
+        manager = self._manager(client)
+        manager.get_versioned_secret("JWT_SECRET_KEY")
+        manager.refresh()
+        self.assertEqual(
+            manager.get_versioned_secret("JWT_SECRET_KEY").keys(3600), [("1", "k1")]
+        )
+
+        versions["JWT_SECRET_KEY"].append("k2")
+        manager.refresh()
+
+        secret = manager.get_versioned_secret("JWT_SECRET_KEY")
+        self.assertEqual(secret.keys(3600), [("2", "k2"), ("1", "k1")])
+        self.assertEqual(secret.keys(0), [("2", "k2")])
+        self.assertEqual(manager.get_secret("JWT_SECRET_KEY"), "k2")
+
+    def test_cache_written_only_on_change(self):
+        """اختبار عدم إعادة كتابة cache الأسرار إذا لم يتغير السر"""
+        versions = {"JWT_SECRET_KEY": ["k1"]}
+        manager = self._manager(FakeSecretClient(latency=0, versions=versions))
+        manager.get_versioned_secret("JWT_SECRET_KEY")
+        manager.refresh()
+
+        with patch.object(manager, "_write_cache") as write_cache:
+            self.assertFalse(manager.refresh())
+            self.assertFalse(manager.refresh())
+            write_cache.assert_not_called()
+
+            versions["JWT_SECRET_KEY"].append("k2")
+            self.assertTrue(manager.refresh())
+            write_cache.assert_called_once()
+
+    def test_on_demand_refresh_is_rate_limited(self):
+        """اختبار إعادة الجلب الفورية مرة واحدة خلال on_demand_interval"""
+        versions = {"JWT_SECRET_KEY": ["k1"]}
+        manager = self._manager(FakeSecretClient(latency=0, versions=versions))
+        manager.get_versioned_secret("JWT_SECRET_KEY")
+        manager.refresh()
+
+        versions["JWT_SECRET_KEY"].append("k2")
+        secret = manager.refresh_versioned_secret("JWT_SECRET_KEY")
+        self.assertEqual(secret.version, "2")
+
+        versions["JWT_SECRET_KEY"].append("k3")
+        secret = manager.refresh_versioned_secret("JWT_SECRET_KEY")
+        self.assertEqual(secret.version, "2")
+
+        manager.on_demand_interval = 0
+        secret = manager.refresh_versioned_secret("JWT_SECRET_KEY")
+        self.assertEqual(secret.version, "3")
+
+    def test_refresh_loop_survives_errors(self):
+        """اختبار استمرار خيط التحديث بعد خطأ غير متوقع"""
+
+        class StopLoop(BaseException):
+            pass
+
+        manager = self._manager(FakeSecretClient(latency=0))
+        with patch.object(
+            manager, "refresh", side_effect=[RuntimeError("boom"), StopLoop]
+        ) as refresh, patch("auth_service.secrets_manager.time.sleep"):
+            with self.assertRaises(StopLoop):
+                manager._refresh_loop()
+
+        self.assertEqual(refresh.call_count, 2)
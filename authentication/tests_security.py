@@ -1,12 +1,45 @@
 # tests_security.py
 
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest import skipUnless
+from unittest.mock import patch
+
+import jwt
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 from django.urls import reverse
+from prometheus_client import REGISTRY
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from auth_service.secrets_manager import VersionedSecret
+
+from .authentication import JWTTokenGenerator, adecode_token
+from .circuit_breaker import CLOSED, OPEN, redis_breaker
+from .throttling import (
+    LocalPreFilter,
+    LoginThrottle,
+    RateLimiter,
+    RateLimitRule,
+    local_counters,
+)
+from .tiered_cache import TieredRedisCache
+
+try:
+    import fakeredis
+except ImportError:  # fakeredis من متطلبات التطوير فقط
+    fakeredis = None
 
 User = get_user_model()
 
+LOCMEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+}
+
 
 class SecurityAPITest(APITestCase):
     """
@@ -57,3 +90,505 @@ class SecurityAPITest(APITestCase):
         }
         response = self.client.post(url, data, format="json")
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class LoginThrottleTest(TestCase):
+    """
+    اختبارات النافذة المنزلقة لمحاولات الدخول (بدون Redis)
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.throttle = LoginThrottle(window=900, ip_limit=5, account_limit=3)
+
+    def test_blocks_after_ip_limit(self):
+        """اختبار الحظر بعد تجاوز حد IP"""
+        with patch("authentication.throttling.time.time", return_value=1000.0):
+            for _ in range(4):
+                self.assertFalse(self.throttle.register_failure("1.2.3.4").blocked)
+        with patch("authentication.throttling.time.time", return_value=1100.0):
+            self.assertTrue(self.throttle.register_failure("1.2.3.4").blocked)
+            result = self.throttle.check("1.2.3.4")
+
+        self.assertTrue(result.blocked)
+        # أقدم محاولة ضمن الحد تنتهي عند 1000 + 900
+        self.assertEqual(result.retry_after, 800.0)
+
+    def test_blocks_per_account_across_ips(self):
+        """اختبار حظر الحساب عند تغيير IP"""
+        for index in range(3):
+            self.throttle.register_failure(f"10.0.0.{index}", "victim@example.com")
+
+        self.assertTrue(self.throttle.check("10.0.0.9", "victim@example.com").blocked)
+        self.assertFalse(self.throttle.check("10.0.0.9", "other@example.com").blocked)
+
+    def test_reset_clears_counters(self):
+        """اختبار مسح العدادات بعد النجاح"""
+        for _ in range(5):
+            self.throttle.register_failure("1.2.3.4", "user@example.com")
+        self.throttle.reset("1.2.3.4", "user@example.com")
+
+        self.assertFalse(self.throttle.check("1.2.3.4", "user@example.com").blocked)
+
+
+@skipUnless(fakeredis, "fakeredis is not installed")
+class LoginThrottleRedisTest(TestCase):
+    """
+    اختبارات سكربت Lua باستخدام Redis محلي بديل
+    """
+
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis()
+        self.throttle = LoginThrottle(window=900, ip_limit=5, account_limit=3)
+        patcher = patch.object(self.throttle, "_get_client", return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_concurrent_failures_are_all_counted(self):
+        """اختبار عدم فقدان المحاولات المتزامنة"""
+        threads = [
+            threading.Thread(
+                target=self.throttle.register_failure, args=("1.2.3.4", "a@b.com")
+            )
+            for _ in range(20)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        result = self.throttle.check("1.2.3.4", "a@b.com")
+        self.assertEqual(result.counts, [20, 20])
+        self.assertTrue(result.blocked)
+
+    def test_exact_retry_after(self):
+        """اختبار حساب وقت إعادة المحاولة بدقة"""
+        for now in (1000.0, 1010.0, 1020.0):
+            with patch("authentication.throttling.time.time", return_value=now):
+                self.throttle.register_failure("1.2.3.4", "a@b.com")
+
+        with patch("authentication.throttling.time.time", return_value=1500.0):
+            result = self.throttle.check("5.6.7.8", "a@b.com")
+
+        self.assertEqual(result.counts, [0, 3])
+        self.assertEqual(result.retry_after, 400.0)
+        self.assertEqual(result.retry_after_seconds, 400)
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    MIDDLEWARE=settings.MIDDLEWARE
+    + ["authentication.middleware.LoginAttemptMiddleware"],
+    LOGIN_THROTTLE_IP_LIMIT=2,
+)
+class LoginAttemptMiddlewareTest(APITestCase):
+    """
+    اختبارات حظر محاولات الدخول عبر middleware
+    """
+
+    def setUp(self):
+        cache.clear()
+        User.objects.create_user(
+            username="throttled", email="throttled@example.com", password="Pass123!x"
+        )
+
+    def test_blocked_after_failed_logins(self):
+        """اختبار إرجاع 429 مع Retry-After بعد المحاولات الفاشلة"""
+        url = reverse("login")
+        data = {"email": "throttled@example.com", "password": "wrong"}
+        for _ in range(2):
+            response = self.client.post(url, data, format="json")
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        response = self.client.post(url, data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertGreater(int(response["Retry-After"]), 0)
+
+    def test_spoofed_forwarded_for_does_not_reset_ip_counter(self):
+        """اختبار حظر IP يغير X-Forwarded-For مع كل محاولة لحسابات مختلفة"""
+        url = reverse("login")
+        responses = [
+            self.client.post(
+                url,
+                {"email": f"guess{i}@example.com", "password": "wrong"},
+                format="json",
+                HTTP_X_FORWARDED_FOR=f"6.6.6.{i}, 203.0.113.7",
+            )
+            for i in range(3)
+        ]
+
+        self.assertEqual(
+            [r.status_code for r in responses],
+            [
+                status.HTTP_401_UNAUTHORIZED,
+                status.HTTP_401_UNAUTHORIZED,
+                status.HTTP_429_TOO_MANY_REQUESTS,
+            ],
+        )
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    RATE_LIMIT_ENABLED=True,
+    RATE_LIMIT_RULES={"reset_password": [("ip", "2/m")]},
+)
+class RateLimitMiddlewareTest(APITestCase):
+    """
+    اختبارات محرك تحديد المعدل المركزي
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse("reset_password")
+        self.data = {"token": "x", "new_password": "y", "new_password_confirm": "y"}
+
+    def test_rule_parsing(self):
+        """اختبار تحليل صيغة المعدل"""
+        rule = RateLimitRule("ip", "20/15m")
+        self.assertEqual(rule.capacity, 20)
+        self.assertEqual(rule.period, 900)
+        self.assertEqual(rule.policy, "20;w=900")
+
+    def test_limit_with_ratelimit_headers(self):
+        """اختبار الرفض بعد نفاد الرموز مع ترويسات RateLimit"""
+        first = self.client.post(self.url, self.data, format="json")
+        self.assertEqual(first["RateLimit-Limit"], "2")
+        self.assertEqual(first["RateLimit-Remaining"], "1")
+
+        self.client.post(self.url, self.data, format="json")
+        response = self.client.post(self.url, self.data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response["RateLimit-Remaining"], "0")
+        self.assertEqual(response["Retry-After"], "30")
+
+    def test_spoofed_forwarded_for_does_not_reset_limit(self):
+        """اختبار عدم تجاوز الحد بتغيير X-Forwarded-For مع كل طلب"""
+        responses = [
+            self.client.post(
+                self.url,
+                self.data,
+                format="json",
+                HTTP_X_FORWARDED_FOR=f"6.6.6.{i}, 203.0.113.7",
+            )
+            for i in range(3)
+        ]
+
+        self.assertEqual(responses[-1].status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(responses[-1].wsgi_request.client_ip, "203.0.113.7")
+
+    @override_settings(TRUSTED_PROXY_COUNT=0)
+    def test_forwarded_for_ignored_without_trusted_proxy(self):
+        """اختبار استخدام REMOTE_ADDR عند عدم وجود proxy موثوق"""
+        response = self.client.post(
+            self.url, self.data, format="json", HTTP_X_FORWARDED_FOR="6.6.6.1"
+        )
+        self.assertEqual(response.wsgi_request.client_ip, "127.0.0.1")
+
+    def test_unlisted_route_not_limited(self):
+        """اختبار عدم تقييد المسارات غير المعرفة"""
+        response = self.client.get(reverse("user_statistics"))
+        self.assertNotIn("RateLimit-Limit", response)
+
+    def test_local_pre_filter_skips_backend(self):
+        """اختبار رفض الفيضان محلياً دون الوصول إلى Redis"""
+        limiter = RateLimiter()
+        request = self.client.post(self.url, self.data, format="json").wsgi_request
+        cache.clear()
+        with patch.object(
+            limiter, "_consume", wraps=limiter._consume
+        ) as mock_consume, patch(
+            "authentication.throttling.time.time", return_value=6000.0
+        ):
+            results = [limiter.check(request, "reset_password") for _ in range(10)]
+
+        # بعد أن أعاد الدلو صفر رموز لا حاجة لسؤاله في نفس اللحظة
+        self.assertEqual(mock_consume.call_count, 2)
+        self.assertFalse(results[-1].allowed)
+
+    @override_settings(RATE_LIMIT_RULES={"reset_password": [("ip", "5/m")]})
+    def test_local_pre_filter_ignores_denied_requests(self):
+        """اختبار عدم رفض طلب يقبله الدلو بسبب محاولات رُفضت سابقاً"""
+        limiter = RateLimiter()
+        request = self.client.post(self.url, self.data, format="json").wsgi_request
+        cache.clear()
+
+        with patch("authentication.throttling.time.time", return_value=6000.0):
+            results = [limiter.check(request, "reset_password") for _ in range(11)]
+        self.assertEqual([r.allowed for r in results], [True] * 5 + [False] * 6)
+
+        with patch.object(
+            limiter, "_consume", wraps=limiter._consume
+        ) as mock_consume, patch(
+            "authentication.throttling.time.time", return_value=6058.0
+        ):
+            result = limiter.check(request, "reset_password")
+
+        self.assertTrue(result.allowed)
+        self.assertEqual(mock_consume.call_count, 1)
+
+    def test_local_pre_filter_never_stricter_than_bucket(self):
+        """اختبار أن الرفض المحلي لا يحدث إلا عندما يكون الدلو فارغاً"""
+        rule = RateLimitRule("ip", "5/m")
+        pre_filter = LocalPreFilter()
+        pre_filter.record("key", 0.0, 6000.0)
+
+        self.assertAlmostEqual(pre_filter.check("key", rule, 6000.0), 12.0)
+        self.assertAlmostEqual(pre_filter.check("key", rule, 6006.0), 6.0)
+        # رمز كامل بعد 12 ثانية من التعبئة
+        self.assertEqual(pre_filter.check("key", rule, 6012.0), 0)
+        self.assertEqual(pre_filter.check("other", rule, 6000.0), 0)
+
+
+@skipUnless(fakeredis, "fakeredis is not installed")
+@override_settings(
+    RATE_LIMIT_ENABLED=True,
+    RATE_LIMIT_RULES={"login": [("ip", "5/m"), ("account", "2/m")]},
+)
+class RateLimiterRedisTest(TestCase):
+    """
+    اختبارات سكربت دلو الرموز باستخدام Redis محلي بديل
+    """
+
+    def setUp(self):
+        self.limiter = RateLimiter()
+        patcher = patch.object(
+            self.limiter, "_get_client", return_value=fakeredis.FakeRedis()
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _request(self, email):
+        request = APIRequestFactory().post(
+            "/api/auth/login/", {"email": email}, format="json"
+        )
+        request.client_ip = "1.2.3.4"
+        return request
+
+    def test_all_rules_consumed_atomically(self):
+        """اختبار أن الرفض بقاعدة الحساب لا يستهلك من قاعدة IP"""
+        with patch("authentication.throttling.time.time", return_value=1000.0):
+            for _ in range(2):
+                self.assertTrue(
+                    self.limiter.check(self._request("a@b.com"), "login").allowed
+                )
+            denied = self.limiter.check(self._request("a@b.com"), "login")
+            other = self.limiter.check(self._request("c@d.com"), "login")
+
+        self.assertFalse(denied.allowed)
+        self.assertEqual(denied.rule.scope, "account")
+        self.assertEqual(denied.retry_after, 30.0)
+        self.assertTrue(other.allowed)
+        # الحساب الجديد لديه رمز واحد متبقٍ مقابل رمزين لـ IP
+        self.assertEqual(other.headers()["RateLimit-Limit"], "2")
+        self.assertEqual(other.headers()["RateLimit-Remaining"], "1")
+
+    def test_tokens_refill_over_time(self):
+        """اختبار إعادة تعبئة الرموز مع الوقت"""
+        with patch("authentication.throttling.time.time", return_value=1000.0):
+            for _ in range(2):
+                self.limiter.check(self._request("a@b.com"), "login")
+        with patch("authentication.throttling.time.time", return_value=1030.0):
+            result = self.limiter.check(self._request("a@b.com"), "login")
+
+        self.assertTrue(result.allowed)
+
+
+class JWTKeyRotationTest(TestCase):
+    """
+    اختبارات قبول مفتاح JWT السابق خلال فترة السماح بعد التدوير
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="rotation", email="rotation@example.com", password="pass"
+        )
+        self.url = reverse("user_info")
+
+    def _rotated(self, rotated_at):
+        return VersionedSecret(
+            "JWT_SECRET_KEY", "2", "new-key", "1", "old-key", rotated_at
+        )
+
+    def _token(self, key, kid=None):
+        payload = {
+            "user_id": self.user.id,
+            "exp": datetime.utcnow() + timedelta(minutes=5),
+            "type": "access",
+        }
+        return jwt.encode(
+            payload, key, algorithm="HS256", headers={"kid": kid} if kid else None
+        )
+
+    def _get(self, token, secret, refreshed=None):
+        with patch(
+            "authentication.authentication.get_versioned_secret", return_value=secret
+        ), patch(
+            "authentication.authentication.refresh_versioned_secret",
+            return_value=refreshed or secret,
+        ) as refresh:
+            response = self.client.get(self.url, HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.refresh_calls = refresh.call_count
+        return response
+
+    def test_new_tokens_signed_with_current_version(self):
+        """اختبار توقيع الرموز الجديدة بالمفتاح الحالي مع kid"""
+        with patch(
+            "authentication.authentication.get_versioned_secret",
+            return_value=self._rotated(time.time()),
+        ):
+            token = JWTTokenGenerator.generate_access_token(self.user)
+
+        self.assertEqual(jwt.get_unverified_header(token)["kid"], "2")
+        jwt.decode(token, "new-key", algorithms=["HS256"])
+
+    def test_previous_key_accepted_during_grace_period(self):
+        """اختبار قبول الرموز الموقعة بالمفتاح السابق بعد التدوير مباشرة"""
+        secret = self._rotated(time.time())
+        self.assertEqual(
+            self._get(self._token("old-key", "1"), secret).status_code, 200
+        )
+        # رموز صادرة قبل إضافة kid
+        self.assertEqual(self._get(self._token("old-key"), secret).status_code, 200)
+        self.assertEqual(self._get(self._token("new-key"), secret).status_code, 200)
+
+    def test_unknown_kid_refreshes_key_before_rejecting(self):
+        """اختبار قبول رمز وقّعه عامل اكتشف التدوير قبل هذا العامل"""
+        secret = self._rotated(time.time())
+        newer = VersionedSecret(
+            "JWT_SECRET_KEY", "3", "newer-key", "2", "new-key", time.time()
+        )
+
+        token = self._token("newer-key", "3")
+        self.assertEqual(self._get(token, secret, newer).status_code, 200)
+        self.assertEqual(self.refresh_calls, 1)
+
+        # المفتاح المعروف لا يستدعي إعادة الجلب
+        self.assertEqual(
+            self._get(self._token("new-key", "2"), secret).status_code, 200
+        )
+        self.assertEqual(self.refresh_calls, 0)
+
+    async def test_async_unknown_kid_refreshes_off_the_event_loop(self):
+        """اختبار إعادة جلب المفتاح في خيط منفصل عن حلقة الأحداث"""
+        secret = self._rotated(time.time())
+        newer = VersionedSecret(
+            "JWT_SECRET_KEY", "3", "newer-key", "2", "new-key", time.time()
+        )
+        refresh_threads = []
+
+        def refresh(name):
+            refresh_threads.append(threading.get_ident())
+            return newer
+
+        with patch(
+            "authentication.authentication.get_versioned_secret", return_value=secret
+        ), patch(
+            "authentication.authentication.refresh_versioned_secret",
+            side_effect=refresh,
+        ):
+            payload = await adecode_token(self._token("newer-key", "3"))
+
+        self.assertEqual(payload["user_id"], self.user.id)
+        self.assertEqual(len(refresh_threads), 1)
+        self.assertNotEqual(refresh_threads[0], threading.get_ident())
+
+    def test_previous_key_rejected_after_grace_period(self):
+        """اختبار رفض المفتاح السابق بعد انتهاء فترة السماح"""
+        secret = self._rotated(time.time() - settings.JWT_KEY_GRACE_PERIOD - 1)
+        self.assertEqual(
+            self._get(self._token("old-key", "1"), secret).status_code, 403
+        )
+        self.assertEqual(
+            self._get(self._token("new-key", "2"), secret).status_code, 200
+        )
+
+
+@skipUnless(fakeredis, "fakeredis is not installed")
+@override_settings(
+    RATE_LIMIT_ENABLED=True,
+    RATE_LIMIT_RULES={"login": [("ip", "3/m")]},
+)
+class RedisOutageTest(TestCase):
+    """
+    حقن عطل في Redis محلي بديل والتحقق من استمرار المصادقة
+    """
+
+    def setUp(self):
+        self.server = fakeredis.FakeServer()
+        # django_redis يشارك connection pool بين كل caches ذات العنوان نفسه
+        self.cache = TieredRedisCache(
+            f"redis://{self.id()}:6379/0",
+            {
+                "OPTIONS": {
+                    "CONNECTION_POOL_KWARGS": {
+                        "connection_class": fakeredis.FakeConnection,
+                        "server": self.server,
+                    }
+                }
+            },
+        )
+        self.redis = fakeredis.FakeRedis(server=self.server)
+        redis_breaker.reset()
+        local_counters.clear()
+        self.addCleanup(redis_breaker.reset)
+        self.addCleanup(local_counters.clear)
+
+    def breaker_state(self):
+        return REGISTRY.get_sample_value("circuit_breaker_state", {"name": "redis"})
+
+    def test_cache_bypassed_and_breaker_recovers(self):
+        """اختبار تجاوز cache أثناء العطل وفتح الدائرة ثم عودتها"""
+        self.cache.set("key", "value")
+        self.server.connected = False
+
+        for _ in range(redis_breaker.failure_threshold):
+            self.assertEqual(self.cache.get("key", "default"), "default")
+            self.assertFalse(self.cache.set("key", "other"))
+        self.assertEqual(redis_breaker.state, OPEN)
+        self.assertEqual(self.breaker_state(), 2)
+
+        # الدائرة المفتوحة لا تحاول الاتصال
+        with patch.object(self.cache.client, "get") as redis_get:
+            self.assertIsNone(self.cache.get("key"))
+        redis_get.assert_not_called()
+
+        self.server.connected = True
+        with patch.object(redis_breaker, "reset_timeout", 0):
+            self.assertEqual(self.cache.get("key"), "value")
+        self.assertEqual(redis_breaker.state, CLOSED)
+        self.assertEqual(self.breaker_state(), 0)
+
+    def test_cache_api_keeps_django_contract_during_outage(self):
+        """اختبار أن incr و decr والحذف الجماعي لا ترفع أخطاء Redis أثناء العطل"""
+        self.cache.set("counter", 1)
+        self.server.connected = False
+
+        with self.assertRaises(ValueError):
+            self.cache.incr("counter")
+        with self.assertRaises(ValueError):
+            self.cache.decr("counter")
+        self.assertEqual(self.cache.delete_pattern("counter*"), 0)
+        self.assertIsNone(self.cache.clear())
+
+    def test_login_throttle_falls_back_to_local_counters(self):
+        """اختبار استمرار حظر محاولات الدخول بعدادات داخل العملية"""
+        throttle = LoginThrottle(window=900, ip_limit=3, account_limit=10)
+        self.server.connected = False
+        with patch.object(throttle, "_get_client", return_value=self.redis):
+            for _ in range(3):
+                throttle.register_failure("1.2.3.4", "a@b.com")
+            self.assertTrue(throttle.check("1.2.3.4", "a@b.com").blocked)
+
+    def test_rate_limiter_falls_back_to_local_counters(self):
+        """اختبار تطبيق حدود المعدل لكل عملية أثناء العطل"""
+        limiter = RateLimiter()
+        self.server.connected = False
+        request = APIRequestFactory().post("/api/auth/login/", {}, format="json")
+        request.client_ip = "1.2.3.4"
+        with patch.object(limiter, "_get_client", return_value=self.redis):
+            results = [limiter.check(request, "login") for _ in range(4)]
+
+        self.assertEqual([result.allowed for result in results], [True] * 3 + [False])
@@ -8,7 +8,7 @@ from django.core import mail
 from django.test import TestCase
 from django.utils import timezone
 
-from .models import EmailVerificationToken, PasswordResetToken
+from .models import EmailVerificationToken, PasswordResetToken, UserStatisticsCounter
 from .services import EmailService, GoogleAuthService, UserService
 
 User = get_user_model()
@@ -93,10 +93,10 @@ class GoogleAuthServiceTest(TestCase):
     اختبارات خدمة مصادقة جوجل
     """
 
-    @patch("authentication.services.id_token")
-    def test_verify_google_token_success(self, mock_id_token):
+    @patch("google.oauth2.id_token.verify_oauth2_token")
+    def test_verify_google_token_success(self, mock_verify):
         """اختبار التحقق من رمز جوجل - حالة النجاح"""
-        mock_id_token.verify_oauth2_token.return_value = {
+        mock_verify.return_value = {
             "iss": "https://accounts.google.com",
             "sub": "testgoogleid",
             "email": "google@example.com",
@@ -112,10 +112,10 @@ class GoogleAuthServiceTest(TestCase):
         self.assertEqual(google_data["email"], "google@example.com")
         self.assertEqual(google_data["google_id"], "testgoogleid")
 
-    @patch("authentication.services.id_token")
-    def test_verify_google_token_invalid(self, mock_id_token):
+    @patch("google.oauth2.id_token.verify_oauth2_token")
+    def test_verify_google_token_invalid(self, mock_verify):
         """اختبار التحقق من رمز جوجل غير صالح"""
-        mock_id_token.verify_oauth2_token.side_effect = Exception("Invalid token")
+        mock_verify.side_effect = Exception("Invalid token")
 
         google_data = GoogleAuthService.verify_google_token("invalid_token")
         self.assertIsNone(google_data)
@@ -221,3 +221,42 @@ class UserServiceTest(TestCase):
         self.assertIn("total_users", stats)
         self.assertIn("verified_users", stats)
         self.assertIn("unverified_users", stats)
+
+    def test_statistics_follow_user_updates(self):
+        """اختبار تحديث العدادات عند تعديل المستخدم"""
+        self.citizen1.user_type = "representative"
+        self.citizen1.is_verified = True
+        self.citizen1.governorate = "القاهرة"
+        self.citizen1.save()
+
+        stats = UserService.get_user_statistics()
+        self.assertEqual(stats["citizens"], 1)
+        self.assertEqual(stats["representatives"], 2)
+        self.assertEqual(stats["verified_users"], 1)
+        self.assertEqual(stats["by_governorate"], {"القاهرة": 1})
+
+    def test_statistics_follow_user_deletion(self):
+        """اختبار إنقاص العدادات عند حذف المستخدم"""
+        self.admin.delete()
+
+        stats = UserService.get_user_statistics()
+        self.assertEqual(stats["total_users"], 3)
+        self.assertEqual(stats["admins"], 0)
+
+    def test_get_user_statistics_single_query(self):
+        """اختبار قراءة الإحصائيات باستعلام واحد"""
+        with self.assertNumQueries(1):
+            UserService.get_user_statistics()
+
+    def test_reconcile_user_statistics(self):
+        """اختبار تصحيح انحراف العدادات"""
+        # QuerySet.update يتجاوز الإشارات
+        User.objects.filter(user_type="citizen").update(is_verified=True)
+        UserStatisticsCounter.objects.filter(key="total").update(value=100)
+
+        corrected = UserService.reconcile_user_statistics()
+
+        self.assertEqual(corrected, 2)
+        stats = UserService.get_user_statistics()
+        self.assertEqual(stats["total_users"], 4)
+        self.assertEqual(stats["verified_users"], 2)
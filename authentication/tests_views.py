@@ -1,15 +1,17 @@
 # tests_views.py
 
+import json
 import time
 from unittest.mock import MagicMock, patch
 
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
+from django.test import AsyncRequestFactory, TestCase
 from django.urls import reverse
 from rest_framework import status
-from rest_framework.test import APITestCase, APIClient
-from django.test import TestCase
+from rest_framework.test import APIClient, APITestCase
 
+from . import async_views
 from .authentication import JWTTokenGenerator
 from .models import EmailVerificationToken, PasswordResetToken, RefreshToken
 
@@ -235,9 +237,13 @@ class AuthAPITest(APITestCase):
         url = reverse("health_check")
         response = self.client.get(url)
         # في بيئة الاختبار قد يكون 503 بسبب عدم توفر Redis/PostgreSQL
-        self.assertIn(response.status_code, [status.HTTP_200_OK, status.HTTP_503_SERVICE_UNAVAILABLE])
+        self.assertIn(
+            response.status_code,
+            [status.HTTP_200_OK, status.HTTP_503_SERVICE_UNAVAILABLE],
+        )
         self.assertIn("status", response.data)
 
+
 class RateLimitingTest(TestCase):
     """اختبارات تحديد المعدل - معطلة في بيئة الاختبار"""
 
@@ -262,3 +268,122 @@ class RateLimitingTest(TestCase):
             response = self.client.post(url, data, format="json")
             # يجب أن تكون النتيجة 401 (Unauthorized) وليس 429 (Rate Limited)
             self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class AsyncViewsTest(TestCase):
+    """
+    اختبارات views غير المتزامنة للمسارات الساخنة
+    """
+
+    def setUp(self):
+        self.factory = AsyncRequestFactory()
+        self.user = User.objects.create_user(
+            username="asyncuser",
+            email="async@example.com",
+            password="AsyncPassword123!",
+            first_name="Async",
+        )
+        self.tokens = JWTTokenGenerator.generate_tokens(self.user)
+        self.headers = {"Authorization": f"Bearer {self.tokens['access_token']}"}
+
+    async def test_user_info_matches_sync_view(self):
+        """اختبار تطابق استجابة user_info غير المتزامنة مع النسخة المتزامنة"""
+        response = await async_views.user_info(
+            self.factory.get("/api/auth/user-info/", headers=self.headers)
+        )
+        sync_response = await self.async_client.get(
+            reverse("user_info"), headers=self.headers
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), sync_response.json())
+
+    async def test_user_info_requires_valid_token(self):
+        """اختبار رفض user_info بدون رمز أو برمز غير صالح"""
+        response = await async_views.user_info(self.factory.get("/api/auth/user-info/"))
+        self.assertEqual(response.status_code, 403)
+
+        response = await async_views.user_info(
+            self.factory.get(
+                "/api/auth/user-info/", headers={"Authorization": "Bearer invalid"}
+            )
+        )
+        self.assertEqual(response.status_code, 403)
+
+    async def test_refresh_token(self):
+        """اختبار تحديث الرمز عبر async ORM"""
+        request = self.factory.post(
+            "/api/auth/refresh-token/",
+            {"refresh_token": self.tokens["refresh_token"]},
+            content_type="application/json",
+        )
+        response = await async_views.refresh_token(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("access_token", json.loads(response.content)["tokens"])
+
+        request = self.factory.post(
+            "/api/auth/refresh-token/",
+            {"refresh_token": "invalid"},
+            content_type="application/json",
+        )
+        self.assertEqual((await async_views.refresh_token(request)).status_code, 401)
+
+        request = self.factory.post(
+            "/api/auth/refresh-token/", {}, content_type="application/json"
+        )
+        self.assertEqual((await async_views.refresh_token(request)).status_code, 400)
+
+    async def test_health_check(self):
+        """اختبار فحص الصحة غير المتزامن"""
+        response = await async_views.health_check(self.factory.get("/api/auth/health/"))
+        self.assertIn(response.status_code, [200, 503])
+        self.assertIn("status", json.loads(response.content))
+
+    def test_introspect_token(self):
+        """اختبار فحص حالة رموز الوصول والتحديث"""
+        url = reverse("introspect_token")
+
+        def introspect(token):
+            return self.client.post(
+                url,
+                {"token": token},
+                content_type="application/json",
+                headers=self.headers,
+            ).json()
+
+        access = introspect(self.tokens["access_token"])
+        self.assertEqual(access["active"], True)
+        self.assertEqual(access["token_type"], "access")
+        self.assertEqual(access["user_id"], self.user.id)
+
+        self.assertTrue(introspect(self.tokens["refresh_token"])["active"])
+        JWTTokenGenerator.revoke_refresh_token(self.tokens["refresh_token"])
+        self.assertEqual(introspect(self.tokens["refresh_token"]), {"active": False})
+        self.assertEqual(introspect("garbage"), {"active": False})
+
+    def test_introspect_token_requires_caller_auth(self):
+        """اختبار رفض فحص الرموز من مستدعٍ غير مصادق وقبول رمز الخدمة"""
+        url = reverse("introspect_token")
+        body = {"token": self.tokens["access_token"]}
+
+        response = self.client.post(url, body, content_type="application/json")
+        self.assertEqual(response.status_code, 401)
+        self.assertIn("WWW-Authenticate", response)
+
+        response = self.client.post(
+            url,
+            body,
+            content_type="application/json",
+            headers={"Authorization": "Bearer garbage"},
+        )
+        self.assertEqual(response.status_code, 401)
+
+        with self.settings(INTROSPECTION_SERVICE_TOKEN="service-secret"):
+            response = self.client.post(
+                url,
+                body,
+                content_type="application/json",
+                headers={"Authorization": "Bearer service-secret"},
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["active"])
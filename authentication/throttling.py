@@ -0,0 +1,483 @@
+"""
+تحديد محاولات تسجيل الدخول ومعدل الطلبات باستخدام Redis
+
+عند تعطل Redis (أو فتح redis_breaker) تُستخدم عدادات تقريبية داخل كل عملية
+بنفس الخوارزمية، فيبقى الحد مطبقاً لكل عامل على حدة بدل تعطيله أو فشل الطلب.
+"""
+
+import json
+import logging
+import math
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+
+from .circuit_breaker import REDIS_ERRORS, CircuitOpenError, redis_breaker
+
+logger = logging.getLogger(__name__)
+
+# عدادات احتياطية داخل العملية أثناء تعطل Redis
+local_counters = LocMemCache("throttle-fallback", {"OPTIONS": {"MAX_ENTRIES": 10000}})
+
+
+def _redis_unavailable(e):
+    if not isinstance(e, CircuitOpenError):
+        logger.warning(f"Redis unavailable, using per-process counters: {str(e)}")
+
+
+# KEYS: مفاتيح النوافذ (IP ثم الحساب)
+# ARGV: الوقت الحالي، طول النافذة، 1 للزيادة أو 0 للفحص فقط، معرف المحاولة،
+#       ثم الحد الأقصى لكل مفتاح بنفس ترتيب KEYS
+SLIDING_WINDOW_SCRIPT = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local increment = ARGV[3] == "1"
+local member = ARGV[4]
+local retry_after = 0
+local counts = {}
+
+for i, key in ipairs(KEYS) do
+    local limit = tonumber(ARGV[4 + i])
+    redis.call("ZREMRANGEBYSCORE", key, "-inf", now - window)
+    if increment then
+        redis.call("ZADD", key, now, member)
+        redis.call("PEXPIRE", key, math.ceil(window * 1000))
+    end
+    local count = redis.call("ZCARD", key)
+    if count >= limit then
+        local index = count - limit
+        local oldest = redis.call("ZRANGE", key, index, index, "WITHSCORES")
+        local wait = tonumber(oldest[2]) + window - now
+        if wait > retry_after then
+            retry_after = wait
+        end
+    end
+    table.insert(counts, count)
+end
+
+table.insert(counts, 1, tostring(retry_after))
+return counts
+"""
+
+
+class ThrottleResult:
+    """
+    نتيجة فحص النافذة المنزلقة
+    """
+
+    def __init__(self, retry_after, counts):
+        self.retry_after = retry_after
+        self.counts = counts
+
+    @property
+    def blocked(self):
+        return self.retry_after > 0
+
+    @property
+    def retry_after_seconds(self):
+        return math.ceil(self.retry_after)
+
+
+class LoginThrottle:
+    """
+    عداد محاولات الدخول الفاشلة لكل IP ولكل حساب
+
+    يتم الفحص والزيادة في استدعاء Redis واحد عبر Lua، مما يمنع فقدان
+    المحاولات المتزامنة. مع أي cache غير Redis (التطوير والاختبارات) يتم
+    استخدام تنفيذ غير ذري بنفس الخوارزمية.
+    """
+
+    def __init__(self, window=None, ip_limit=None, account_limit=None):
+        self._window = window
+        self._ip_limit = ip_limit
+        self._account_limit = account_limit
+        self._script = None
+
+    @property
+    def window(self):
+        return self._window or getattr(settings, "LOGIN_THROTTLE_WINDOW", 900)
+
+    @property
+    def ip_limit(self):
+        return self._ip_limit or getattr(settings, "LOGIN_THROTTLE_IP_LIMIT", 5)
+
+    @property
+    def account_limit(self):
+        return self._account_limit or getattr(
+            settings, "LOGIN_THROTTLE_ACCOUNT_LIMIT", 10
+        )
+
+    def _get_client(self):
+        """
+        الحصول على اتصال Redis الخام أو None إذا لم يكن cache من نوع Redis
+        """
+        try:
+            from django_redis import get_redis_connection
+
+            return get_redis_connection("default")
+        except (ImportError, NotImplementedError):
+            return None
+
+    def _keys(self, client_ip, account):
+        keys = [(f"login_throttle:ip:{client_ip}", self.ip_limit)]
+        if account:
+            keys.append((f"login_throttle:account:{account}", self.account_limit))
+        return keys
+
+    def _run(self, client_ip, account, increment):
+        keys = self._keys(client_ip, account)
+        now = time.time()
+        client = self._get_client()
+
+        if client is None:
+            return self._run_local(cache, keys, now, increment)
+
+        if self._script is None:
+            self._script = client.register_script(SLIDING_WINDOW_SCRIPT)
+
+        try:
+            result = redis_breaker.call(
+                self._script,
+                keys=[cache.make_key(key) for key, _ in keys],
+                args=[now, self.window, int(increment), uuid.uuid4().hex]
+                + [limit for _, limit in keys],
+                client=client,
+            )
+        except (CircuitOpenError,) + REDIS_ERRORS as e:
+            _redis_unavailable(e)
+            return self._run_local(local_counters, keys, now, increment)
+        return ThrottleResult(float(result[0]), [int(count) for count in result[1:]])
+
+    def _run_local(self, store, keys, now, increment):
+        """
+        نفس خوارزمية السكربت باستخدام واجهة cache العادية
+        """
+        retry_after = 0
+        counts = []
+        for key, limit in keys:
+            timestamps = [t for t in store.get(key, []) if t > now - self.window]
+            if increment:
+                timestamps.append(now)
+                store.set(key, timestamps, self.window)
+            count = len(timestamps)
+            if count >= limit:
+                retry_after = max(
+                    retry_after, sorted(timestamps)[count - limit] + self.window - now
+                )
+            counts.append(count)
+        return ThrottleResult(retry_after, counts)
+
+    def check(self, client_ip, account=None):
+        """
+        فحص الحظر دون تسجيل محاولة
+        """
+        return self._run(client_ip, account, increment=False)
+
+    def register_failure(self, client_ip, account=None):
+        """
+        تسجيل محاولة فاشلة وإرجاع حالة الحظر بعدها
+        """
+        return self._run(client_ip, account, increment=True)
+
+    def reset(self, client_ip, account=None):
+        """
+        مسح العدادات بعد تسجيل دخول ناجح
+        """
+        keys = [key for key, _ in self._keys(client_ip, account)]
+        cache.delete_many(keys)
+        local_counters.delete_many(keys)
+
+    @staticmethod
+    def get_account(request):
+        """
+        استخراج البريد الإلكتروني من جسم طلب تسجيل الدخول
+        """
+        if request.content_type == "application/json":
+            try:
+                email = json.loads(request.body or b"{}").get("email")
+            except (ValueError, AttributeError):
+                email = None
+        else:
+            email = request.POST.get("email")
+
+        if not isinstance(email, str):
+            return None
+        return email.strip().lower() or None
+
+
+login_throttle = LoginThrottle()
+
+
+# KEYS: مفاتيح الدلاء
+# ARGV: الوقت الحالي، ثم لكل مفتاح (السعة، معدل التعبئة في الثانية)
+# يتم الاستهلاك من جميع الدلاء أو لا شيء
+TOKEN_BUCKET_SCRIPT = """
+local now = tonumber(ARGV[1])
+local allowed = 1
+local tokens = {}
+
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 2])
+    local rate = tonumber(ARGV[i * 2 + 1])
+    local state = redis.call("HMGET", key, "tokens", "ts")
+    local available = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    available = math.min(capacity, available + math.max(0, now - ts) * rate)
+    if available < 1 then
+        allowed = 0
+    end
+    tokens[i] = available
+end
+
+local result = {allowed}
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 2])
+    local rate = tonumber(ARGV[i * 2 + 1])
+    if allowed == 1 then
+        tokens[i] = tokens[i] - 1
+    end
+    redis.call("HSET", key, "tokens", tostring(tokens[i]), "ts", tostring(now))
+    redis.call("PEXPIRE", key, math.ceil(capacity / rate * 1000))
+    table.insert(result, tostring(tokens[i]))
+end
+return result
+"""
+
+RATE_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+class RateLimitRule:
+    """
+    قاعدة تحديد معدل بصيغة "5/m" أو "20/15m" لنطاق معين (ip أو account)
+    """
+
+    def __init__(self, scope, rate):
+        count, period = rate.split("/")
+        multiplier = int(period[:-1]) if len(period) > 1 else 1
+        self.scope = scope
+        self.rate = rate
+        self.capacity = int(count)
+        self.period = multiplier * RATE_UNITS[period[-1]]
+        self.refill_rate = self.capacity / self.period
+
+    @property
+    def policy(self):
+        return f"{self.capacity};w={self.period}"
+
+
+class RateLimitResult:
+    """
+    نتيجة تطبيق قواعد تحديد المعدل على طلب
+    """
+
+    def __init__(self, allowed, rule=None, remaining=0.0, retry_after=0.0):
+        self.allowed = allowed
+        self.rule = rule
+        self.remaining = remaining
+        self.retry_after = retry_after
+
+    def headers(self):
+        """
+        ترويسات RateLimit-* للقاعدة الأكثر تقييداً
+        """
+        if self.rule is None:
+            return {}
+        remaining = max(0, math.floor(self.remaining))
+        reset = math.ceil((self.rule.capacity - self.remaining) / self.rule.refill_rate)
+        headers = {
+            "RateLimit-Limit": str(self.rule.capacity),
+            "RateLimit-Remaining": str(remaining),
+            "RateLimit-Reset": str(max(0, reset)),
+            "RateLimit-Policy": self.rule.policy,
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+
+class LocalPreFilter:
+    """
+    آخر حالة معروفة لكل دلو داخل العملية لرفض الفيضانات دون استدعاء Redis
+
+    يُحفظ عدد الرموز الذي أعاده الدلو في آخر فحص. العمليات الأخرى لا يمكنها
+    إلا إنقاصه، فالرموز المتاحة الآن لا تزيد عن هذا العدد مضافاً إليه التعبئة
+    منذ ذلك الوقت. الرفض المحلي يحدث فقط عندما يكون هذا الحد الأعلى أقل من
+    رمز واحد، فلا يُرفض طلب كان الدلو سيقبله.
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def check(self, key, rule, now):
+        """
+        مدة الانتظار إذا كان الدلو فارغاً حتماً، وإلا 0
+        """
+        with self._lock:
+            state = self._buckets.get(key)
+        if state is None:
+            return 0
+
+        tokens, ts = state
+        available = tokens + max(0, now - ts) * rule.refill_rate
+        if available >= 1:
+            return 0
+        return (1 - available) / rule.refill_rate
+
+    def record(self, key, tokens, now):
+        """
+        حفظ عدد الرموز الذي أعاده الدلو
+        """
+        with self._lock:
+            if len(self._buckets) >= self.max_entries and key not in self._buckets:
+                self._buckets.clear()
+            self._buckets[key] = (tokens, now)
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class RateLimiter:
+    """
+    محرك تحديد المعدل المركزي بدلو الرموز (token bucket)
+
+    القواعد معرفة لكل مسار في RATE_LIMIT_RULES بنطاق ip أو account (البريد
+    الإلكتروني في جسم الطلب). جميع قواعد الطلب تُفحص في استدعاء Redis واحد.
+    """
+
+    def __init__(self):
+        self.pre_filter = LocalPreFilter()
+        self._script = None
+        self._rules_source = None
+        self._rules = {}
+
+    @property
+    def enabled(self):
+        return getattr(settings, "RATE_LIMIT_ENABLED", True)
+
+    def get_rules(self, route_name):
+        source = getattr(settings, "RATE_LIMIT_RULES", {})
+        if source is not self._rules_source:
+            self._rules = {
+                route: [RateLimitRule(scope, rate) for scope, rate in rules]
+                for route, rules in source.items()
+            }
+            self._rules_source = source
+        return self._rules.get(route_name, [])
+
+    def _get_client(self):
+        try:
+            from django_redis import get_redis_connection
+
+            return get_redis_connection("default")
+        except (ImportError, NotImplementedError):
+            return None
+
+    def _identity(self, request, rule):
+        if rule.scope == "account":
+            account = getattr(request, "login_account", None)
+            if account is None:
+                account = LoginThrottle.get_account(request)
+                request.login_account = account
+            return account
+        return getattr(request, "client_ip", None) or request.META.get("REMOTE_ADDR")
+
+    def _buckets(self, request, route_name, rules, now):
+        """
+        مفاتيح الدلاء لقواعد المسار، مع نتيجة رفض إذا عرف المرشح المحلي أن
+        أحدها فارغ (فلا حاجة لسؤال Redis)
+        """
+        buckets = []
+        for rule in rules:
+            identity = self._identity(request, rule)
+            if identity:
+                key = f"rate_limit:{route_name}:{rule.scope}:{rule.rate}:{identity}"
+                wait = self.pre_filter.check(key, rule, now)
+                if wait > 0:
+                    return buckets, RateLimitResult(False, rule, 0.0, wait)
+                buckets.append((key, rule))
+        return buckets, None
+
+    def check(self, request, route_name):
+        """
+        استهلاك رمز من كل قاعدة للمسار، أو رفض الطلب
+        """
+        rules = self.get_rules(route_name)
+        if not self.enabled or not rules:
+            return RateLimitResult(True)
+
+        now = time.time()
+        buckets, denied = self._buckets(request, route_name, rules, now)
+        if denied is not None:
+            return denied
+        if not buckets:
+            return RateLimitResult(True)
+
+        try:
+            allowed, tokens = self._consume(buckets, now)
+        except Exception as e:
+            # عدم توفر Redis لا يجب أن يعطل المصادقة
+            logger.warning(f"Rate limiter unavailable, allowing request: {str(e)}")
+            return RateLimitResult(True)
+
+        for (key, _), available in zip(buckets, tokens):
+            self.pre_filter.record(key, available, now)
+
+        # القاعدة الأكثر تقييداً هي صاحبة أطول انتظار للرمز التالي
+        index = max(
+            range(len(buckets)),
+            key=lambda i: (1 - tokens[i]) / buckets[i][1].refill_rate,
+        )
+        rule = buckets[index][1]
+        retry_after = max(0.0, (1 - tokens[index]) / rule.refill_rate)
+        return RateLimitResult(allowed, rule, tokens[index], retry_after)
+
+    def _consume(self, buckets, now):
+        client = self._get_client()
+        if client is None:
+            return self._consume_local(cache, buckets, now)
+
+        if self._script is None:
+            self._script = client.register_script(TOKEN_BUCKET_SCRIPT)
+
+        args = [now]
+        for _, rule in buckets:
+            args.extend([rule.capacity, rule.refill_rate])
+        try:
+            result = redis_breaker.call(
+                self._script,
+                keys=[cache.make_key(key) for key, _ in buckets],
+                args=args,
+                client=client,
+            )
+        except (CircuitOpenError,) + REDIS_ERRORS as e:
+            _redis_unavailable(e)
+            return self._consume_local(local_counters, buckets, now)
+        return bool(int(result[0])), [float(tokens) for tokens in result[1:]]
+
+    def _consume_local(self, store, buckets, now):
+        """
+        نفس خوارزمية السكربت باستخدام واجهة cache العادية
+        """
+        tokens = []
+        for key, rule in buckets:
+            available, ts = store.get(key, (rule.capacity, now))
+            tokens.append(
+                min(rule.capacity, available + max(0, now - ts) * rule.refill_rate)
+            )
+
+        allowed = all(available >= 1 for available in tokens)
+        if allowed:
+            tokens = [available - 1 for available in tokens]
+        for (key, rule), available in zip(buckets, tokens):
+            store.set(key, (available, now), math.ceil(rule.period))
+        return allowed, tokens
+
+
+rate_limiter = RateLimiter()
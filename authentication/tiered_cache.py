@@ -0,0 +1,349 @@
+"""
+cache على طبقتين: LRU داخل العملية (L1) أمام Redis عبر django_redis (L2)
+
+L1 يُستخدم فقط للمفاتيح التي تبدأ بأحد L1_KEY_PREFIXES (بيانات تُقرأ كثيراً
+وتُكتب قليلاً). عدادات rate limiting والأقفال تبقى في Redis وحده لأنها
+تحتاج عمليات ذرية مشتركة بين العمال.
+
+كل كتابة أو حذف لمفتاح L1 تُنشر على قناة Redis pub/sub، فيحذف كل عامل نسخته
+المحلية خلال أجزاء من الثانية. L1 لا يُستخدم إلا أثناء الاشتراك في القناة،
+ومهلة L1_TIMEOUT حد أعلى لبقاء أي قيمة إن ضاعت رسالة.
+
+كل استدعاء لـ Redis يمر عبر redis_breaker: عند تعطل Redis تصبح القراءات
+misses والكتابات بلا أثر بدل رفع استثناء، فيستمر العمل بدون cache. incr و
+decr ترفعان ValueError كما لو كان المفتاح غير موجود، وهو سلوك Django الموثق.
+
+نسب الإصابة لكل طبقة من العداد cache_requests_total، مثلاً لـ L1:
+    sum(rate(cache_requests_total{tier="l1",result="hit"}[5m]))
+      / sum(rate(cache_requests_total{tier="l1"}[5m]))
+"""
+
+import logging
+import os
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django_redis.cache import RedisCache
+from prometheus_client import Counter
+
+from .circuit_breaker import REDIS_ERRORS, CircuitOpenError, redis_breaker
+
+logger = logging.getLogger(__name__)
+
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "Cache lookups by tier and result", ["tier", "result"]
+)
+_l1_hits = CACHE_REQUESTS.labels(tier="l1", result="hit")
+_l1_misses = CACHE_REQUESTS.labels(tier="l1", result="miss")
+_l2_hits = CACHE_REQUESTS.labels(tier="l2", result="hit")
+_l2_misses = CACHE_REQUESTS.labels(tier="l2", result="miss")
+
+_MISSING = object()
+CLEAR_ALL = "*"
+
+
+class LocalLRU:
+    """
+    LRU محدود العدد والمدة وآمن للخيوط
+
+    القيم تُخزن مُسلسلة حتى لا يعدل مستدعٍ كائناً يراه مستدعٍ آخر. العداد
+    generation يزيد مع كل إبطال، فلا تُخزّن قيمة قُرئت من L2 قبل إبطال وصل
+    أثناء قراءتها.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, data = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return _MISSING
+            self._entries.move_to_end(key)
+        return pickle.loads(data)
+
+    def set(self, key, value, timeout, generation):
+        try:
+            data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = (time.monotonic() + timeout, data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self.generation += 1
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class TieredRedisCache(RedisCache):
+    """
+    RedisCache مع L1 داخل العملية ومزامنة الإبطال عبر pub/sub
+
+    خيارات OPTIONS الإضافية:
+        L1_KEY_PREFIXES: بادئات المفاتيح التي تمر عبر L1
+        L1_MAX_ENTRIES: أقصى عدد مفاتيح في L1 (افتراضي 1000)
+        L1_TIMEOUT: أقصى مدة بقاء قيمة في L1 بالثواني (افتراضي 5)
+    """
+
+    def __init__(self, server, params):
+        super().__init__(server, params)
+        options = params.get("OPTIONS", {})
+        self.l1 = LocalLRU(options.get("L1_MAX_ENTRIES", 1000))
+        self.l1_timeout = options.get("L1_TIMEOUT", 5)
+        self.l1_key_prefixes = tuple(options.get("L1_KEY_PREFIXES", ()))
+        self.channel = f"{self.key_prefix}:l1_invalidate"
+        self._sender_id = uuid.uuid4().hex
+        self._pid = None
+        self._lock = threading.Lock()
+        self._subscribed = threading.Event()
+
+    def start_listener(self):
+        """
+        تشغيل خيط الاشتراك في قناة الإبطال مرة واحدة لكل عملية
+        """
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # القيم والاشتراك لا ينتقلان عبر fork
+            self._subscribed.clear()
+            self.l1.clear()
+            threading.Thread(
+                target=self._listen, name="cache-invalidation", daemon=True
+            ).start()
+            self._pid = os.getpid()
+
+    def _listen(self):
+        retry_delay = 1
+        while True:
+            pubsub = None
+            try:
+                pubsub = self.client.get_client(write=False).pubsub()
+                pubsub.subscribe(self.channel)
+                while True:
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is None:
+                        continue
+                    if message["type"] == "subscribe":
+                        self._subscribed.set()
+                        retry_delay = 1
+                    elif message["type"] == "message":
+                        self._on_invalidation(message["data"])
+            except Exception as e:
+                if retry_delay == 1:
+                    logger.warning(f"Cache invalidation listener failed: {str(e)}")
+            finally:
+                # رسائل فاتت أثناء الانقطاع: لا يُوثق بأي قيمة محلية
+                self._subscribed.clear()
+                self.l1.clear()
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+            time.sleep(retry_delay)
+            retry_delay = min(retry_delay * 2, 30)
+
+    def _on_invalidation(self, data):
+        sender, _, key = data.decode().partition("|")
+        if sender == self._sender_id:
+            return
+        if key == CLEAR_ALL:
+            self.l1.clear()
+        else:
+            self.l1.delete(key)
+
+    def _publish(self, keys):
+        def publish():
+            pipeline = self.client.get_client(write=True).pipeline(transaction=False)
+            for key in keys:
+                pipeline.publish(self.channel, f"{self._sender_id}|{key}")
+            pipeline.execute()
+
+        self._call_l2(None, publish)
+
+    @staticmethod
+    def _call_l2(fallback, method, *args, **kwargs):
+        """
+        استدعاء Redis عبر القاطع وإرجاع fallback إذا كان غير متاح
+        """
+        try:
+            return redis_breaker.call(method, *args, **kwargs)
+        except CircuitOpenError:
+            return fallback
+        except REDIS_ERRORS as e:
+            logger.warning(f"Redis unavailable, cache bypassed: {str(e)}")
+            return fallback
+
+    def _uses_l1(self, key):
+        if not self.l1_key_prefixes or not str(key).startswith(self.l1_key_prefixes):
+            return False
+        self.start_listener()
+        return self._subscribed.is_set()
+
+    def _invalidate(self, keys, version=None):
+        if not self.l1_key_prefixes:
+            return
+        made_keys = [
+            self.make_key(key, version=version)
+            for key in keys
+            if str(key).startswith(self.l1_key_prefixes)
+        ]
+        if not made_keys:
+            return
+        for made_key in made_keys:
+            self.l1.delete(made_key)
+        self._publish(made_keys)
+
+    def _get_l2(self, key, version, client):
+        value = self._call_l2(_MISSING, super().get, key, _MISSING, version, client)
+        if value is _MISSING:
+            _l2_misses.inc()
+        else:
+            _l2_hits.inc()
+        return value
+
+    def get(self, key, default=None, version=None, client=None):
+        if not self._uses_l1(key):
+            value = self._get_l2(key, version, client)
+            return default if value is _MISSING else value
+
+        made_key = self.make_key(key, version=version)
+        value = self.l1.get(made_key)
+        if value is not _MISSING:
+            _l1_hits.inc()
+            return value
+        _l1_misses.inc()
+
+        generation = self.l1.generation
+        value = self._get_l2(key, version, client)
+        if value is _MISSING:
+            return default
+        self.l1.set(made_key, value, self.l1_timeout, generation)
+        return value
+
+    def get_many(self, keys, version=None, client=None):
+        found = {}
+        remote_keys = []
+        for key in keys:
+            if not self._uses_l1(key):
+                remote_keys.append(key)
+                continue
+            value = self.l1.get(self.make_key(key, version=version))
+            if value is _MISSING:
+                _l1_misses.inc()
+                remote_keys.append(key)
+            else:
+                _l1_hits.inc()
+                found[key] = value
+
+        if remote_keys:
+            generation = self.l1.generation
+            remote = self._call_l2(
+                {}, super().get_many, remote_keys, version=version, client=client
+            )
+            for key in remote_keys:
+                if key not in remote:
+                    _l2_misses.inc()
+                    continue
+                _l2_hits.inc()
+                found[key] = remote[key]
+                if self._uses_l1(key):
+                    self.l1.set(
+                        self.make_key(key, version=version),
+                        remote[key],
+                        self.l1_timeout,
+                        generation,
+                    )
+        return found
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None, **kwargs):
+        # بدون Redis لا يوجد تنسيق بين العمال: المستدعي يتصرف كمالك للمفتاح
+        return self._call_l2(
+            True, super().add, key, value, timeout, version=version, **kwargs
+        )
+
+    def has_key(self, key, version=None, **kwargs):
+        return self._call_l2(False, super().has_key, key, version=version, **kwargs)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None, **kwargs):
+        return self._call_l2(
+            False, super().touch, key, timeout, version=version, **kwargs
+        )
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None, **kwargs):
+        result = self._call_l2(
+            False, super().set, key, value, timeout, version=version, **kwargs
+        )
+        self._invalidate([key], version)
+        return result
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None, **kwargs):
+        result = self._call_l2(
+            None, super().set_many, data, timeout, version=version, **kwargs
+        )
+        self._invalidate(data, version)
+        return result
+
+    def delete(self, key, version=None, **kwargs):
+        result = self._call_l2(False, super().delete, key, version=version, **kwargs)
+        self._invalidate([key], version)
+        return result
+
+    def delete_many(self, keys, version=None, **kwargs):
+        result = self._call_l2(
+            None, super().delete_many, keys, version=version, **kwargs
+        )
+        self._invalidate(keys, version)
+        return result
+
+    def incr(self, key, delta=1, version=None, **kwargs):
+        result = self._call_l2(
+            _MISSING, super().incr, key, delta, version=version, **kwargs
+        )
+        if result is _MISSING:
+            # القراءات أثناء العطل misses، فالمفتاح غير موجود بالنسبة للمستدعي
+            raise ValueError(f"Key '{key}' not found")
+        self._invalidate([key], version)
+        return result
+
+    def decr(self, key, delta=1, version=None, **kwargs):
+        return self.incr(key, -delta, version=version, **kwargs)
+
+    def delete_pattern(self, *args, **kwargs):
+        result = self._call_l2(0, super().delete_pattern, *args, **kwargs)
+        self.l1.clear()
+        self._publish([CLEAR_ALL])
+        return result
+
+    def clear(self):
+        result = self._call_l2(None, super().clear)
+        self.l1.clear()
+        self._publish([CLEAR_ALL])
+        return result
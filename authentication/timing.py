@@ -0,0 +1,142 @@
+"""
+قياس زمن مراحل الطلب (قاعدة البيانات، cache، تجزئة كلمات المرور، JWT،
+والاستدعاءات الخارجية) وإرساله في ترويسة Server-Timing وإلى Prometheus
+
+عند تعطيل SERVER_TIMING_ENABLED لا يُحمّل الـ middleware، وتقتصر كلفة كل
+span على قراءة ContextVar واحدة.
+"""
+
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django_redis.client import DefaultClient
+from prometheus_client import Histogram
+
+from .middleware import AsyncCapableMiddleware
+
+PHASE_DURATION = Histogram(
+    "http_request_phase_duration_seconds",
+    "Time spent per request phase",
+    ["phase"],
+)
+
+# مجموع زمن كل مرحلة للطلب الحالي، أو None خارج طلب مُقاس
+_timings = ContextVar("request_timings", default=None)
+
+
+class span:
+    """
+    قياس زمن كتلة وإضافته إلى مرحلة name في الطلب الحالي
+    """
+
+    __slots__ = ("name", "timings", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.timings = _timings.get()
+        if self.timings is not None:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.timings is not None:
+            elapsed = time.perf_counter() - self.start
+            self.timings[self.name] = self.timings.get(self.name, 0.0) + elapsed
+
+
+def timed(name):
+    """
+    decorator يقيس زمن الدالة كمرحلة name
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _execute_wrapper(execute, sql, params, many, context):
+    with span("db"):
+        return execute(sql, params, many, context)
+
+
+class ServerTimingMiddleware(AsyncCapableMiddleware):
+    """
+    Middleware يجمع أزمنة المراحل ويضيف ترويسة Server-Timing
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "SERVER_TIMING_ENABLED", False):
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    @contextmanager
+    def request_scope(self, request):
+        timings = {}
+        token = _timings.set(timings)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(_execute_wrapper))
+                yield timings, start
+        finally:
+            _timings.reset(token)
+
+    def finalize(self, request, response, state):
+        timings, start = state
+        timings["total"] = time.perf_counter() - start
+        for phase, duration in timings.items():
+            PHASE_DURATION.labels(phase=phase).observe(duration)
+
+        response["Server-Timing"] = ", ".join(
+            f"{phase};dur={duration * 1000:.2f}" for phase, duration in timings.items()
+        )
+        return response
+
+
+class TimedRedisClient(DefaultClient):
+    """
+    عميل django_redis يقيس زمن العمليات كمرحلة cache
+    """
+
+
+for _method in (
+    "get",
+    "set",
+    "add",
+    "delete",
+    "get_many",
+    "set_many",
+    "delete_many",
+    "incr",
+    "decr",
+    "has_key",
+    "touch",
+    "ttl",
+    "expire",
+):
+    setattr(TimedRedisClient, _method, timed("cache")(getattr(DefaultClient, _method)))
+
+
+class TimedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2 مع قياس زمن التجزئة كمرحلة hasher (verify يمر عبر encode)
+    """
+
+    @timed("hasher")
+    def encode(self, password, salt, iterations=None):
+        return super().encode(password, salt, iterations)
@@ -1,6 +1,10 @@
+from django.conf import settings
 from django.urls import path
 
-from . import views
+from . import async_views, views
+
+# تحت ASGI تخدم views غير المتزامنة المسارات الساخنة بنفس الأسماء
+hot_views = async_views if settings.ASYNC_VIEWS_ENABLED else views
 
 urlpatterns = [
     # Authentication endpoints
@@ -8,7 +12,8 @@ urlpatterns = [
     path("login/", views.login, name="login"),
     path("google-auth/", views.google_auth, name="google_auth"),
     path("logout/", views.logout, name="logout"),
-    path("refresh-token/", views.refresh_token, name="refresh_token"),
+    path("refresh-token/", hot_views.refresh_token, name="refresh_token"),
+    path("token/introspect/", async_views.introspect_token, name="introspect_token"),
     # Password management
     path("forgot-password/", views.forgot_password, name="forgot_password"),
     path("reset-password/", views.reset_password, name="reset_password"),
@@ -18,10 +23,10 @@ urlpatterns = [
     path("resend-verification/", views.resend_verification, name="resend_verification"),
     # User profile endpoints
     path("profile/", views.UserProfileView.as_view(), name="user_profile"),
-    path("user-info/", views.user_info, name="user_info"),
+    path("user-info/", hot_views.user_info, name="user_info"),
     # History and monitoring
     path("login-history/", views.LoginHistoryView.as_view(), name="login_history"),
     path("statistics/", views.user_statistics, name="user_statistics"),
     # Health check
-    path("health/", views.health_check, name="health_check"),
+    path("health/", hot_views.health_check, name="health_check"),
 ]
@@ -2,16 +2,20 @@ import logging
 
 from django.contrib.auth import get_user_model
 from django.utils import timezone
-from django_ratelimit.decorators import ratelimit
-from django_ratelimit.exceptions import Ratelimited
 from rest_framework import generics, permissions, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
 from .authentication import JWTTokenGenerator
+from .caching import cached_response
+from .db_routing import read_replica
+from .health import health_checker
+from .middleware import get_client_ip
 from .models import EmailVerificationToken, LoginHistory, PasswordResetToken
-from .monitoring import AuthMetricsLogger, HealthChecker
+from .monitoring import AuthMetricsLogger
+from .profile_cache import profile_response
+from .query_budget import query_budget
 from .serializers import (
     ChangePasswordSerializer,
     EmailVerificationSerializer,
@@ -24,6 +28,7 @@ from .serializers import (
     UserLoginSerializer,
     UserProfileSerializer,
     UserRegistrationSerializer,
+    fast_user_profile_serializer,
 )
 from .services import EmailService, GoogleAuthService, UserService
 
@@ -31,21 +36,9 @@ User = get_user_model()
 logger = logging.getLogger(__name__)
 
 
-def get_client_ip(request):
-    """
-    الحصول على عنوان IP الخاص بالعميل
-    """
-    x_forwarded_for = request.META.get("HTTP_X_FORWARDED_FOR")
-    if x_forwarded_for:
-        ip = x_forwarded_for.split(",")[0]
-    else:
-        ip = request.META.get("REMOTE_ADDR")
-    return ip
-
-
+@query_budget(10)
 @api_view(["POST"])
 @permission_classes([AllowAny])
-@ratelimit(key="ip", rate="3/m", method="POST", block=True)
 def register(request):
     """
     تسجيل مستخدم جديد
@@ -80,7 +73,7 @@ def register(request):
         return Response(
             {
                 "message": "تم تسجيل المستخدم بنجاح. يرجى التحقق من بريدك الإلكتروني لتفعيل الحساب.",
-                "user": UserProfileSerializer(user).data,
+                "user": fast_user_profile_serializer.to_representation(user),
                 "tokens": tokens,
             },
             status=status.HTTP_201_CREATED,
@@ -92,9 +85,9 @@ def register(request):
     )
 
 
+@query_budget(4)
 @api_view(["POST"])
 @permission_classes([AllowAny])
-@ratelimit(key="ip", rate="5/m", method="POST", block=True)
 def login(request):
     """
     تسجيل الدخول
@@ -121,18 +114,16 @@ def login(request):
         user.save()
 
         logger.info(f"User logged in: {user.email}")
-        
+
         # تسجيل مقاييس المصادقة
         AuthMetricsLogger.log_login_attempt(
-            user_email=user.email,
-            success=True,
-            user_type=user.user_type
+            user_email=user.email, success=True, user_type=user.user_type
         )
 
         return Response(
             {
                 "message": "تم تسجيل الدخول بنجاح",
-                "user": UserProfileSerializer(user).data,
+                "user": fast_user_profile_serializer.to_representation(user),
                 "tokens": tokens,
             },
             status=status.HTTP_200_OK,
@@ -158,6 +149,7 @@ def login(request):
     )
 
 
+@query_budget(10)
 @api_view(["POST"])
 @permission_classes([AllowAny])
 def google_auth(request):
@@ -215,7 +207,7 @@ def google_auth(request):
         return Response(
             {
                 "message": message,
-                "user": UserProfileSerializer(user).data,
+                "user": fast_user_profile_serializer.to_representation(user),
                 "tokens": tokens,
             },
             status=status.HTTP_200_OK,
@@ -227,9 +219,9 @@ def google_auth(request):
     )
 
 
+@query_budget(3)
 @api_view(["POST"])
 @permission_classes([AllowAny])
-@ratelimit(key="ip", rate="2/m", method="POST", block=True)
 def forgot_password(request):
     """
     طلب استرجاع كلمة المرور
@@ -352,6 +344,7 @@ def resend_verification(request):
     )
 
 
+@query_budget(2)
 @api_view(["POST"])
 @permission_classes([AllowAny])
 def refresh_token(request):
@@ -383,6 +376,7 @@ def refresh_token(request):
     )
 
 
+@query_budget(4)
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
 def logout(request):
@@ -413,6 +407,7 @@ def logout(request):
     return Response({"message": "تم تسجيل الخروج بنجاح"}, status=status.HTTP_200_OK)
 
 
+@query_budget(2)
 class UserProfileView(generics.RetrieveUpdateAPIView):
     """
     عرض وتحديث الملف الشخصي
@@ -424,7 +419,11 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
     def get_object(self):
         return self.request.user
 
+    def retrieve(self, request, *args, **kwargs):
+        return profile_response(request, request.user)
 
+
+@query_budget(2)
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
 def change_password(request):
@@ -452,6 +451,7 @@ def change_password(request):
     )
 
 
+@read_replica
 class LoginHistoryView(generics.ListAPIView):
     """
     عرض سجل تسجيل الدخول
@@ -464,18 +464,21 @@ class LoginHistoryView(generics.ListAPIView):
         return LoginHistory.objects.filter(user=self.request.user)
 
 
+@read_replica
+@query_budget(1)
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def user_info(request):
     """
     الحصول على معلومات المستخدم الحالي
     """
-    serializer = UserProfileSerializer(request.user)
-    return Response({"user": serializer.data}, status=status.HTTP_200_OK)
+    return profile_response(request, request.user, envelope="user")
 
 
+@read_replica
 @api_view(["GET"])
 @permission_classes([AllowAny])
+@cached_response(timeout=60, stale_timeout=300)
 def user_statistics(request):
     """
     الحصول على إحصائيات المستخدمين
@@ -494,16 +497,22 @@ def user_statistics(request):
 @permission_classes([AllowAny])
 def health_check(request):
     """
-    فحص صحة الخدمة الشامل
+    فحص صحة الخدمة الشامل من آخر نتائج الفاحص الخلفي
     """
-    health_data = HealthChecker.get_system_health()
-    
+    health_data = health_checker.snapshot()
+
     # تحديد status code بناءً على حالة الصحة
-    status_code = status.HTTP_200_OK if health_data["status"] == "healthy" else status.HTTP_503_SERVICE_UNAVAILABLE
-    
-    health_data.update({
-        "service": "naebak-auth-service",
-        "version": "2.0.0",
-    })
-    
+    status_code = (
+        status.HTTP_503_SERVICE_UNAVAILABLE
+        if health_data["status"] == "unhealthy"
+        else status.HTTP_200_OK
+    )
+
+    health_data.update(
+        {
+            "service": "naebak-auth-service",
+            "version": "2.0.0",
+        }
+    )
+
     return Response(health_data, status=status_code)
@@ -0,0 +1,134 @@
+"""
+إعدادات gunicorn لخدمة المصادقة
+
+نوع العامل وعددهم قابلان للضبط عبر متغيرات البيئة:
+- GUNICORN_WORKER_CLASS: gthread (افتراضي) أو sync أو
+  uvicorn.workers.UvicornWorker (يشغل auth_service.asgi)
+- GUNICORN_WORKERS: افتراضياً 2 × عدد المعالجات + 1 (أو عدد المعالجات لـ uvicorn)،
+  حيث عدد المعالجات هو المتاح للحاوية (affinity وحصة cgroup) لا عدد معالجات الجهاز
+- GUNICORN_THREADS: خيوط كل عامل gthread (افتراضي 4)
+- ASYNC_VIEWS_ENABLED: views غير المتزامنة (async_views.py)، لا تُفعّل تلقائياً
+  مع uvicorn: middlewares الخدمة تعمل دون انتقال بين الخيوط، لكن middlewares
+  Django المبنية على MiddlewareMixin و WhiteNoise ما زالت تنتقل إلى خيط في كل
+  طلب، فيبقى uvicorn أبطأ من gthread في benchmark_workers
+"""
+
+import gc
+import math
+import os
+import shutil
+
+# يجب ضبطه قبل تحميل التطبيق واستيراد prometheus_client. يُفرّغ في on_starting
+# لا هنا: هذا الملف يُعاد تنفيذه مع كل إعادة تحميل (HUP) وتفريغه حينها يصفّر
+# العدادات
+prometheus_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus_multiproc"
+)
+os.makedirs(prometheus_dir, exist_ok=True)
+
+
+def _read_fields(path):
+    try:
+        with open(path) as f:
+            return f.read().split()
+    except OSError:
+        return None
+
+
+def cgroup_cpu_quota():
+    """
+    حصة CPU للحاوية من cgroup v2 أو v1 بوحدة المعالجات، أو None بدون حد
+    """
+    fields = _read_fields("/sys/fs/cgroup/cpu.max")
+    if fields:
+        quota, period = fields
+    else:
+        quota = _read_fields("/sys/fs/cgroup/cpu/cpu.cfs_quota_us")
+        period = _read_fields("/sys/fs/cgroup/cpu/cpu.cfs_period_us")
+        if not quota or not period:
+            return None
+        quota, period = quota[0], period[0]
+    if quota in ("max", "-1"):
+        return None
+    return int(quota) / int(period)
+
+
+def available_cpus():
+    """
+    عدد المعالجات المتاحة للعملية: affinity مقيدة بحصة cgroup إن وجدت
+    """
+    try:
+        count = len(os.sched_getaffinity(0))
+    except AttributeError:
+        count = os.cpu_count() or 1
+    quota = cgroup_cpu_quota()
+    if quota is not None:
+        count = min(count, max(1, math.ceil(quota)))
+    return count
+
+
+cpu_count = available_cpus()
+
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+is_asgi = worker_class.startswith("uvicorn")
+
+wsgi_app = (
+    "auth_service.asgi:application" if is_asgi else "auth_service.wsgi:application"
+)
+workers = int(
+    os.getenv("GUNICORN_WORKERS", cpu_count if is_asgi else cpu_count * 2 + 1)
+)
+threads = int(os.getenv("GUNICORN_THREADS", 4)) if worker_class == "gthread" else 1
+# تقسم الإعدادات حد اتصالات قاعدة البيانات (DB_POOL_MAX_CONNECTIONS) على العمال،
+# ولا يقل مجمّع العامل عن عدد خيوطه
+os.environ["GUNICORN_WORKERS"] = str(workers)
+os.environ["GUNICORN_THREADS"] = str(threads)
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+# تحميل التطبيق في العملية الرئيسية ومشاركة ذاكرته مع العمال (copy-on-write)
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+max_requests = 1000
+max_requests_jitter = 100
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+loglevel = "info"
+accesslog = "-"
+errorlog = "-"
+
+
+def on_starting(server):
+    """
+    حذف ملفات المقاييس من تشغيل سابق مرة واحدة عند بدء الـ master، قبل
+    إنشاء أي عامل حتى لا تُجمع قيمها مع قيم هذا التشغيل
+    """
+    shutil.rmtree(prometheus_dir, ignore_errors=True)
+    os.makedirs(prometheus_dir, exist_ok=True)
+
+
+def pre_fork(server, worker):
+    """
+    نقل كائنات التطبيق المحمّل إلى الجيل الدائم قبل fork حتى لا يلمسها
+    جامع القمامة في العمال فتبقى صفحاتها مشتركة
+    """
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    """
+    تهيئة العامل بعد تحميل التطبيق فيه (مع preload أو بدونه): فتح
+    الاتصالات وتحميل مفاتيح JWT والمسارات. اتصال قاعدة البيانات غير المُجمّع
+    يخص خيط العامل الرئيسي، فلا يُفتح إلا لعمال sync التي تخدم الطلبات فيه.
+    """
+    from auth_service.warmup import warm_up_worker
+
+    warm_up_worker(threaded=worker_class != "sync")
+
+
+def child_exit(server, worker):
+    """
+    إزالة ملفات المقاييس الحية للعامل المنتهي
+    """
+    from auth_service.metrics import mark_worker_dead
+
+    mark_worker_dead(worker.pid)